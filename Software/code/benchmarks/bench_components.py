@@ -0,0 +1,152 @@
+# ---------------------------------------------------------------------------
+# bench_components.py – microbenchmarks of the per-snapshot hot path
+# ---------------------------------------------------------------------------
+# Usage:  python benchmarks/bench_components.py [--iterations N] [--out FILE]
+#   gps_parse_rmc / gps_parse_gga – gps._parse() per NMEA sentence
+#   flatten_all                   – datamanager._flatten_all() on a snapshot
+#                                   as main._assemble() builds it
+#   json_snapshot / json_batch5   – json.dumps of one / five flat snapshots
+#   db_row                        – datamanager._db_row() (snapshot → tuple)
+#   sqlite_insert_bN              – executemany + commit of N rows (WAL,
+#                                   config.db_synchronous), reported per row
+# Drivers run against the simulator backends (no hardware, no threads); the
+# DB is a temporary file. Reports µs per operation and ops/s as JSON.
+# ---------------------------------------------------------------------------
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CODE_DIR)
+
+import sim  # noqa: E402
+
+INSERT_BATCHES = (1, 10, 50)
+
+RMC = "GNRMC,123519.00,A,5419.39200,N,01008.36400,E,5.123,97.37,171026,,,A,V"
+GGA = "GNGGA,123519.00,5419.39200,N,01008.36400,E,1,11,0.90,12.3,M,40.1,M,,"
+
+
+def _nmea(body: str) -> str:
+    cs = 0
+    for ch in body:
+        cs ^= ord(ch)
+    return f"${body}*{cs:02X}"
+
+
+def _snapshot(i: int) -> dict:
+    """Nested snapshot with the blocks main._assemble() produces for a boat."""
+    return {
+        "ts_monotonic": 1234.5 + i * 0.1, "id": "boat1", "validtime": True, "status": "A",
+        "gps": {"datetime": "2026-10-17T12:35:19.00Z", "status": "A",
+                "lat": 54.3232, "long": 10.1394, "SOG": 5.12, "COG": 97.37,
+                "fixQ": 1, "nSat": 11, "HDOP": 0.9, "alt": 12.3},
+        "imu": {"acc_x": 0.01, "acc_y": -0.05, "acc_z": 1.0, "gyro_x": -1.2, "gyro_y": 0.3,
+                "gyro_z": -3.0, "pitch": 1.2, "roll": -2.9},
+        "ahrs": {"quat_w": 0.99, "quat_x": 0.01, "quat_y": 0.02, "quat_z": 0.1,
+                 "heading": 34.87, "pitch": 1.2, "roll": -2.9},
+        "bat": {"batvolt": 4.02, "batperc": 81.5},
+        "imu_age_ms": 4.2, "ahrs_age_ms": 12.1, "bat_age_ms": 310.0,
+        "wifi_conn": True, "wifi_rssi": -61,
+    }
+
+
+def _time_it(fn, iterations: int) -> float:
+    """Best-of-3 seconds for `iterations` calls."""
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _result(name: str, secs: float, ops: int) -> dict:
+    return {"name": name, "us_per_op": round(secs / ops * 1e6, 3),
+            "ops_per_s": round(ops / secs, 1)}
+
+
+def run(iterations: int) -> dict:
+    # import the real modules against simulated hardware and a scratch DB
+    from config import config
+    sim.install()
+    workdir = tempfile.mkdtemp(prefix="bench-components-")
+    config.db_dir = workdir
+    config.spool_dir = os.path.join(workdir, "spool")
+    from modules import gps_SAM_M10Q as gps
+    import datamanager
+
+    rmc, gga = _nmea(RMC), _nmea(GGA)
+    results = [
+        _result("gps_parse_rmc", _time_it(lambda: gps._parse(rmc), iterations), iterations),
+        _result("gps_parse_gga", _time_it(lambda: gps._parse(gga), iterations), iterations),
+    ]
+
+    # _flatten_all mutates its argument: time a fresh shallow copy per call and
+    # subtract the copy alone
+    base = _snapshot(0)
+    copy_s = _time_it(lambda: dict(base), iterations)
+    flat_s = _time_it(lambda: datamanager._flatten_all(dict(base)), iterations)
+    results.append(_result("flatten_all", max(flat_s - copy_s, 1e-9), iterations))
+
+    flats = []
+    for i in range(5):
+        snap = _snapshot(i)
+        datamanager._flatten_all(snap)
+        flats.append(snap)
+    results.append(_result("json_snapshot",
+                           _time_it(lambda: json.dumps(flats[0], default=str).encode(), iterations),
+                           iterations))
+    results.append(_result("json_batch5",
+                           _time_it(lambda: json.dumps(flats, default=str).encode(), iterations),
+                           iterations))
+    results.append(_result("db_row", _time_it(lambda: datamanager._db_row(dict(flats[0])),
+                                              iterations), iterations))
+
+    row = datamanager._db_row(dict(flats[0]))
+    cur, conn = datamanager.cursor, datamanager.conn
+    for n in INSERT_BATCHES:
+        rows = [row] * n
+        commits = max(1, iterations // (10 * n))
+
+        def insert():
+            cur.executemany(datamanager._INSERT_SQL, rows)
+            conn.commit()
+
+        secs = _time_it(insert, commits)
+        results.append(_result(f"sqlite_insert_b{n}", secs, commits * n))
+
+    datamanager.close_db()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "benchmark":      "components",
+        "python":         sys.version.split()[0],
+        "iterations":     iterations,
+        "db_synchronous": datamanager.DB_SYNCHRONOUS,
+        "results":        results,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Hot-path microbenchmarks.")
+    ap.add_argument("--iterations", type=int, default=20000)
+    ap.add_argument("--out", help="write the JSON result to this file")
+    args = ap.parse_args()
+
+    report = run(args.iterations)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
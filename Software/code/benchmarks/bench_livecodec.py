@@ -0,0 +1,149 @@
+# ---------------------------------------------------------------------------
+# bench_livecodec.py – live payload size & encode CPU: JSON vs livecodec
+# ---------------------------------------------------------------------------
+# Usage:  python benchmarks/bench_livecodec.py [--iterations N] [--out FILE]
+# Encodes synthetic flattened snapshots (same keys as datatransfer() sends)
+# per batch size with
+#   json          – json.dumps(batch, default=str)   (current *live path)
+#   compact       – livecodec.encode(batch, compress=False)
+#   compact_zlib  – livecodec.encode(batch, compress=True)
+# and reports bytes per frame / per snapshot and µs per snapshot as JSON.
+# First checks that the hub copy (code_nodered/livedecoder.py) has the same
+# SCHEMA / SCHEMA_VERSION and decodes the frames identically; exits 1 if not.
+# --check runs only that check.
+# ---------------------------------------------------------------------------
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import livecodec  # noqa: E402
+
+BATCH_SIZES = (1, 2, 5, 10, 32)
+HUB_DECODER = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "..", "..", "code_nodered", "livedecoder.py")
+
+
+def _snapshot(i: int, rnd: random.Random) -> dict:
+    t = 1_760_000_000 + i * 0.1
+    return {
+        "id": "boat1", "validtime": True, "status": "ok",
+        "datetime": time.strftime("%Y-%m-%dT%H:%M:", time.gmtime(t)) + f"{t % 60:05.2f}Z",
+        "ts_monotonic": 1234.5 + i * 0.1,
+        "lat": 54.3232 + rnd.uniform(-1e-4, 1e-4), "long": 10.1394 + rnd.uniform(-1e-4, 1e-4),
+        "SOG": round(rnd.uniform(3, 7), 2), "COG": round(rnd.uniform(0, 360), 2),
+        "fixQ": 1, "nSat": 11, "HDOP": 0.9, "alt": 12.3,
+        "batvolt": 4.02, "batperc": 81.5,
+        "wifi_conn": True, "wifi_signal_strength": -61,
+        "acc_x": rnd.uniform(-1, 1), "acc_y": rnd.uniform(-1, 1), "acc_z": rnd.uniform(0.9, 1.1),
+        "gyro_x": rnd.uniform(-20, 20), "gyro_y": rnd.uniform(-20, 20), "gyro_z": rnd.uniform(-20, 20),
+        "pitch": rnd.uniform(-10, 10), "roll": rnd.uniform(-20, 20),
+        "mag_x": rnd.uniform(-0.5, 0.5), "mag_y": rnd.uniform(-0.5, 0.5), "mag_z": rnd.uniform(-0.5, 0.5),
+        "heading": rnd.uniform(0, 360),
+        "quat_w": rnd.uniform(0.9, 1), "quat_x": rnd.uniform(-0.1, 0.1),
+        "quat_y": rnd.uniform(-0.1, 0.1), "quat_z": rnd.uniform(-0.4, 0.4),
+        "w_speed": rnd.uniform(2, 12), "w_angle": rnd.uniform(0, 360), "w_unit": "N", "w_status": "A",
+        "true_wind_dir": rnd.uniform(0, 360), "w_speed_kts": rnd.uniform(4, 24),
+        "imu_age_ms": 4.2, "mag_age_ms": 12.1, "ahrs_age_ms": 9.8, "bat_age_ms": 310.0, "wind_age_ms": 120.5,
+    }
+
+
+def check_hub_decoder(path: str = HUB_DECODER) -> list[str]:
+    """Differences between livecodec and its hub copy (empty list = in sync)."""
+    spec = importlib.util.spec_from_file_location("livedecoder", path)
+    hub = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(hub)
+    errors = [f"{name} differs: {getattr(livecodec, name)!r} != {getattr(hub, name)!r}"
+              for name in ("MAGIC", "SCHEMA_VERSION", "FLAG_ZLIB")
+              if getattr(livecodec, name) != getattr(hub, name)]
+    for version in sorted(set(livecodec.SCHEMA) | set(hub.SCHEMA)):
+        if livecodec.SCHEMA.get(version) != hub.SCHEMA.get(version):
+            errors.append(f"SCHEMA[{version}] differs")
+    if not errors:
+        batch = [_snapshot(i, random.Random(i)) for i in range(5)]
+        for compress in (False, True):
+            frame = livecodec.encode(batch, compress=compress)
+            if hub.decode(frame) != livecodec.decode(frame):
+                errors.append(f"decode differs (compress={compress})")
+    return errors
+
+
+def _time_it(fn, iterations: int) -> float:
+    """Best-of-3 seconds for `iterations` calls."""
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(iterations: int) -> dict:
+    rnd = random.Random(42)
+    encoders = {
+        "json":         lambda b: json.dumps(b, default=str).encode(),
+        "compact":      lambda b: livecodec.encode(b, compress=False),
+        "compact_zlib": lambda b: livecodec.encode(b, compress=True),
+    }
+    results = []
+    for n in BATCH_SIZES:
+        batch = [_snapshot(i, rnd) for i in range(n)]
+        # the JSON path sends a bare dict when batching is off
+        payload = {"json": batch[0] if n == 1 else batch}
+        for name, enc in encoders.items():
+            data = payload.get(name, batch)
+            size = len(enc(data))
+            secs = _time_it(lambda: enc(data), iterations)
+            results.append({
+                "encoding":         name,
+                "batch":            n,
+                "bytes_frame":      size,
+                "bytes_per_snap":   round(size / n, 1),
+                "encode_us_frame":  round(secs / iterations * 1e6, 2),
+                "encode_us_snap":   round(secs / iterations / n * 1e6, 2),
+            })
+    base = {r["batch"]: r["bytes_frame"] for r in results if r["encoding"] == "json"}
+    for r in results:
+        r["size_vs_json"] = round(r["bytes_frame"] / base[r["batch"]], 3)
+    return {
+        "benchmark":  "livecodec",
+        "python":     sys.version.split()[0],
+        "iterations": iterations,
+        "schema":     livecodec.SCHEMA_VERSION,
+        "results":    results,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--iterations", type=int, default=500)
+    ap.add_argument("--out", help="write the JSON result to this file")
+    ap.add_argument("--check", action="store_true",
+                    help="only check the hub decoder against livecodec")
+    args = ap.parse_args()
+
+    errors = check_hub_decoder()
+    for err in errors:
+        print(f"livedecoder.py out of sync: {err}", file=sys.stderr)
+    if errors:
+        sys.exit(1)
+    if args.check:
+        return
+
+    report = run(args.iterations)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# ---------------------------------------------------------------------------
+# bench_pipeline.py – end-to-end throughput / latency of the tracker pipeline
+# ---------------------------------------------------------------------------
+# Usage:  python benchmarks/bench_pipeline.py [--rates 10,25,50,100,200]
+#                                             [--duration 20] [--out FILE]
+# Runs simulate.py (simulated sensors + local MQTT stand-in) once per offered
+# snapshot rate. The GPS epoch rate is config.GPS_UPDATE (≤ 25 Hz) times the
+# simulator speed factor, so rates above 25 Hz run the whole sensor world
+# faster than real time. Per step:
+#   achieved_hz     – rows logged per second of GPS time (from the DB)
+#   fix→publish     – GPS epoch → live frame received by the broker (p50/p95/p99)
+#   fix→commit      – GPS epoch → row committed to SQLite (p50/p95/p99)
+#   db_rows_per_s, mqtt_bytes_per_s, drops (snapshot channel, MQTT outbox)
+#   cpu % per thread, process RSS
+# max_sustainable_hz is the highest offered rate that kept ≥ 95 % of the
+# epochs, dropped nothing and stayed under --max-p95-ms fix→publish.
+# ---------------------------------------------------------------------------
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GPS_RATES = (25, 20, 15, 10, 5, 2, 1)              # supported by the SAM-M10Q driver
+
+
+def _gps_rate_and_speed(target: float) -> tuple[int, float]:
+    """Highest receiver rate ≤ target; the simulator speed makes up the rest."""
+    gps_rate = next((r for r in GPS_RATES if r <= target), 1)
+    return gps_rate, target / gps_rate
+
+
+def _achieved_hz(db_file: str, speed: float) -> tuple[int, float | None]:
+    """Logged rows and their rate over the GPS time span, scaled to real time."""
+    with sqlite3.connect(db_file) as db:
+        rows, first, last = db.execute(
+            "SELECT COUNT(*), MIN(datetime), MAX(datetime) FROM logdata").fetchone()
+    if rows < 2:
+        return rows, None
+    span = (datetime.datetime.fromisoformat(last.rstrip("Z"))
+            - datetime.datetime.fromisoformat(first.rstrip("Z"))).total_seconds()
+    return rows, round((rows - 1) / (span / speed), 2) if span > 0 else None
+
+
+def run_step(target: float, duration: float, protocol: str, encoding: str,
+             workdir: str) -> dict:
+    gps_rate, speed = _gps_rate_and_speed(target)
+    report = os.path.join(workdir, "report.json")
+    cmd = [sys.executable, os.path.join(CODE_DIR, "simulate.py"),
+           "--device", "boat", "--duration", str(duration), "--speed", str(speed),
+           "--gps-rate", str(gps_rate), "--gps-protocol", protocol,
+           "--workdir", workdir, "--report", report,
+           # one statistics window for the whole run, no 3 s rate check at start
+           "--set", "GPS_RATE_CHECK=0",
+           "--set", f"pipeline_stats_interval={duration * 10}",
+           "--set", f"db_stats_interval={duration * 10}",
+           "--set", f"mqtt_stats_interval={duration * 10}",
+           "--set", f"live_encoding={encoding!r}"]
+    proc = subprocess.run(cmd, cwd=CODE_DIR, capture_output=True, text=True,
+                          env=dict(os.environ, LOGLEVEL="ERROR"), timeout=duration + 60)
+    if proc.returncode or not os.path.exists(report):
+        return {"offered_hz": target, "error": proc.stderr.strip()[-2000:]}
+    with open(report) as fh:
+        sim = json.load(fh)
+
+    rows, achieved = _achieved_hz(sim["db_file"], speed)
+    elapsed = sim["elapsed_s"]
+    live_bytes = sum(t["bytes"] for t in (sim["broker_topics"] or {}).values())
+    cpu = sim["process"]["cpu_s"]
+    return {
+        "offered_hz":       target,
+        "gps_rate_hz":      gps_rate,
+        "speed":            round(speed, 3),
+        "achieved_hz":      achieved,
+        "db_rows":          rows,
+        "db_rows_per_s":    round(rows / elapsed, 1),
+        "mqtt_bytes_per_s": round(live_bytes / elapsed, 1),
+        "channel_drops":    sim["snapshot_channel"]["drops"],
+        "mqtt_drops":       sim["mqtt"]["outbox"]["drops"],
+        "fix_to_publish":   sim["fix_to_broker"],
+        "fix_to_commit":    sim["fix_to_commit"],
+        "fix_to_consumer":  sim["snapshot_channel"]["latency"],
+        "cpu_pct":          {name: round(s / elapsed * 100, 1) for name, s in cpu.items()},
+        "cpu_pct_total":    round(sum(cpu.values()) / elapsed * 100, 1),
+        "rss_mb":           sim["process"]["rss_mb"],
+        "rss_peak_mb":      sim["process"]["rss_peak_mb"],
+    }
+
+
+def _sustained(step: dict, max_p95_ms: float) -> bool:
+    p95 = (step.get("fix_to_publish") or {}).get("p95_ms")
+    return (step.get("achieved_hz") is not None
+            and step["achieved_hz"] >= 0.95 * step["offered_hz"]
+            and step["channel_drops"] == 0 and step["mqtt_drops"] == 0
+            and p95 is not None and p95 <= max_p95_ms)
+
+
+def run(rates: list[float], duration: float, protocol: str, encoding: str,
+        max_p95_ms: float) -> dict:
+    steps = []
+    for target in rates:
+        with tempfile.TemporaryDirectory(prefix="bench-pipeline-") as workdir:
+            step = run_step(target, duration, protocol, encoding, workdir)
+        step["sustained"] = "error" not in step and _sustained(step, max_p95_ms)
+        steps.append(step)
+        print(f"{target:>7.1f} Hz offered → {step.get('achieved_hz')} Hz achieved, "
+              f"p95 fix→publish {(step.get('fix_to_publish') or {}).get('p95_ms')} ms"
+              f"{'' if step['sustained'] else '  (not sustained)'}", file=sys.stderr)
+    ok = [s["offered_hz"] for s in steps if s["sustained"]]
+    return {
+        "benchmark":          "pipeline",
+        "python":             sys.version.split()[0],
+        "duration_s":         duration,
+        "gps_protocol":       protocol,
+        "live_encoding":      encoding,
+        "max_p95_ms":         max_p95_ms,
+        "max_sustainable_hz": max(ok) if ok else None,
+        "steps":              steps,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="End-to-end pipeline benchmark on simulated sensors.")
+    ap.add_argument("--rates", default="10,25,50,100,200", help="offered snapshot rates in Hz")
+    ap.add_argument("--duration", type=float, default=20.0, help="seconds per rate")
+    ap.add_argument("--protocol", choices=("nmea", "ubx"), default="nmea")
+    ap.add_argument("--encoding", choices=("json", "compact"), default="json")
+    ap.add_argument("--max-p95-ms", type=float, default=250.0,
+                    help="fix→publish p95 limit for a rate to count as sustained")
+    ap.add_argument("--out", help="write the JSON result to this file")
+    args = ap.parse_args()
+
+    rates = [float(r) for r in args.rates.split(",") if r.strip()]
+    report = run(rates, args.duration, args.protocol, args.encoding, args.max_p95_ms)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
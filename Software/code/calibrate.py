@@ -0,0 +1,231 @@
+# ---------------------------------------------------------------------------
+# calibrate.py – record raw sensor data and write the calibration JSON files
+# ---------------------------------------------------------------------------
+#   python calibrate.py mag   [--seconds 60]   rotate the boat/sensor through
+#                                              every orientation (figure eights)
+#   python calibrate.py accel [--seconds 60]   hold still in ≥ 6 orientations
+#                                              (each face up/down), moving between
+#   python calibrate.py gyro  [--seconds 10]   keep completely still
+#
+# mag   → ellipsoid fit: hard-iron offset + soft-iron matrix  (mag_offsets.json)
+# accel → axis-aligned ellipsoid fit to |g| = 1: bias + scale (accel_offsets.json)
+# gyro  → mean of a static recording: bias                    (gyro_offsets.json)
+#
+# Raw samples can be saved/reloaded (--save / --load, .npy) to refit offline.
+# The drivers load the files at import and apply them as one precomputed
+# affine transform (see imu_LSM6DSO._load_calibration, mag_mmc56x3._load_offsets).
+# ---------------------------------------------------------------------------
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from config import config
+
+CALIB_DIR = os.path.dirname(os.path.abspath(config.__file__))
+STILL_DPS = 5.0                  # accel: samples with |gyro| above this are motion
+
+
+# ---------------------------------------------------------------------------
+# Fitting
+# ---------------------------------------------------------------------------
+def fit_ellipsoid(xyz: np.ndarray, axis_aligned: bool = False,
+                  radius: float | None = None) -> tuple[np.ndarray, np.ndarray, float]:
+    """
+    Least-squares ellipsoid fit.
+
+    Returns (center, W, r) such that |W @ (p - center)| == r for points p on
+    the fitted ellipsoid. r is `radius` if given, otherwise the geometric mean
+    of the semi-axes (keeps the field strength in its original unit).
+    axis_aligned=True fits only x², y², z² terms (W is diagonal).
+    """
+    x, y, z = xyz[:, 0], xyz[:, 1], xyz[:, 2]
+    if axis_aligned:
+        d = np.column_stack([x * x, y * y, z * z, 2 * x, 2 * y, 2 * z])
+    else:
+        d = np.column_stack([x * x, y * y, z * z, 2 * x * y, 2 * x * z, 2 * y * z,
+                             2 * x, 2 * y, 2 * z])
+    v, *_ = np.linalg.lstsq(d, np.ones(len(xyz)), rcond=None)
+    if axis_aligned:
+        a = np.diag(v[:3])
+        b = v[3:6]
+    else:
+        a = np.array([[v[0], v[3], v[4]],
+                      [v[3], v[1], v[5]],
+                      [v[4], v[5], v[2]]])
+        b = v[6:9]
+
+    center = -np.linalg.solve(a, b)
+    m = a / (1.0 + center @ a @ center)          # (p-c)ᵀ M (p-c) = 1
+    w, vec = np.linalg.eigh(m)
+    if np.any(w <= 0):
+        raise ValueError("data does not describe an ellipsoid – record more orientations")
+    r = float(np.cbrt(np.prod(1.0 / np.sqrt(w)))) if radius is None else float(radius)
+    transform = vec @ np.diag(np.sqrt(w) * r) @ vec.T
+    return center, transform, r
+
+
+def fit_residual(xyz: np.ndarray, center: np.ndarray, transform: np.ndarray, r: float) -> float:
+    """Relative RMS deviation of the corrected magnitudes from r."""
+    norm = np.linalg.norm((xyz - center) @ transform.T, axis=1)
+    return float(np.sqrt(np.mean((norm / r - 1.0) ** 2)))
+
+
+# ---------------------------------------------------------------------------
+# Recording
+# ---------------------------------------------------------------------------
+def _record(read_fn, seconds: float, rate: float, label: str) -> np.ndarray:
+    """Call read_fn at `rate` Hz for `seconds`; each call returns one row."""
+    rows = []
+    period = 1.0 / rate
+    t_end = time.monotonic() + seconds
+    next_due = time.monotonic()
+    print(f"recording {label} for {seconds:.0f} s …")
+    while time.monotonic() < t_end:
+        try:
+            rows.append(read_fn())
+        except OSError as exc:
+            print(f"read error: {exc}")
+        next_due += period
+        time.sleep(max(0.0, next_due - time.monotonic()))
+    print(f"{len(rows)} samples")
+    return np.asarray(rows, dtype=float)
+
+
+def _record_mag(seconds: float, rate: float) -> np.ndarray:
+    from modules import mag
+    return _record(mag._read_raw, seconds, rate, "magnetometer")
+
+
+def _record_imu(seconds: float, rate: float) -> np.ndarray:
+    from modules import imu
+    imu.init_sensor()
+    return _record(lambda: np.concatenate(imu.read_raw()), seconds, rate, "imu")
+
+
+def _write(name: str, data: dict, out_dir: str) -> None:
+    path = os.path.join(out_dir, name)
+    with open(path, "w", encoding="utf-8") as fp:
+        json.dump(data, fp, indent=2)
+        fp.write("\n")
+    print(f"wrote {path}")
+
+
+# ---------------------------------------------------------------------------
+# Calibrations
+# ---------------------------------------------------------------------------
+def calibrate_mag(raw: np.ndarray, out_dir: str, plot: bool = False) -> dict:
+    center, soft, r = fit_ellipsoid(raw)
+    result = {
+        "X_OFFSET":  round(float(center[0]), 4),
+        "Y_OFFSET":  round(float(center[1]), 4),
+        "Z_OFFSET":  round(float(center[2]), 4),
+        "SOFT_IRON": np.round(soft, 6).tolist(),
+        "FIELD_UT":  round(r, 3),
+        "RESIDUAL":  round(fit_residual(raw, center, soft, r), 5),
+        "SAMPLES":   int(len(raw)),
+    }
+    _write("mag_offsets.json", result, out_dir)
+    if plot:
+        _plot_mag(raw, (raw - center) @ soft.T, out_dir)
+    return result
+
+
+def calibrate_accel(raw: np.ndarray, out_dir: str) -> dict:
+    acc, gyro = raw[:, :3], raw[:, 3:6]
+    still = np.linalg.norm(gyro, axis=1) < STILL_DPS
+    if still.sum() < 50:
+        raise ValueError("too few still samples – hold the sensor still in each orientation")
+    center, scale, _ = fit_ellipsoid(acc[still], axis_aligned=True, radius=1.0)
+    result = {
+        "OX": round(float(center[0]), 5),
+        "OY": round(float(center[1]), 5),
+        "OZ": round(float(center[2]), 5),
+        "SX": round(float(scale[0, 0]), 5),
+        "SY": round(float(scale[1, 1]), 5),
+        "SZ": round(float(scale[2, 2]), 5),
+        "RESIDUAL": round(fit_residual(acc[still], center, scale, 1.0), 5),
+        "SAMPLES":  int(still.sum()),
+    }
+    _write("accel_offsets.json", result, out_dir)
+    return result
+
+
+def calibrate_gyro(raw: np.ndarray, out_dir: str) -> dict:
+    gyro = raw[:, 3:6]
+    bias = gyro.mean(axis=0)
+    noise = gyro.std(axis=0)
+    if np.any(noise > STILL_DPS):
+        raise ValueError(f"sensor moved during recording (std {noise.round(2)} dps)")
+    result = {
+        "GX_OFFSET": round(float(bias[0]), 5),
+        "GY_OFFSET": round(float(bias[1]), 5),
+        "GZ_OFFSET": round(float(bias[2]), 5),
+        "NOISE_DPS": np.round(noise, 5).tolist(),
+        "SAMPLES":   int(len(gyro)),
+    }
+    _write("gyro_offsets.json", result, out_dir)
+    return result
+
+
+def _plot_mag(raw: np.ndarray, corrected: np.ndarray, out_dir: str) -> None:
+    """Scatter plots like mag_data_raw.png / mag_data_corrected.png (needs matplotlib)."""
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib not installed – skipping plots")
+        return
+    for data, name in ((raw, "mag_data_raw.png"), (corrected, "mag_data_corrected.png")):
+        fig, ax = plt.subplots(figsize=(6, 6))
+        for (i, j), lbl in (((0, 1), "XY"), ((0, 2), "XZ"), ((1, 2), "YZ")):
+            ax.scatter(data[:, i], data[:, j], s=2, label=lbl)
+        ax.set_aspect("equal")
+        ax.legend()
+        ax.set_xlabel("µT")
+        ax.set_ylabel("µT")
+        fig.savefig(os.path.join(out_dir, name), dpi=100)
+        plt.close(fig)
+        print(f"wrote {os.path.join(out_dir, name)}")
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Record raw sensor data and fit calibrations.")
+    ap.add_argument("sensor", choices=("mag", "accel", "gyro"))
+    ap.add_argument("--seconds", type=float, default=None, help="recording time")
+    ap.add_argument("--rate", type=float, default=50.0, help="sample rate in Hz")
+    ap.add_argument("--out-dir", default=CALIB_DIR, help="where the JSON files go")
+    ap.add_argument("--save", help="also save the raw samples to this .npy file")
+    ap.add_argument("--load", help="fit samples from this .npy file instead of recording")
+    ap.add_argument("--plot", action="store_true", help="mag: write raw/corrected PNGs")
+    args = ap.parse_args()
+
+    seconds = args.seconds or {"mag": 60, "accel": 60, "gyro": 10}[args.sensor]
+    if args.load:
+        raw = np.load(args.load)
+    elif args.sensor == "mag":
+        raw = _record_mag(seconds, args.rate)
+    else:
+        raw = _record_imu(seconds, args.rate)
+    if args.save:
+        np.save(args.save, raw)
+
+    if args.sensor == "mag":
+        result = calibrate_mag(raw, args.out_dir, args.plot)
+    elif args.sensor == "accel":
+        result = calibrate_accel(raw, args.out_dir)
+    else:
+        result = calibrate_gyro(raw, args.out_dir)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
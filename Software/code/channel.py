@@ -0,0 +1,106 @@
+# ---------------------------------------------------------------------------
+# channel.py – bounded producer/consumer hand-off between threads
+# ---------------------------------------------------------------------------
+# • SnapshotChannel: bounded FIFO, batch draining, overflow policy
+#     "drop_oldest" – the producer never blocks, the oldest item is dropped
+#     "block"       – backpressure, the producer waits for free space
+# • LatencyStats: rolling avg / p95 / max of end-to-end latencies
+# ---------------------------------------------------------------------------
+from __future__ import annotations
+
+import collections
+import threading
+import time
+
+POLICIES = ("drop_oldest", "block")
+
+
+class LatencyStats:
+    """Collects latency samples (s) and summarises them per report window."""
+
+    def __init__(self, maxlen: int = 2048):
+        self._samples: collections.deque = collections.deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def summary(self, reset: bool = True) -> dict:
+        """avg / p50 / p95 / p99 / max in ms over the samples since the last reset."""
+        with self._lock:
+            data = sorted(self._samples)
+            if reset:
+                self._samples.clear()
+        if not data:
+            return {"n": 0, "avg_ms": None, "p50_ms": None, "p95_ms": None,
+                    "p99_ms": None, "max_ms": None}
+
+        def pct(q: float) -> float:
+            return round(data[min(len(data) - 1, int(len(data) * q))] * 1000, 2)
+
+        return {
+            "n":      len(data),
+            "avg_ms": round(sum(data) / len(data) * 1000, 2),
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": round(data[-1] * 1000, 2),
+        }
+
+
+class SnapshotChannel:
+    """Bounded FIFO with batch get and a configurable overflow policy."""
+
+    def __init__(self, maxsize: int = 256, policy: str = "drop_oldest"):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown channel policy '{policy}'")
+        self.maxsize = max(1, int(maxsize))
+        self.policy = policy
+        self._items: collections.deque = collections.deque()
+        self._cond = threading.Condition()
+        self.drops = 0             # items discarded by drop_oldest
+        self.blocked_s = 0.0       # producer time spent waiting (block)
+        self.max_depth = 0         # high-water mark since the last stats()
+        self.latency = LatencyStats()
+
+    def put(self, item) -> None:
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                if self.policy == "drop_oldest":
+                    self._items.popleft()
+                    self.drops += 1
+                else:
+                    t0 = time.monotonic()
+                    self._cond.wait_for(lambda: len(self._items) < self.maxsize)
+                    self.blocked_s += time.monotonic() - t0
+            self._items.append(item)
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._cond.notify_all()
+
+    def get_batch(self, max_items: int = 32, timeout: float | None = None) -> list:
+        """Wait for at least one item, then take up to max_items at once."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout):
+                return []
+            n = min(max_items, len(self._items))
+            batch = [self._items.popleft() for _ in range(n)]
+            self._cond.notify_all()          # wake a blocked producer
+            return batch
+
+    def depth(self) -> int:
+        return len(self._items)
+
+    def stats(self, reset: bool = True) -> dict:
+        """Queue depth, high-water mark, drops and end-to-end latency."""
+        with self._cond:
+            out = {
+                "depth":     len(self._items),
+                "max_depth": self.max_depth,
+                "drops":     self.drops,
+                "blocked_s": round(self.blocked_s, 3),
+            }
+            if reset:
+                self.max_depth = len(self._items)
+        out["latency"] = self.latency.summary(reset)
+        return out
@@ -11,6 +11,7 @@ device_type = "hub"  # options: "boat", "buoy", "hub"
 # ---------------------------------------------------------------------------
 # debug logging control (set to false to disable debug logging)
 log_debug = True
+log_queue_size = 10000  # records buffered for the log writer thread (dropped when full, never blocks)
 
 
 # ---------------------------------------------------------------------------
@@ -25,12 +26,70 @@ device_orientation = 1
 # ---------------------------------------------------------------------------
 # Update-rates / damping, filtering
 # ---------------------------------------------------------------------------
-livedata_freq = 10     # Hz   – max live data updates per second
+live_batch_window = 0.2   # s  – live snapshots of this window go out as one MQTT array (0 = one message per snapshot)
+live_encoding = "json"    # "json" → <device>live | "compact" → binary frames on <device>livebin (hub: livebridge.py)
+live_compress = True      # zlib-deflate compact frames
+spool_enabled = True      # spool live payloads to disk while the broker is unreachable
+spool_dir = "/home/globaladmin/data/spool"
+spool_max_mb = 64         # MB  – disk limit, the oldest spooled data is dropped first
+spool_replay_rate = 10    # msg/s – catch-up rate on <device>backfill after reconnect
 interim_freq = 10   # Hz   – interim data updates per second (before GPS fix)
 battery_read_freq  = 2.0    # s – time between battery measurements
+imu_sample_rate   = 50     # Hz – imu sampler thread (latest-value cache)
+mag_sample_rate   = 20     # Hz – magnetometer sampler thread
+mag_continuous    = True   # MMC5603 measures on its own at mag_odr, a reader thread buffers every sample
+mag_odr           = 50     # Hz – MMC5603 internal rate in continuous mode (1…1000)
+mag_set_period    = 100    # measurements between SET pulses (1, 25, 75, 100, 250, 500, 1000, 2000)
+mag_buffer_s      = 10     # s  – timestamped magnetometer ring buffer
+wind_sample_rate  = 4      # Hz – wind sensor sampler thread
+wind_reader       = True   # background thread parses every MWV sentence into a ring buffer
+wind_buffer_s     = 600    # s  – wind history kept by the reader
+wind_window_s     = 10     # s  – mean / gust / lull window added to each wind sample
+wifi_interface    = "wlan0"
+wifi_sample_rate  = 1      # Hz – Wi-Fi link state / RSSI sampler (cached for every snapshot)
+wifi_history_s    = 120    # s  – RSSI history for link-quality trends (modules.wifi_link.get_trend)
+ahrs_rate         = 26     # Hz – 9-DOF fusion thread wake-ups (fifo mode; without fifo it runs at imu_odr)
+ahrs_gain         = 0.5    # imufusion filter gain
+ahrs_use_mag      = True   # fuse MMC5603 readings (False = gyro/accel only, heading drifts)
+
+snap_queue_size   = 256            # snapshots buffered between GPS thread and consumer
+snap_queue_policy = "drop_oldest"  # "drop_oldest" (never stall GPS) or "block" (backpressure)
+snap_batch_max    = 32             # snapshots handled per consumer wake-up
+pipeline_stats_interval = 30       # s – queue depth / drops / latency report
 
 GPS_UPDATE = 10   # HZ - supported: 1, 2, 5, 10, 15, 20, 25
 GPS_MAX_SPEED_KNOTS = 20.0  # knots – max speed for GPS filtering and validation
+GPS_PROTOCOL = "nmea"  # "nmea" (RMC/GGA text) or "ubx" (binary NAV-PVT, less CPU at 20-25 Hz)
+GPS_RATE_CHECK = 3.0   # s – measure the achieved GPS rate after init (0 = off)
+
+# imu (lsm6dso)
+imu_odr       = 104    # Hz   – supported: 12.5, 26, 52, 104, 208, 416, 833
+imu_accel_fs  = 2      # g    – supported: 2, 4, 8, 16
+imu_gyro_fs   = 250    # dps  – supported: 125, 250, 500, 1000, 2000
+imu_fifo      = True   # drain the hardware FIFO from a background thread
+imu_buffer_s  = 10     # s    – history kept in the FIFO ring buffer
+
+
+# ---------------------------------------------------------------------------
+# SQLite logging
+# ---------------------------------------------------------------------------
+db_dir             = "/home/globaladmin/data"  # datalog_<identifier>.db
+db_batch_rows      = 50        # rows – commit once this many snapshots are pending
+db_batch_interval  = 1.0       # s    – ... or at the latest after this time
+db_pending_max     = 1000      # rows – kept for retry after a failed commit, oldest dropped beyond
+db_synchronous     = "NORMAL"  # SQLite synchronous level: OFF, NORMAL, FULL
+db_stats_interval  = 30        # s    – rows/s + commit latency report and WAL checkpoint
+db_segment_per_session = True  # seal the previous run's datalog_<identifier>.db at start-up
+db_segment_max_mb  = 32        # MB   – seal the running segment at this size (0 = off)
+db_segment_max_s   = 3600      # s    – ... or after this time window (0 = off)
+db_keep_segments   = 0         # sealed segments kept in datalog_<identifier>/ (0 = all)
+
+
+# ---------------------------------------------------------------------------
+# Metrics (loop period / work time / jitter, queue depths, error counters)
+# ---------------------------------------------------------------------------
+metrics_interval = 10          # s – publish on <device>metrics and rewrite the file (0 = off)
+metrics_file     = "/home/globaladmin/data/metrics.prom"  # Prometheus text format ("" = off)
 
 
 # ---------------------------------------------------------------------------
@@ -51,6 +110,10 @@ led_b = 12
 # mqtt broker settings
 mqtt_broker = "hub.local"
 mqtt_port = 1883
+mqtt_qos = 0                # QoS of live/status publishes
+mqtt_max_inflight = 20      # unacknowledged QoS>0 messages before the publisher waits
+mqtt_out_queue = 64         # live frames buffered for the publisher thread (oldest dropped when full)
+mqtt_stats_interval = 30    # s – publisher latency/drop report
 mqtt_boatlive = "boatlive"
 mqtt_boatcontrol = "boatcontrol"
 mqtt_boatstatus = "boatstatus"
@@ -13,22 +13,49 @@
 # Additions:
 #   • MQTT topics receive a prefix from config.device_type
 #     (boat / buoy / hub) -> boatlive / buoycontrol / …
-#   • _flatten_all() now also processes “imu”
+#   • _flatten_all() now also processes “imu” and “ahrs” (fused pitch/roll/heading
+#     override the accel-only / compass values)
 #   • During a delete operation the DB is completely removed and recreated
 #   • Write errors in the DB are reported via `log_db_error`
 #   • The queue is cleared when deleting
+#   • Group commit: rows are batched (executemany) and committed by row count
+#     or time budget, the DB runs in WAL mode (config.db_*)
+#   • Live stream is batched: every snapshot of a config.live_batch_window is
+#     published as one JSON array (Node-RED "Split if Array" unpacks it)
+#   • Optional compact binary live frames (config.live_encoding = "compact")
+#     on *livebin, see livecodec.py – the hub bridge turns them back into
+#     JSON arrays on *live
+#   • Store-and-forward: live payloads that cannot be sent (broker offline)
+#     go to a disk spool (spool.py) and are replayed on *backfill at
+#     config.spool_replay_rate once the connection is back
+#   • All live/status publishes go through a bounded outbound queue served by
+#     one publisher thread (mqtt_publisher) – a slow broker or Wi-Fi stall
+#     drops the oldest live frames instead of blocking the sensor/DB path
+#   • Loop/queue metrics (metrics.py) every config.metrics_interval on
+#     *metrics and as a Prometheus text file (config.metrics_file)
+#   • Session segments: datalog_<id>.db only holds the running segment; at
+#     start-up, by size or by time window it is sealed (read-only) into
+#     datalog_<id>/seg_<seq>.db and listed in datalog_<id>/manifest.json.
+#     Deleting the log drops segment files instead of rewriting a big DB
 # ---------------------------------------------------------------------------
 from __future__ import annotations
 
+import collections
 import json
 import logging
 import os
 import queue
 import sqlite3
+import threading
 import time
 import uuid
 
 import paho.mqtt.client as mqtt
+import livecodec
+import metrics
+import modules
+import spool
+from channel import LatencyStats, SnapshotChannel
 from config import config
 
 # ---------------------------------------------------------------------------
@@ -46,6 +73,10 @@ _prefix      = config.device_type.lower()           # boat | buoy | hub
 MQTT_LIVE    = f"{_prefix}live"
 MQTT_CONTROL = f"{_prefix}control"
 MQTT_STATUS  = f"{_prefix}status"
+MQTT_LIVEBIN = f"{_prefix}livebin"                  # compact live frames
+MQTT_BACKFILL    = f"{_prefix}backfill"              # replayed spool (JSON)
+MQTT_BACKFILLBIN = f"{_prefix}backfillbin"           # replayed spool (compact)
+MQTT_METRICS     = f"{_prefix}metrics"               # loop/queue metrics
 
 # ---------------------------------------------------------------------------
 # Runtime flags & shared state
@@ -71,7 +102,7 @@ mqtt_client = mqtt.Client(client_id=str(uuid.uuid4()), clean_session=True)
 # ---------------------------------------------------------------------------
 def _flatten_all(data: dict) -> None:
     """Promote sensor sub-dicts to top level without renaming keys."""
-    for blk in ("gps", "gyro", "imu", "mag", "bat", "wind"):
+    for blk in ("gps", "gyro", "imu", "mag", "ahrs", "bat", "wind"):
         sub = data.pop(blk, None)
         if isinstance(sub, dict):
             data.update(sub)
@@ -79,15 +110,20 @@ def _flatten_all(data: dict) -> None:
 # ---------------------------------------------------------------------------
 # Data transfer from main.py
 # ---------------------------------------------------------------------------
-_last_publish = 0.0        # monotonic time for 10 Hz throttle
+LIVE_BATCH_WINDOW = float(getattr(config, "live_batch_window", 0.2))  # s, 0 = no batching
+LIVE_ENCODING     = getattr(config, "live_encoding", "json")            # json | compact
+LIVE_COMPRESS     = bool(getattr(config, "live_compress", True))        # zlib compact frames
+
+_live_batch: list[dict] = []     # snapshots waiting for the next live frame
+_live_lock  = threading.Lock()
 
 def datatransfer(snapshot: dict, wifi_status: bool) -> None:
     """
     * Flatten snapshot
     * Queue for DB logger
-    * Publish (throttled) on MQTT_LIVE
+    * Collect for the batched MQTT_LIVE frame (see live_publisher)
     """
-    global wifi_conn, latest_data, _last_publish
+    global wifi_conn, latest_data
 
     _flatten_all(snapshot)
 
@@ -98,12 +134,180 @@ def datatransfer(snapshot: dict, wifi_status: bool) -> None:
     latest_data = snapshot
     data_queue.put(snapshot)
 
-    if streamdata and time.time() - _last_publish >= 0.1:
-        _last_publish = time.time()
+    if not streamdata:
+        return
+    if LIVE_BATCH_WINDOW <= 0:
+        _publish_live(snapshot)
+        return
+    with _live_lock:
+        _live_batch.append(snapshot)
+
+def _publish_live(payload) -> None:
+    """Encode a live payload and hand it to the outbound queue."""
+    try:
+        if LIVE_ENCODING == "compact":
+            records = payload if isinstance(payload, list) else [payload]
+            kind, topic = spool.KIND_COMPACT, MQTT_LIVEBIN
+            data = livecodec.encode(records, LIVE_COMPRESS)
+        else:
+            kind, topic = spool.KIND_JSON, MQTT_LIVE
+            data = json.dumps(payload, default=str).encode()
+    except Exception as exc:
+        logger.error("Live encode error: %s", exc)
+        return
+    _outbox.put((topic, data, kind, time.monotonic()))
+
+# ---------------------------------------------------------------------------
+# Outbound queue – the only place that publishes live/status messages
+# ---------------------------------------------------------------------------
+MQTT_QOS            = int(getattr(config, "mqtt_qos", 0))
+MQTT_MAX_INFLIGHT   = int(getattr(config, "mqtt_max_inflight", 20))
+MQTT_OUT_QUEUE      = int(getattr(config, "mqtt_out_queue", 64))
+MQTT_STATS_INTERVAL = float(getattr(config, "mqtt_stats_interval", 30))
+
+# (topic, payload, spool kind | None, t_enqueued)
+_outbox = SnapshotChannel(MQTT_OUT_QUEUE, "drop_oldest")       # live frames
+_outbox_ctrl: collections.deque = collections.deque(maxlen=16)  # status – never dropped for live
+mqtt_latency = LatencyStats()    # enqueue → handed to the socket (QoS 0) / acked (QoS>0)
+
+# publisher statistics (reported via debug log and status topic)
+mqtt_stats = {"sent": 0, "failed": 0, "drops": 0, "pub_ms_avg": None, "pub_ms_p95": None}
+
+def _reap_inflight(inflight: collections.deque) -> None:
+    """Account for acknowledged QoS>0 messages; wait while the window is full."""
+    now = time.monotonic()
+    while inflight and inflight[0][0].is_published():
+        mqtt_latency.add(now - inflight.popleft()[1])
+    while len(inflight) >= MQTT_MAX_INFLIGHT:
+        info, t_enq = inflight.popleft()
         try:
-            mqtt_client.publish(MQTT_LIVE, json.dumps(snapshot, default=str))
+            info.wait_for_publish(timeout=5)
+        except Exception:
+            pass                           # disconnected – paho resends later
+        if info.is_published():
+            mqtt_latency.add(time.monotonic() - t_enq)
+
+def _send(item: tuple, inflight: collections.deque) -> None:
+    topic, data, kind, t_enq = item
+    if kind is not None and _spool is not None and not mqtt_client.is_connected():
+        _spool_append(kind, data)          # offline → disk
+        return
+    if MQTT_QOS:
+        _reap_inflight(inflight)
+    try:
+        info = mqtt_client.publish(topic, data, qos=MQTT_QOS)
+        ok = info.rc == mqtt.MQTT_ERR_SUCCESS
+    except Exception as exc:
+        logger.error("MQTT publish error: %s", exc)
+        ok = False
+    if not ok:
+        mqtt_stats["failed"] += 1
+        if kind is not None and _spool is not None:
+            _spool_append(kind, data)
+        return
+    mqtt_stats["sent"] += 1
+    if MQTT_QOS:
+        inflight.append((info, t_enq))
+    else:
+        mqtt_latency.add(time.monotonic() - t_enq)
+
+def mqtt_publisher() -> None:
+    """Drain the outbound queues: status first, then live frames in batches."""
+    inflight: collections.deque = collections.deque()
+    next_report = time.monotonic() + MQTT_STATS_INTERVAL
+    m = metrics.loop("mqtt_publisher")
+    while True:
+        batch = _outbox.get_batch(32, timeout=0.1)
+        t = m.begin()
+        failed = mqtt_stats["failed"]
+        while _outbox_ctrl:
+            _send(_outbox_ctrl.popleft(), inflight)
+        for item in batch:
+            _send(item, inflight)
+        m.error(mqtt_stats["failed"] - failed)
+        m.end(t)
+
+        now = time.monotonic()
+        if now >= next_report:
+            st = _outbox.stats()
+            lat = mqtt_latency.summary()
+            mqtt_stats.update(drops=st["drops"], pub_ms_avg=lat["avg_ms"],
+                              pub_ms_p95=lat["p95_ms"])
+            logger.debug("MQTT publisher: sent=%d failed=%d drops=%d depth=%d/%d "
+                         "inflight=%d publish avg=%s p95=%s max=%s ms",
+                         mqtt_stats["sent"], mqtt_stats["failed"], st["drops"],
+                         st["max_depth"], MQTT_OUT_QUEUE, len(inflight),
+                         lat["avg_ms"], lat["p95_ms"], lat["max_ms"])
+            next_report = now + MQTT_STATS_INTERVAL
+
+# ---------------------------------------------------------------------------
+# Store-and-forward spool – live payloads sent while offline
+# ---------------------------------------------------------------------------
+SPOOL_ENABLED     = bool(getattr(config, "spool_enabled", True))
+SPOOL_DIR         = getattr(config, "spool_dir", "/home/globaladmin/data/spool")
+SPOOL_MAX_BYTES   = int(float(getattr(config, "spool_max_mb", 64)) * 1024 * 1024)
+SPOOL_REPLAY_RATE = float(getattr(config, "spool_replay_rate", 10))   # msg/s
+
+_spool: spool.Spool | None = None
+
+def init_spool() -> None:
+    """Open (or recover) the on-disk spool; failures disable spooling."""
+    global _spool
+    if not SPOOL_ENABLED:
+        return
+    try:
+        _spool = spool.Spool(SPOOL_DIR, SPOOL_MAX_BYTES)
+        if _spool.depth():
+            logger.debug("Spool opened with %d unsent records", _spool.depth())
+    except Exception as exc:
+        logger.error("Spool init error: %s – spooling disabled", exc)
+        _spool = None
+
+def _spool_append(kind: int, data: bytes) -> None:
+    try:
+        _spool.append(kind, data)
+    except Exception as exc:
+        logger.error("Spool write error: %s", exc)
+
+def backfill_publisher() -> None:
+    """Replay spooled payloads on *backfill at SPOOL_REPLAY_RATE while online.
+
+    Live frames keep going straight to *live during catch-up; the backlog
+    has its own topic and a capped rate so it never delays the live stream.
+    """
+    if _spool is None:
+        return
+    period = 1.0 / SPOOL_REPLAY_RATE if SPOOL_REPLAY_RATE > 0 else 1.0
+    while True:
+        rec = _spool.peek() if mqtt_client.is_connected() else None
+        if rec is None:
+            time.sleep(1.0)
+            continue
+        kind, data = rec
+        topic = MQTT_BACKFILLBIN if kind == spool.KIND_COMPACT else MQTT_BACKFILL
+        try:
+            if mqtt_client.publish(topic, data).rc == mqtt.MQTT_ERR_SUCCESS:
+                _spool.advance()
         except Exception as exc:
-            logger.error("MQTT publish error: %s", exc)
+            logger.error("Backfill publish error: %s", exc)
+        time.sleep(period)
+
+# ---------------------------------------------------------------------------
+# Live publisher – one array message per batch window
+# ---------------------------------------------------------------------------
+def live_publisher() -> None:
+    """Every LIVE_BATCH_WINDOW publish all collected snapshots as one array."""
+    global _live_batch
+    if LIVE_BATCH_WINDOW <= 0:
+        return
+    next_due = time.monotonic()
+    while True:
+        next_due += LIVE_BATCH_WINDOW
+        time.sleep(max(0.0, next_due - time.monotonic()))
+        with _live_lock:
+            batch, _live_batch = _live_batch, []
+        if batch and streamdata:
+            _publish_live(batch)
 
 # ---------------------------------------------------------------------------
 # MQTT background loop – listens for control JSON
@@ -118,6 +322,7 @@ def mqtt_loop() -> None:
 
     def on_message(_c, _ud, msg):
         global streamdata, logdata, deletelog
+        t = m.begin()
         try:
             if msg.topic != MQTT_CONTROL:
                 return
@@ -128,16 +333,22 @@ def mqtt_loop() -> None:
             logger.debug("Control: stream=%s log=%s delete=%s",
                          streamdata, logdata, deletelog)
         except Exception as exc:
+            m.error()
             logger.error("MQTT control parse error: %s", exc)
+        finally:
+            m.end(t)
 
+    m = metrics.loop("mqtt_loop")      # one iteration per control message
     mqtt_client.on_connect = on_connect
     mqtt_client.on_message = on_message
+    mqtt_client.max_inflight_messages_set(MQTT_MAX_INFLIGHT)
 
     while True:
         try:
             mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
             mqtt_client.loop_forever()
         except Exception as exc:
+            m.error()
             logger.error("MQTT connection error: %s", exc)
             time.sleep(5)
 
@@ -154,22 +365,93 @@ def publish_boatstatus() -> None:
                 "deletelogstatus": deletelogstatus,
                 "log_db_error":    log_db_error,
                 "batperc":         latest_data.get("batperc"),
+                "db_rows_per_s":   db_stats["rows_per_s"],
+                "db_commit_ms":    db_stats["commit_ms_avg"],
+                "spool_depth":     _spool.depth() if _spool else 0,
+                "mqtt_drops":      mqtt_stats["drops"],
+                "mqtt_pub_ms":     mqtt_stats["pub_ms_avg"],
             })
-            mqtt_client.publish(MQTT_STATUS, status_json)
-            logger.debug("Boat status sent")
+            _outbox_ctrl.append((MQTT_STATUS, status_json, None, time.monotonic()))
+            logger.debug("Boat status queued")
         except Exception as exc:
             logger.error("Boat status error: %s", exc)
         time.sleep(2)
 
+# ---------------------------------------------------------------------------
+# Metrics – compact JSON on *metrics + Prometheus text file for the hub
+# ---------------------------------------------------------------------------
+METRICS_INTERVAL = float(getattr(config, "metrics_interval", 10))   # s, 0 = off
+METRICS_FILE     = getattr(config, "metrics_file", "/home/globaladmin/data/metrics.prom")
+
+def _register_gauges() -> None:
+    metrics.gauge("db_queue_depth",    data_queue.qsize)
+    metrics.gauge("db_pending_rows",   lambda: len(_pending))
+    metrics.gauge("db_rows_dropped",   lambda: db_stats["rows_dropped"])
+    metrics.gauge("mqtt_outbox_depth", _outbox.depth)
+    metrics.gauge("mqtt_outbox_drops", lambda: _outbox.drops)
+    metrics.gauge("mqtt_connected",    mqtt_client.is_connected)
+    metrics.gauge("spool_depth",       lambda: _spool.depth() if _spool else 0)
+    metrics.gauge("db_segments",       segment_count)
+
+def metrics_publisher() -> None:
+    """Every METRICS_INTERVAL: queue the window snapshot and rewrite the text file."""
+    if METRICS_INTERVAL <= 0:
+        return
+    labels = {"id": config.identifier}
+    while True:
+        time.sleep(METRICS_INTERVAL)
+        try:
+            payload = json.dumps({"id": config.identifier, "interval": METRICS_INTERVAL,
+                                  **metrics.snapshot()}, separators=(",", ":"))
+            _outbox_ctrl.append((MQTT_METRICS, payload, None, time.monotonic()))
+            if METRICS_FILE:
+                metrics.write_textfile(METRICS_FILE, labels)
+        except Exception as exc:
+            logger.error("Metrics export error: %s", exc)
+
 # ---------------------------------------------------------------------------
 # SQLite – file path & init
 # ---------------------------------------------------------------------------
-DB_FILE = f"/home/globaladmin/data/datalog_{config.identifier}.db"
+DB_DIR  = getattr(config, "db_dir", "/home/globaladmin/data")
+DB_FILE = os.path.join(DB_DIR, f"datalog_{config.identifier}.db")
 conn, cursor = None, None
 
+DB_BATCH_ROWS     = int(getattr(config, "db_batch_rows", 50))
+DB_BATCH_INTERVAL = float(getattr(config, "db_batch_interval", 1.0))
+DB_PENDING_MAX    = int(getattr(config, "db_pending_max", 20 * DB_BATCH_ROWS))
+DB_SYNCHRONOUS    = str(getattr(config, "db_synchronous", "NORMAL")).upper()
+DB_STATS_INTERVAL = float(getattr(config, "db_stats_interval", 30))
+
+# column order of the logdata table – shared by CREATE and INSERT
+DB_COLUMNS = (
+    "datetime", "status", "lat", "long", "SOG", "COG",
+    "fixQ", "nSat", "HDOP", "alt", "id", "validtime",
+    "batvolt", "batperc",
+    "wifi_conn", "wifi_signal_strength",
+    "acc_x", "acc_y", "acc_z",
+    "gyro_x", "gyro_y", "gyro_z",
+    "pitch", "roll",
+    "mag_x", "mag_y", "mag_z", "heading",
+    "w_speed", "w_angle", "w_speed_kts", "true_wind_dir",
+)
+_INSERT_SQL = (
+    f"INSERT INTO logdata ({','.join(DB_COLUMNS)}) "
+    f"VALUES ({','.join('?' * len(DB_COLUMNS))})"
+)
+
+# group-commit state – guarded by _db_lock (writer, delete-log, shutdown)
+_db_lock = threading.RLock()
+_pending: list[tuple] = []
+_pending_ts: list[float] = []    # ts_monotonic per pending row (fix→commit latency)
+db_latency = LatencyStats()
+
+# writer statistics (reported via debug log and status topic)
+db_stats = {"rows_per_s": 0.0, "commit_ms_avg": 0.0, "commit_ms_max": 0.0,
+            "rows_dropped": 0}
+
 def init_db() -> None:
     """Open DB and, if it does not yet exist, create the complete schema."""
-    global conn, cursor
+    global conn, cursor, _segment_opened
     os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
 
     need_create = not os.path.exists(DB_FILE)
@@ -177,6 +459,15 @@ def init_db() -> None:
     conn   = sqlite3.connect(DB_FILE, check_same_thread=False)
     cursor = conn.cursor()
 
+    # WAL: readers (rsync, debugprint) never block the writer and a commit
+    # only appends to the -wal file instead of rewriting pages in place.
+    cursor.execute("PRAGMA journal_mode=WAL")
+    if DB_SYNCHRONOUS in ("OFF", "NORMAL", "FULL", "EXTRA"):
+        cursor.execute(f"PRAGMA synchronous={DB_SYNCHRONOUS}")
+    else:
+        logger.error("Invalid db_synchronous '%s' – keeping SQLite default",
+                     DB_SYNCHRONOUS)
+
     if need_create:
         cursor.execute("""
         CREATE TABLE logdata (
@@ -203,66 +494,369 @@ def init_db() -> None:
         logger.debug("SQLite created: %s", DB_FILE)
     else:
         logger.debug("SQLite opened:  %s", DB_FILE)
+    # user_version = sequence number the segment will get when sealed, so a
+    # reader (logexport) knows which segment a rowid belongs to
+    cursor.execute(f"PRAGMA user_version={_live_seq()}")
+    _segment_opened = time.monotonic()
+
+# ---------------------------------------------------------------------------
+# Group commit – one executemany + one commit per batch
+# ---------------------------------------------------------------------------
+_commit_count = 0
+_commit_ms_sum = 0.0
+
+def _db_row(data: dict) -> tuple | None:
+    """Turn a queued snapshot into an INSERT row (None → skip)."""
+    _flatten_all(data)
+
+    if "wifi_signal_strength" not in data and "wifi_rssi" in data:
+        data["wifi_signal_strength"] = data.pop("wifi_rssi")
+
+    if not (data.get("validtime") and logdata):
+        logger.debug("DB skip (validtime=%s logdata=%s)",
+                     data.get("validtime"), logdata)
+        return None
+
+    row = []
+    for col in DB_COLUMNS:
+        v = data.get(col)
+        row.append(None if v == "" else v)
+    return tuple(row)
+
+def _queue_row(data: dict) -> None:
+    row = _db_row(data)
+    if row is not None:
+        _pending.append(row)
+        _pending_ts.append(data.get("ts_monotonic"))
+
+def flush_db() -> int:
+    """
+    Write all pending rows in one transaction (safe from any thread) and
+    return the number of rows committed. On an error the batch stays pending
+    and is retried by the next flush; beyond DB_PENDING_MAX rows the oldest
+    are dropped so a database that stays broken cannot eat the memory.
+    """
+    global log_db_error, _commit_count, _commit_ms_sum
+    with _db_lock:
+        if not _pending or conn is None:
+            return 0
+        t0 = time.perf_counter()
+        rows = len(_pending)
+        try:
+            cursor.executemany(_INSERT_SQL, _pending)
+            conn.commit()
+            log_db_error = False
+            modules.mark("first_logged_fix")
+            logger.debug("DB commit OK (%d rows)", rows)
+            done = time.monotonic()
+            for ts in _pending_ts:
+                if ts is not None:
+                    db_latency.add(done - ts)
+            _pending.clear()
+            _pending_ts.clear()
+        except Exception as exc:
+            rows = 0
+            log_db_error = True
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            drop = len(_pending) - DB_PENDING_MAX
+            if drop > 0:
+                del _pending[:drop]
+                del _pending_ts[:drop]
+                db_stats["rows_dropped"] += drop
+            logger.error("SQLite insert error: %s (%d rows kept for retry, %d dropped)",
+                         exc, len(_pending), max(drop, 0))
+        ms = (time.perf_counter() - t0) * 1000
+        _commit_count += 1
+        _commit_ms_sum += ms
+        db_stats["commit_ms_max"] = max(db_stats["commit_ms_max"], ms)
+        return rows
+
+def _report_db_stats(rows: int, elapsed: float) -> None:
+    """Publish rows/s + commit latency and checkpoint the WAL."""
+    global _commit_count, _commit_ms_sum
+    with _db_lock:
+        db_stats["rows_per_s"]    = round(rows / elapsed, 1) if elapsed else 0.0
+        db_stats["commit_ms_avg"] = round(_commit_ms_sum / _commit_count, 2) \
+                                    if _commit_count else 0.0
+        db_stats["commit_ms_max"] = round(db_stats["commit_ms_max"], 2)
+        lat = db_latency.summary()
+        logger.debug("DB writer: %.1f rows/s, %d commits, commit avg %.2f ms max %.2f ms, "
+                     "fix→commit avg=%s p95=%s max=%s ms",
+                     db_stats["rows_per_s"], _commit_count,
+                     db_stats["commit_ms_avg"], db_stats["commit_ms_max"],
+                     lat["avg_ms"], lat["p95_ms"], lat["max_ms"])
+        _commit_count, _commit_ms_sum = 0, 0.0
+        db_stats["commit_ms_max"] = 0.0
+
+        # keep the main file current for rsync, which copies only the .db
+        try:
+            cursor.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        except Exception as exc:
+            logger.error("SQLite checkpoint error: %s", exc)
+
+def close_db() -> None:
+    """Drain the queue, commit everything and close the DB (shutdown)."""
+    global conn, cursor
+    with _db_lock:
+        while True:
+            try:
+                data = data_queue.get_nowait()
+            except queue.Empty:
+                break
+            _queue_row(data)
+            data_queue.task_done()
+        flush_db()
+        if conn:
+            try:
+                cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except Exception as exc:
+                logger.error("SQLite checkpoint error: %s", exc)
+            conn.close()
+            conn, cursor = None, None
+            logger.debug("SQLite closed: %s", DB_FILE)
+
+# ---------------------------------------------------------------------------
+# Session segments – sealed, immutable DB files + manifest
+# ---------------------------------------------------------------------------
+SEG_DIR         = os.path.join(DB_DIR, f"datalog_{config.identifier}")
+MANIFEST_FILE   = os.path.join(SEG_DIR, "manifest.json")
+SEG_MAX_BYTES   = int(float(getattr(config, "db_segment_max_mb", 32)) * 1024 * 1024)
+SEG_MAX_S       = float(getattr(config, "db_segment_max_s", 3600))
+SEG_PER_SESSION = bool(getattr(config, "db_segment_per_session", True))
+SEG_KEEP        = int(getattr(config, "db_keep_segments", 0))
+
+_seg_lock = threading.Lock()        # manifest + segment files (after _db_lock)
+_segment_opened = time.monotonic()  # start of the running segment
+
+_SEG_STATS_SQL = "SELECT COUNT(*), MIN(datetime), MAX(datetime) FROM logdata"
+
+def _segment_stats(path: str) -> tuple[int, str | None, str | None]:
+    """Rows and first/last GPS datetime of a sealed segment file."""
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return db.execute(_SEG_STATS_SQL).fetchone()
+    finally:
+        db.close()
+
+def _finalise(path: str) -> tuple[int, str | None, str | None]:
+    """
+    Fold the WAL into the file and switch it to rollback-journal mode, so the
+    sealed copy is one self-contained file that readers open without -wal/-shm.
+    """
+    db = sqlite3.connect(path)
+    try:
+        db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        db.execute("PRAGMA journal_mode=DELETE")
+        return db.execute(_SEG_STATS_SQL).fetchone()
+    finally:
+        db.close()
+
+def _load_manifest() -> dict:
+    """Manifest, completed with segment files a crash left unlisted (_seg_lock held)."""
+    try:
+        with open(MANIFEST_FILE) as fh:
+            man = json.load(fh)
+    except FileNotFoundError:
+        man = {"device": config.identifier, "next_seq": 1, "segments": []}
+
+    listed = {s["file"] for s in man["segments"]}
+    n_listed = len(man["segments"])
+    if os.path.isdir(SEG_DIR):
+        for name in sorted(os.listdir(SEG_DIR)):
+            if name.startswith("seg_") and name.endswith(".db") and name not in listed:
+                path = os.path.join(SEG_DIR, name)
+                rows, start, end = _segment_stats(path)
+                man["segments"].append({"file": name, "seq": int(name[4:-3]),
+                                        "rows": rows, "start": start, "end": end,
+                                        "bytes": os.path.getsize(path), "sealed_at": None})
+                logger.error("Segment %s missing in manifest – re-added", name)
+    man["segments"].sort(key=lambda s: s["seq"])
+    if man["segments"]:
+        man["next_seq"] = max(man["next_seq"], man["segments"][-1]["seq"] + 1)
+    if len(man["segments"]) != n_listed:
+        _write_manifest(man)
+    return man
+
+def _write_manifest(man: dict) -> None:
+    tmp = MANIFEST_FILE + ".tmp"
+    with open(tmp, "w") as fh:
+        json.dump(man, fh, indent=1)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, MANIFEST_FILE)
+
+def seal_segment(reason: str) -> dict | None:
+    """
+    Close the running segment, move it read-only into SEG_DIR, list it in
+    the manifest and start a new one. Empty segments are just reopened.
+    """
+    global conn, cursor
+    with _db_lock:
+        flush_db()
+        if conn:
+            conn.close()
+            conn, cursor = None, None
+
+        entry = None
+        try:
+            rows, start, end = _finalise(DB_FILE) if os.path.exists(DB_FILE) else (0, None, None)
+        except sqlite3.Error as exc:
+            # unreadable leftover – keep logging into it rather than losing data
+            logger.error("Segment seal skipped, %s unreadable: %s", DB_FILE, exc)
+            rows = 0
+        if rows:
+            with _seg_lock:
+                os.makedirs(SEG_DIR, exist_ok=True)
+                man = _load_manifest()
+                seq = man["next_seq"]
+                name = f"seg_{seq:06d}.db"
+                path = os.path.join(SEG_DIR, name)
+                os.replace(DB_FILE, path)
+                for side in (DB_FILE + "-wal", DB_FILE + "-shm"):
+                    if os.path.exists(side):
+                        os.remove(side)
+                os.chmod(path, 0o444)
+                entry = {"file": name, "seq": seq, "rows": rows, "start": start, "end": end,
+                         "bytes": os.path.getsize(path),
+                         "sealed_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                         "reason": reason}
+                man["segments"].append(entry)
+                man["next_seq"] = seq + 1
+                _write_manifest(man)
+            logger.debug("Segment sealed (%s): %s, %d rows", reason, name, rows)
+        init_db()
+
+    if entry and SEG_KEEP > 0:
+        drop_segments(keep=SEG_KEEP)
+    return entry
+
+def _move_aside_db() -> None:
+    """Rename an unusable running DB (and its WAL side files) to *.bad-<utc>."""
+    global conn, cursor
+    if conn:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        conn, cursor = None, None
+    suffix = time.strftime(".bad-%Y%m%dT%H%M%SZ", time.gmtime())
+    for path in (DB_FILE, DB_FILE + "-wal", DB_FILE + "-shm"):
+        if os.path.exists(path):
+            os.replace(path, path + suffix)
+    logger.error("Leftover DB moved aside: %s%s", DB_FILE, suffix)
+
+def drop_segments(keep: int = 0) -> int:
+    """Delete all but the newest `keep` sealed segments; returns the number dropped."""
+    with _seg_lock:
+        if not os.path.isdir(SEG_DIR):
+            return 0
+        man = _load_manifest()
+        segments = man["segments"]
+        cut = max(0, len(segments) - keep)
+        drop, man["segments"] = segments[:cut], segments[cut:]
+        if not drop:
+            return 0
+        # manifest first: a crash in between leaves files that are not listed
+        # (re-added on the next load) rather than entries without a file
+        _write_manifest(man)
+        for s in drop:
+            try:
+                os.remove(os.path.join(SEG_DIR, s["file"]))
+            except FileNotFoundError:
+                pass
+    logger.debug("Dropped %d sealed segment(s)", len(drop))
+    return len(drop)
+
+def _live_seq() -> int:
+    """Sequence number of the running segment."""
+    with _seg_lock:
+        return _load_manifest()["next_seq"] if os.path.isdir(SEG_DIR) else 1
+
+def _advance_seq() -> None:
+    """Give the next running segment a new sequence number (after a delete)."""
+    with _seg_lock:
+        os.makedirs(SEG_DIR, exist_ok=True)
+        man = _load_manifest()
+        man["next_seq"] += 1
+        _write_manifest(man)
+
+def segment_count() -> int:
+    with _seg_lock:
+        return len(_load_manifest()["segments"]) if os.path.isdir(SEG_DIR) else 0
+
+def _segment_due(now: float) -> str | None:
+    """Reason to seal the running segment now (size or time window), else None."""
+    if SEG_MAX_S > 0 and now - _segment_opened >= SEG_MAX_S:
+        return "time"
+    if SEG_MAX_BYTES > 0:
+        try:
+            size = os.path.getsize(DB_FILE)
+            if os.path.exists(DB_FILE + "-wal"):
+                size += os.path.getsize(DB_FILE + "-wal")
+        except OSError:
+            return None
+        if size >= SEG_MAX_BYTES:
+            return "size"
+    return None
 
 # ---------------------------------------------------------------------------
 # Logger thread – write queued snapshots
 # ---------------------------------------------------------------------------
 def log_data_to_db() -> None:
-    global log_db_error
-    while True:
-        data = data_queue.get()
-        _flatten_all(data)
+    rows_since = 0
+    stats_since = time.monotonic()
+    deadline = None              # commit due time of the oldest pending row
+    m = metrics.loop("log_data_to_db")
 
-        if "wifi_signal_strength" not in data and "wifi_rssi" in data:
-            data["wifi_signal_strength"] = data.pop("wifi_rssi")
+    while True:
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            batch = [data_queue.get(timeout=timeout)]
+        except queue.Empty:
+            batch = []
 
-        if data.get("validtime") and logdata:
-            for k, v in list(data.items()):
-                if v == "":
-                    data[k] = None
+        # drain whatever else is already waiting, up to one full batch
+        while len(batch) < DB_BATCH_ROWS:
             try:
-                cursor.execute("""
-                    INSERT INTO logdata (
-                        datetime,status,lat,long,SOG,COG,fixQ,nSat,HDOP,alt,id,validtime,
-                        batvolt,batperc,
-                        wifi_conn,wifi_signal_strength,
-                        acc_x,acc_y,acc_z,
-                        gyro_x,gyro_y,gyro_z,
-                        pitch,roll,
-                        mag_x,mag_y,mag_z,heading,
-                        w_speed,w_angle,w_speed_kts,true_wind_dir
-                    ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-                """, (
-                    data.get("datetime"), data.get("status"),
-                    data.get("lat"),      data.get("long"),
-                    data.get("SOG"),      data.get("COG"),
-                    data.get("fixQ"),     data.get("nSat"),
-                    data.get("HDOP"),     data.get("alt"),
-                    data.get("id"),       data.get("validtime"),
-                    data.get("batvolt"),  data.get("batperc"),
-                    data.get("wifi_conn"),data.get("wifi_signal_strength"),
-                    data.get("acc_x"),    data.get("acc_y"),  data.get("acc_z"),
-                    data.get("gyro_x"),   data.get("gyro_y"), data.get("gyro_z"),
-                    data.get("pitch"),    data.get("roll"),
-                    data.get("mag_x"),    data.get("mag_y"),  data.get("mag_z"),
-                    data.get("heading"),
-                    data.get("w_speed"),      data.get("w_angle"),
-                    data.get("w_speed_kts"),  data.get("true_wind_dir"),
-                ))
-                conn.commit()
-                logger.debug("DB insert OK")
-                log_db_error = False
-            except Exception as exc:
-                logger.error("SQLite insert error: %s", exc)
-                log_db_error = True
-        else:
-            logger.debug("DB skip (validtime=%s logdata=%s)",
-                         data.get("validtime"), logdata)
-
-        data_queue.task_done()
+                batch.append(data_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        t = m.begin()
+        with _db_lock:
+            for data in batch:
+                _queue_row(data)
+                data_queue.task_done()
+
+            if _pending and deadline is None:
+                deadline = time.monotonic() + DB_BATCH_INTERVAL
+
+            now = time.monotonic()
+            if _pending and (len(_pending) >= DB_BATCH_ROWS or now >= deadline):
+                rows_since += flush_db()
+                if log_db_error:
+                    m.error()
+                    deadline = now + DB_BATCH_INTERVAL   # retry, but not in a busy loop
+            if not _pending:
+                deadline = None
+                reason = _segment_due(now)
+                if reason:
+                    try:
+                        seal_segment(reason)
+                    except Exception as exc:
+                        logger.error("Segment seal error: %s", exc)
+                        m.error()
+        m.end(t)
+
+        if now - stats_since >= DB_STATS_INTERVAL:
+            _report_db_stats(rows_since, now - stats_since)
+            rows_since, stats_since = 0, now
 
 # ---------------------------------------------------------------------------
-# Delete-log thread – delete DB file and reinit
+# Delete-log thread – drop sealed segments, reset the running one
 # ---------------------------------------------------------------------------
 def handle_delete_log() -> None:
     global deletelog, deletelogstatus, logdata, conn, cursor
@@ -271,19 +865,29 @@ def handle_delete_log() -> None:
             logdata = False
             deletelogstatus = "deleting"
             try:
-                # Clear queue
-                while not data_queue.empty():
-                    data_queue.get_nowait()
-                    data_queue.task_done()
-
-                # Close and remove DB
-                if conn:
-                    conn.close()
-                if os.path.exists(DB_FILE):
-                    os.remove(DB_FILE)
-
-                # Re-init
-                init_db()
+                with _db_lock:
+                    # Finish the open batch so the writer never commits
+                    # into a closed connection, then clear the queue
+                    flush_db()
+                    _pending.clear()           # failed rows belong to the deleted log
+                    _pending_ts.clear()
+                    while not data_queue.empty():
+                        data_queue.get_nowait()
+                        data_queue.task_done()
+
+                    # Close and remove DB (incl. WAL side files)
+                    if conn:
+                        conn.close()
+                        conn, cursor = None, None
+                    for path in (DB_FILE, DB_FILE + "-wal", DB_FILE + "-shm"):
+                        if os.path.exists(path):
+                            os.remove(path)
+
+                    # Re-init – new sequence number, rowids restart at 1
+                    _advance_seq()
+                    init_db()
+                # sealed segments are immutable files – no DB work needed
+                drop_segments(keep=0)
                 deletelogstatus = "deleted"
                 logger.debug("Database deleted and reinitialized")
             except Exception as exc:
@@ -302,4 +906,16 @@ def handle_delete_log() -> None:
 # Module initialisation
 # ---------------------------------------------------------------------------
 if conn is None:
-    init_db()
+    if SEG_PER_SESSION:
+        try:
+            seal_segment("session")  # previous run's data becomes a sealed segment
+        except Exception as exc:
+            # a corrupt or locked leftover must not stop logging at boot
+            logger.error("Session seal failed: %s", exc)
+            _move_aside_db()
+            init_db()
+    else:
+        init_db()
+if _spool is None:
+    init_spool()
+_register_gauges()
@@ -0,0 +1,222 @@
+# ---------------------------------------------------------------------------
+# livecodec.py – compact, schema-versioned encoding of live snapshots
+# ---------------------------------------------------------------------------
+# Frame   : "DS" | version u8 | flags u8 | count u16 | records …
+#           flags bit0 → everything after the 6-byte header is zlib-deflated
+# Record  : presence bitmap (1 bit per schema field + 1 bit "extra")
+#           followed by the present fields in schema order (little endian):
+#             fixed-point numbers  → int(round(value * scale)) as i8…i64
+#             bool                 → u8
+#             str                  → u8 length + UTF-8
+#             datetime (ISO … Z)   → i64 centiseconds since 1970-01-01
+#           extra                  → u16 length + JSON of keys that are not
+#                                    in the schema or did not fit their type
+# The decoder returns the same flat dicts datatransfer() would have sent as
+# JSON. Hub side: code_nodered/livedecoder.py (keep SCHEMA in sync –
+# checked by benchmarks/bench_livecodec.py --check).
+# ---------------------------------------------------------------------------
+from __future__ import annotations
+
+import calendar
+import json
+import math
+import struct
+import time
+import zlib
+
+MAGIC          = b"DS"
+SCHEMA_VERSION = 2
+FLAG_ZLIB      = 0x01
+
+_HEADER = struct.Struct("<2sBBH")
+
+# (key, kind, scale) – kind: struct code, "?" bool, "s" str, "t" datetime
+# NEVER reorder or change entries of a version. New fields go into a new
+# version (the "extra" flag is the last bitmap bit, so appending to an existing
+# version breaks older decoders); older versions stay for spooled frames.
+SCHEMA = {
+    1: (
+        ("id",                   "s", None),
+        ("validtime",            "?", None),
+        ("status",               "s", None),
+        ("datetime",             "t", None),
+        ("ts_monotonic",         "q", 1000),      # ms
+        ("lat",                  "i", 10**7),
+        ("long",                 "i", 10**7),
+        ("SOG",                  "H", 100),
+        ("COG",                  "H", 100),
+        ("fixQ",                 "B", 1),
+        ("nSat",                 "B", 1),
+        ("HDOP",                 "H", 100),
+        ("alt",                  "i", 10),
+        ("batvolt",              "H", 100),
+        ("batperc",              "H", 10),
+        ("wifi_conn",            "?", None),
+        ("wifi_signal_strength", "b", 1),
+        ("acc_x",                "h", 1000),
+        ("acc_y",                "h", 1000),
+        ("acc_z",                "h", 1000),
+        ("gyro_x",               "i", 100),
+        ("gyro_y",               "i", 100),
+        ("gyro_z",               "i", 100),
+        ("pitch",                "h", 100),
+        ("roll",                 "h", 100),
+        ("mag_x",                "i", 10000),
+        ("mag_y",                "i", 10000),
+        ("mag_z",                "i", 10000),
+        ("heading",              "H", 100),
+        ("w_speed",              "H", 100),
+        ("w_angle",              "H", 100),
+        ("w_unit",               "s", None),
+        ("w_status",             "s", None),
+        ("true_wind_dir",        "H", 100),
+        ("w_speed_kts",          "H", 100),
+        ("imu_age_ms",           "i", 10),
+        ("mag_age_ms",           "i", 10),
+        ("bat_age_ms",           "i", 10),
+        ("wind_age_ms",          "i", 10),
+    ),
+}
+# v2: fused attitude quaternion (ahrs) and its cache age
+SCHEMA[2] = SCHEMA[1] + (
+    ("quat_w",               "h", 10000),
+    ("quat_x",               "h", 10000),
+    ("quat_y",               "h", 10000),
+    ("quat_z",               "h", 10000),
+    ("ahrs_age_ms",          "i", 10),
+)
+
+_U8  = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_I64 = struct.Struct("<q")
+
+
+def _iso_to_cs(value: str) -> int:
+    """'YYYY-MM-DDTHH:MM:SS.ssZ' → centiseconds since the Unix epoch."""
+    secs = calendar.timegm((int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                            int(value[11:13]), int(value[14:16]), 0, 0, 0, 0))
+    return secs * 100 + round(float(value[17:-1]) * 100)
+
+
+def _cs_to_iso(cs: int) -> str:
+    secs, frac = divmod(cs, 100)
+    t = time.gmtime(secs)
+    return (f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}"
+            f"T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec + frac / 100:05.2f}Z")
+
+
+class Codec:
+    """Encoder/decoder for one schema version."""
+
+    def __init__(self, version: int = SCHEMA_VERSION):
+        self.version = version
+        self.fields = SCHEMA[version]
+        self.keys = frozenset(k for k, _, _ in self.fields)
+        self.nbits = len(self.fields) + 1              # + extra
+        self.nbytes = (self.nbits + 7) // 8
+        self._num = {code: struct.Struct("<" + code)
+                     for _, code, _ in self.fields if code not in ("s", "t")}
+
+    # ------------------------------------------------------------------ #
+    def _encode_record(self, rec: dict, out: bytearray) -> None:
+        bitmap = 0
+        body = bytearray()
+        extra = {k: v for k, v in rec.items() if k not in self.keys}
+        for i, (key, kind, scale) in enumerate(self.fields):
+            v = rec.get(key)
+            if v is None or v == "":
+                continue
+            try:
+                if kind == "s":
+                    raw = str(v).encode()[:255]
+                    body += _U8.pack(len(raw)) + raw
+                elif kind == "t":
+                    body += _I64.pack(_iso_to_cs(v))
+                elif kind == "?":
+                    body += _U8.pack(1 if v else 0)
+                else:
+                    f = float(v)
+                    if math.isnan(f):
+                        continue
+                    body += self._num[kind].pack(int(round(f * scale)))
+            except (struct.error, ValueError, TypeError):
+                extra[key] = v                          # out of range → lossless
+                continue
+            bitmap |= 1 << i
+        if extra:
+            raw = json.dumps(extra, default=str, separators=(",", ":")).encode()
+            body += _U16.pack(len(raw)) + raw
+            bitmap |= 1 << (self.nbits - 1)
+        out += bitmap.to_bytes(self.nbytes, "little")
+        out += body
+
+    def encode(self, records: list[dict], compress: bool = True) -> bytes:
+        """Encode a batch of flat snapshots into one frame."""
+        body = bytearray()
+        for rec in records:
+            self._encode_record(rec, body)
+        flags = 0
+        if compress:
+            body = zlib.compress(bytes(body), 6)
+            flags |= FLAG_ZLIB
+        return _HEADER.pack(MAGIC, self.version, flags, len(records)) + bytes(body)
+
+    # ------------------------------------------------------------------ #
+    def decode_body(self, body: bytes, count: int) -> list[dict]:
+        out = []
+        pos = 0
+        for _ in range(count):
+            bitmap = int.from_bytes(body[pos:pos + self.nbytes], "little")
+            pos += self.nbytes
+            rec = {}
+            for i, (key, kind, scale) in enumerate(self.fields):
+                if not bitmap >> i & 1:
+                    continue
+                if kind == "s":
+                    n = body[pos]
+                    rec[key] = body[pos + 1:pos + 1 + n].decode()
+                    pos += 1 + n
+                elif kind == "t":
+                    rec[key] = _cs_to_iso(_I64.unpack_from(body, pos)[0])
+                    pos += 8
+                elif kind == "?":
+                    rec[key] = bool(body[pos])
+                    pos += 1
+                else:
+                    st = self._num[kind]
+                    v = st.unpack_from(body, pos)[0]
+                    pos += st.size
+                    rec[key] = v if scale == 1 else v / scale
+            if bitmap >> (self.nbits - 1) & 1:
+                n = _U16.unpack_from(body, pos)[0]
+                rec.update(json.loads(body[pos + 2:pos + 2 + n]))
+                pos += 2 + n
+            out.append(rec)
+        return out
+
+
+_codecs: dict[int, Codec] = {}
+
+
+def _codec(version: int) -> Codec:
+    c = _codecs.get(version)
+    if c is None:
+        c = _codecs[version] = Codec(version)
+    return c
+
+
+def encode(records: list[dict], compress: bool = True) -> bytes:
+    return _codec(SCHEMA_VERSION).encode(records, compress)
+
+
+def decode(frame: bytes) -> list[dict]:
+    """Frame → list of flat snapshot dicts (any known schema version)."""
+    magic, version, flags, count = _HEADER.unpack_from(frame)
+    if magic != MAGIC:
+        raise ValueError("not a livecodec frame")
+    if version not in SCHEMA:
+        raise ValueError(f"unknown schema version {version}")
+    body = frame[_HEADER.size:]
+    if flags & FLAG_ZLIB:
+        body = zlib.decompress(body)
+    return _codec(version).decode_body(body, count)
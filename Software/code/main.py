@@ -1,9 +1,13 @@
-import os, time, queue, threading, logging, importlib
+import os, sys, time, signal, threading, logging, functools
 import errordebuglogger as edl
 
 from config import config
-from modules import gps, imu, mag, battery, led
+import modules
+from modules import i2cbus
 import datamanager
+import sampler
+import metrics
+from channel import SnapshotChannel
 
 # ---------------------------------------------------------------------------
 # Debug logging
@@ -17,7 +21,7 @@ logger = edl.get_logger(__name__) if hasattr(edl, "get_logger") \
 # Device-specific sensor sets
 # ---------------------------------------------------------------------------
 SENSOR_SETS = {
-    "boat": ["gps", "imu", "bat", "led", "wifi"],
+    "boat": ["gps", "imu", "ahrs", "bat", "led", "wifi"],
     "buoy": ["gps", "bat", "led", "wifi"],
     "hub":  ["gps", "led", "wind"],
 }
@@ -26,170 +30,199 @@ try:
 except KeyError:
     raise SystemExit(f"Unknown device_type '{config.device_type}'")
 
-# ---------------------------------------------------------------------------
-# Optional driver loader (e.g. wind sensor → requires pyserial)
-# ---------------------------------------------------------------------------
-def _import_driver(modname: str):
-    try:
-        return importlib.import_module(f"modules.{modname}")
-    except ModuleNotFoundError as exc:
-        logger.info("Optional driver '%s' not available: %s", modname, exc)
-        return None
-
-wind_drv = _import_driver("wind_calypsomini") or _import_driver("wind")
-
 # ---------------------------------------------------------------------------
 # Globals / settings
 # ---------------------------------------------------------------------------
-snap_q: queue.SimpleQueue = queue.SimpleQueue()
-new_ev:  threading.Event  = threading.Event()
+snap_ch = SnapshotChannel(
+    maxsize=getattr(config, "snap_queue_size", 256),
+    policy=getattr(config, "snap_queue_policy", "drop_oldest"),
+)
+snap_batch_max  = getattr(config, "snap_batch_max", 32)
+metrics.gauge("snap_queue_depth", snap_ch.depth)
+metrics.gauge("snap_queue_drops", lambda: snap_ch.drops)
+pipeline_stats_interval = getattr(config, "pipeline_stats_interval", 30)
 
-battery_read_interval = 1 / getattr(config, "battery_read_freq", 0.5)
 interim_freq          = 1/ getattr(config, "interim_freq", 0.1)
 
+# sampler rates in Hz – each sensor runs in its own thread
+SAMPLE_RATES = {
+    "imu":  getattr(config, "imu_sample_rate", 50),
+    "mag":  getattr(config, "mag_sample_rate", 20),
+    "bat":  getattr(config, "battery_read_freq", 0.5),
+    "wind": getattr(config, "wind_sample_rate", 4),
+    "wifi": getattr(config, "wifi_sample_rate", 1),
+    # "ahrs": ahrs.sample_rate() once the driver is loaded
+}
+
 # ---------------------------------------------------------------------------
-# Helper: Wi-Fi status
-# ---------------------------------------------------------------------------
-def _read_wifi():
-    if "wifi" not in ACTIVE_SENSORS:
-        return False, None
-    try:
-        with open("/sys/class/net/wlan0/operstate") as f:
-            conn = (f.read().strip() == "up")
-        rssi = None
-        if conn:
-            with open("/proc/net/wireless") as f:
-                for line in f.readlines()[2:]:
-                    if "wlan0:" in line:
-                        rssi = int(float(line.split()[3]))
-                        break
-    except Exception as e:
-        logger.error("wifi read failed: %s", e)
-        conn, rssi = False, None
-    return conn, rssi
+# Sensor samplers – drivers publish into latest-value caches
+# ---------------------------------------------------------------------------
+def _read_mag(mag):
+    imu_val, _ = sampler.read("imu")
+    imu_val = imu_val or {}
+    return mag.get_data(pitch=imu_val.get("pitch") or 0.0,
+                        roll=imu_val.get("roll") or 0.0) or None
+
+def _read_wind(wind):
+    # fused heading if the ahrs runs, tilt-compensated compass otherwise
+    att, _ = sampler.read("ahrs")
+    if not att:
+        att, _ = sampler.read("mag")
+    return wind.get_data((att or {}).get("heading", 0) or 0)
+
+# sampler → read function built from its (last) driver
+READERS = {
+    "imu":  lambda drv: drv.get_data,
+    "mag":  lambda drv: functools.partial(_read_mag, drv),
+    "ahrs": lambda drv: drv.step,
+    "bat":  lambda drv: drv.get_battery_json,
+    "wind": lambda drv: functools.partial(_read_wind, drv),
+    "wifi": lambda drv: drv.get_data,
+}
+
+def _start_samplers() -> None:
+    """
+    Load + init the drivers of every active sampler and start it. Runs in its
+    own thread so driver imports overlap the GPS start-up; a driver that fails
+    to load only disables its own sensor.
+    """
+    for name, reader in READERS.items():
+        if name not in ACTIVE_SENSORS:
+            continue
+        drivers = [modules.init(d) for d in modules.drivers_for([name])]
+        if None in drivers:
+            logger.error("sensor '%s' disabled: driver not available", name)
+            continue
+        drv = drivers[-1]
+        rate = drv.sample_rate() if name == "ahrs" else SAMPLE_RATES[name]
+        sampler.start(name, reader(drv), rate)
+
+def _led_loop() -> None:
+    led = modules.load("led") if "led" in ACTIVE_SENSORS else None
+    if led is not None:
+        led.led_loop()
+
+def _assemble(fix: dict, now: float, valid: bool) -> dict:
+    """Non-blocking snapshot: GPS fix + latest cached value of every sensor."""
+    snapshot = {
+        "ts_monotonic": now,
+        "id": config.identifier,
+        "validtime": valid,
+        "status": "A" if valid else "V",
+    }
+    if "gps" in ACTIVE_SENSORS:
+        snapshot["gps"] = fix
+    for name in ("imu", "mag", "ahrs", "bat", "wind"):
+        if name in ACTIVE_SENSORS:
+            value, age = sampler.read(name, now)
+            snapshot[name] = value if value is not None else {}
+            # staleness of the cached sample at assembly time
+            snapshot[f"{name}_age_ms"] = None if age is None else round(age * 1000, 1)
+
+    # link state from the wifi sampler's cache – no file I/O per snapshot
+    wifi, _ = sampler.read("wifi", now)
+    snapshot["wifi_conn"] = bool(wifi and wifi["conn"])
+    snapshot["wifi_rssi"] = wifi["rssi"] if wifi else None
+    return snapshot
 
 # ---------------------------------------------------------------------------
 # Producer – GPS thread + sensor fusion
 # ---------------------------------------------------------------------------
 def gps_captain() -> None:
-    last_gps_ts: str | None = None
-    last_bat: dict | None = None
-    next_bat_due = 0.0
+    last_seq = 0
     last_interim = 0.0
+    m = metrics.loop("gps_captain")
 
-    gps.init_gps()
-    threading.Thread(target=gps.read_gps, daemon=True).start()
+    threading.Thread(target=_start_samplers, name="driver-loader", daemon=True).start()
+    gps = modules.init("gps") if "gps" in ACTIVE_SENSORS else None
+    if gps is not None:
+        threading.Thread(target=gps.read_gps, daemon=True).start()
 
     while True:
-        fix = gps.get_data()
-        now = time.monotonic()
-
-        # --------------------- NO GPS FIX YET -------------------------- #
-        if not fix or fix.get("datetime") is None:
-            if now - last_interim >= interim_freq:
-                wifi_conn, wifi_rssi = _read_wifi()
-
-                snapshot = {
-                    "ts_monotonic": now,
-                    "id": config.identifier,
-                    "validtime": False,
-                    "status": "V",
-                }
-                if "gps" in ACTIVE_SENSORS:
-                    snapshot["gps"] = fix
-                if "imu" in ACTIVE_SENSORS:
-                    snapshot["imu"] = imu.get_data()
-                if "mag" in ACTIVE_SENSORS:
-                    snapshot["mag"] = mag.get_data()
-                if "bat" in ACTIVE_SENSORS:
-                    try:
-                        last_bat = battery.get_battery_json()
-                    except Exception as e:
-                        logger.error("battery read failed: %s", e)
-                        last_bat = {}
-                    snapshot["bat"] = last_bat
-                if "wind" in ACTIVE_SENSORS and wind_drv:
-                    heading_val = (
-                        snapshot.get("mag", {}) or {}
-                    ).get("heading", 0) or 0
-                    snapshot["wind"] = wind_drv.get_data(heading_val)
-
-                snapshot["wifi_conn"], snapshot["wifi_rssi"] = (
-                    wifi_conn,
-                    wifi_rssi,
-                )
-
-                snap_q.put(snapshot)
-                new_ev.set()
-                last_interim = now
-            time.sleep(0.2)
-            continue
-        # --------------------------------------------------------------- #
-
-        gps_ts = fix["datetime"]
-        if gps_ts == last_gps_ts:
-            time.sleep(0.02)
-            continue
-        last_gps_ts = gps_ts
-
-        # periodic battery read
-        if "bat" in ACTIVE_SENSORS and now >= next_bat_due:
-            try:
-                last_bat = battery.get_battery_json()
-            except Exception as e:
-                logger.error("battery read failed: %s", e)
-                last_bat = {}
-            next_bat_due = now + battery_read_interval
-
-        wifi_conn, wifi_rssi = _read_wifi()
-
-        snapshot = {
-            "ts_monotonic": now,
-            "id": config.identifier,
-            "validtime": True,
-            "status": "A",
-        }
-        if "gps" in ACTIVE_SENSORS:
-            snapshot["gps"] = fix
-        if "imu" in ACTIVE_SENSORS:
-            snapshot["imu"] = imu.get_data()
-        if "mag" in ACTIVE_SENSORS:
-            snapshot["mag"] = mag.get_data()
-        if "bat" in ACTIVE_SENSORS:
-            snapshot["bat"] = last_bat
-        if "wind" in ACTIVE_SENSORS and wind_drv:
-            heading_val = (
-                snapshot.get("mag", {}) or {}
-            ).get("heading", 0) or 0
-            snapshot["wind"] = wind_drv.get_data(heading_val)
-
-        snapshot["wifi_conn"], snapshot["wifi_rssi"] = wifi_conn, wifi_rssi
-
-        snap_q.put(snapshot)
-        new_ev.set()
+        # blocks until the parser has assembled the next epoch (RMC+GGA or
+        # NAV-PVT); the timeout keeps interim snapshots flowing without GPS
+        if gps is not None:
+            epoch = gps.wait_for_fix(last_seq, timeout=interim_freq)
+        else:
+            time.sleep(interim_freq)
+            epoch = None
+        now = m.begin()
+        try:
+            if epoch is None:
+                fix = gps.get_data() if gps is not None else {}
+            else:
+                last_seq, fix = epoch
+
+            # --------------------- NO GPS FIX YET ---------------------- #
+            if not fix or fix.get("datetime") is None:
+                if now - last_interim >= interim_freq:
+                    snap_ch.put(_assemble(fix, now, valid=False))
+                    last_interim = now
+                continue
+            # ----------------------------------------------------------- #
+
+            # timed out with a stale fix → receiver stalled, nothing new to log
+            if epoch is None:
+                continue
+
+            snap_ch.put(_assemble(fix, now, valid=True))
+            modules.mark("first_fix")
+        finally:
+            m.end(now)
 
 # ---------------------------------------------------------------------------
 # Consumer – upload / log
 # ---------------------------------------------------------------------------
 def mainloop() -> None:
+    next_report = time.monotonic() + pipeline_stats_interval
+    m = metrics.loop("mainloop")
     while True:
-        new_ev.wait(); new_ev.clear()
-        snap = snap_q.get_nowait()
-        if logger.isEnabledFor(logging.DEBUG):
-            logger.debug("merged snapshot: %s", snap)
-        datamanager.datatransfer(snap, snap.get("wifi_conn"))
+        # drain everything that piled up since the last wake-up
+        batch = snap_ch.get_batch(snap_batch_max, timeout=pipeline_stats_interval)
+        t = m.begin()
+        for snap in batch:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("merged snapshot: %s", snap)
+            datamanager.datatransfer(snap, snap.get("wifi_conn"))
+            snap_ch.latency.add(time.monotonic() - snap["ts_monotonic"])
+        m.end(t)
+
+        now = time.monotonic()
+        if now >= next_report:
+            st = snap_ch.stats()
+            logger.debug("snapshot channel: depth=%d max=%d drops=%d blocked=%.3fs "
+                         "fix→publish avg=%s p95=%s max=%s ms",
+                         st["depth"], st["max_depth"], st["drops"], st["blocked_s"],
+                         st["latency"]["avg_ms"], st["latency"]["p95_ms"],
+                         st["latency"]["max_ms"])
+            bus = i2cbus.stats()
+            logger.debug("i2c bus: utilisation=%.1f%% %s", bus["utilisation"] * 100,
+                         ", ".join(f"{n}: {d['tx']} tx, {d['error_rate']:.2%} err, "
+                                   f"avg {d['lat_avg_ms']} ms, max {d['lat_max_ms']} ms"
+                                   for n, d in bus["devices"].items()))
+            next_report = now + pipeline_stats_interval
 
 # ---------------------------------------------------------------------------
 # Bootstrap
 # ---------------------------------------------------------------------------
 def main() -> None:
     threading.Thread(target=datamanager.mqtt_loop,          daemon=True).start()
+    threading.Thread(target=datamanager.mqtt_publisher,     daemon=True).start()
+    threading.Thread(target=datamanager.live_publisher,     daemon=True).start()
+    threading.Thread(target=datamanager.backfill_publisher, daemon=True).start()
     threading.Thread(target=datamanager.publish_boatstatus, daemon=True).start()
     threading.Thread(target=datamanager.log_data_to_db,     daemon=True).start()
     threading.Thread(target=datamanager.handle_delete_log,  daemon=True).start()
-    threading.Thread(target=led.led_loop,                   daemon=True).start()
+    threading.Thread(target=datamanager.metrics_publisher,  daemon=True).start()
+    threading.Thread(target=_led_loop,                      daemon=True).start()
     threading.Thread(target=gps_captain,                    daemon=True).start()
-    mainloop()
+
+    # systemd stops the service with SIGTERM → unwind so the DB batch is flushed
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        mainloop()
+    finally:
+        datamanager.close_db()
 
 # ---------------------------------------------------------------------------
 if __name__ == "__main__":
@@ -0,0 +1,208 @@
+# ---------------------------------------------------------------------------
+# metrics.py – hot-path loop instrumentation and metrics export
+# ---------------------------------------------------------------------------
+# • LoopMetrics: one per thread loop (gps_captain, mainloop, DB writer,
+#   driver readers, samplers …). Per iteration the loop calls
+#       t = m.begin()   …work…   m.end(t)
+#   which costs two time.monotonic() calls and a handful of adds – no lock,
+#   every LoopMetrics has exactly one writer thread.
+#   Recorded: iterations, loop period, work time (sum/max), jitter histogram
+#   (|period − nominal period|, or |period − previous period| without one)
+#   and an error counter (m.error()).
+# • gauge(name, fn): queue depths etc., fn() is only called on export.
+# • snapshot(): compact per-window dict for the *metrics MQTT topic.
+# • render_text() / write_textfile(): Prometheus text exposition, written
+#   atomically so the hub (node_exporter textfile collector, curl, …) can
+#   scrape it at any time.
+# ---------------------------------------------------------------------------
+from __future__ import annotations
+
+import bisect
+import logging
+import os
+import threading
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# jitter histogram upper bounds in seconds (+Inf implied)
+JITTER_BUCKETS = (0.0001, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+
+
+class LoopMetrics:
+    """Counters for one loop; begin()/end()/error() from the owning thread only."""
+
+    __slots__ = ("name", "nominal", "count", "work_s", "work_max", "period_s",
+                 "jitter_s", "errors", "hist", "_last_start", "_last_period", "_window")
+
+    def __init__(self, name: str, period: float | None = None):
+        self.name = name
+        self.nominal = period
+        self.count = 0
+        self.work_s = 0.0
+        self.work_max = 0.0              # since the last snapshot()
+        self.period_s = 0.0
+        self.jitter_s = 0.0
+        self.errors = 0
+        self.hist = [0] * (len(JITTER_BUCKETS) + 1)
+        self._last_start: float | None = None
+        self._last_period: float | None = None
+        self._window = (0, 0.0, 0.0, 0, list(self.hist))   # values at the last snapshot()
+
+    def begin(self) -> float:
+        now = time.monotonic()
+        last = self._last_start
+        if last is not None:
+            period = now - last
+            ref = self.nominal if self.nominal else self._last_period
+            if ref is not None:
+                jitter = abs(period - ref)
+                self.jitter_s += jitter
+                self.hist[bisect.bisect_left(JITTER_BUCKETS, jitter)] += 1
+            self.period_s += period
+            self._last_period = period
+        self._last_start = now
+        return now
+
+    def end(self, t_begin: float) -> None:
+        work = time.monotonic() - t_begin
+        self.count += 1
+        self.work_s += work
+        if work > self.work_max:
+            self.work_max = work
+
+    def error(self, n: int = 1) -> None:
+        self.errors += n
+
+    def window(self) -> dict:
+        """Rates and averages since the previous call (compact MQTT form)."""
+        count, work_s, period_s, errors, hist = \
+            self.count, self.work_s, self.period_s, self.errors, list(self.hist)
+        p_count, p_work, p_period, p_errors, p_hist = self._window
+        self._window = (count, work_s, period_s, errors, hist)
+        work_max, self.work_max = self.work_max, 0.0
+
+        n = count - p_count
+        span = period_s - p_period
+        return {
+            "n":        n,
+            "hz":       round(n / span, 2) if span > 0 else None,
+            "work_ms":  round((work_s - p_work) / n * 1000, 3) if n else None,
+            "work_max": round(work_max * 1000, 3),
+            "util":     round((work_s - p_work) / span, 4) if span > 0 else None,
+            "jit_p95":  _hist_quantile([a - b for a, b in zip(hist, p_hist)], 0.95),
+            "err":      errors - p_errors,
+        }
+
+
+def _hist_quantile(counts: list[int], q: float) -> float | None:
+    """Upper bucket bound (ms) below which fraction q of the samples lie."""
+    total = sum(counts)
+    if not total:
+        return None
+    need, acc = q * total, 0
+    for i, c in enumerate(counts):
+        acc += c
+        if acc >= need:
+            return round(JITTER_BUCKETS[i] * 1000, 2) if i < len(JITTER_BUCKETS) else None
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+_loops: dict[str, LoopMetrics] = {}
+_gauges: dict[str, Callable[[], float]] = {}
+_lock = threading.Lock()
+
+
+def loop(name: str, period: float | None = None) -> LoopMetrics:
+    """Get or create the LoopMetrics `name` (period: nominal loop period in s)."""
+    with _lock:
+        m = _loops.get(name)
+        if m is None:
+            m = _loops[name] = LoopMetrics(name, period)
+        return m
+
+
+def gauge(name: str, fn: Callable[[], float]) -> None:
+    """Register a value that is sampled on every export."""
+    with _lock:
+        _gauges[name] = fn
+
+
+def _gauge_values() -> dict[str, float]:
+    out = {}
+    for name, fn in list(_gauges.items()):
+        try:
+            out[name] = fn()
+        except Exception as exc:             # noqa: BLE001 – never break the export
+            logger.debug("metrics gauge %s failed: %s", name, exc)
+    return out
+
+
+def snapshot() -> dict:
+    """Per-loop window statistics + current gauges (resets the windows)."""
+    return {
+        "loops":  {name: m.window() for name, m in list(_loops.items())},
+        "gauges": _gauge_values(),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Text exposition
+# ---------------------------------------------------------------------------
+def _fmt(v) -> str:
+    if v is None:
+        return "NaN"
+    if isinstance(v, bool):
+        return "1" if v else "0"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+def render_text(labels: dict[str, str] | None = None, prefix: str = "tracker") -> str:
+    """Prometheus text format (cumulative counters + jitter histogram + gauges)."""
+    base = ",".join(f'{k}="{v}"' for k, v in (labels or {}).items())
+
+    def lbl(**extra) -> str:
+        parts = [base] if base else []
+        parts += [f'{k}="{v}"' for k, v in extra.items()]
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    loops = list(_loops.values())
+    lines = []
+    for metric, kind, helptext, attr in (
+        ("loop_iterations_total", "counter", "completed loop iterations", "count"),
+        ("loop_work_seconds_total", "counter", "time spent in loop work", "work_s"),
+        ("loop_period_seconds_total", "counter", "sum of loop periods", "period_s"),
+        ("loop_errors_total", "counter", "errors raised inside the loop", "errors"),
+    ):
+        lines.append(f"# HELP {prefix}_{metric} {helptext}")
+        lines.append(f"# TYPE {prefix}_{metric} {kind}")
+        lines += [f"{prefix}_{metric}{lbl(loop=m.name)} {_fmt(getattr(m, attr))}" for m in loops]
+
+    lines.append(f"# HELP {prefix}_loop_jitter_seconds deviation of the loop period")
+    lines.append(f"# TYPE {prefix}_loop_jitter_seconds histogram")
+    for m in loops:
+        acc = 0
+        for bound, c in zip(JITTER_BUCKETS + (None,), m.hist):
+            acc += c
+            le = "+Inf" if bound is None else repr(bound)
+            lines.append(f"{prefix}_loop_jitter_seconds_bucket{lbl(loop=m.name, le=le)} {acc}")
+        lines.append(f"{prefix}_loop_jitter_seconds_sum{lbl(loop=m.name)} {_fmt(m.jitter_s)}")
+        lines.append(f"{prefix}_loop_jitter_seconds_count{lbl(loop=m.name)} {acc}")
+
+    for name, value in _gauge_values().items():
+        lines.append(f"# TYPE {prefix}_{name} gauge")
+        lines.append(f"{prefix}_{name}{lbl()} {_fmt(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path: str, labels: dict[str, str] | None = None) -> None:
+    """Write render_text() to path via tmp file + rename (readers never see half a file)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(render_text(labels))
+    os.replace(tmp, path)
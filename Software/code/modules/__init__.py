@@ -1,6 +1,161 @@
-from modules import led
-from modules import gps_SAM_M10Q as gps
-from modules import imu_LSM6DSO as imu
-from modules import mag_mmc56x3 as mag
-from modules import battery_MAX17048 as battery
-from modules import wind_calypsomini as wind
\ No newline at end of file
+"""
+Lazy driver registry.
+
+Drivers are imported on first use instead of all at once when the package is
+imported: a buoy never loads the IMU/AHRS stack (NumPy, imufusion) or
+pyserial, and a driver that cannot load (missing package, pigpio daemon not
+running → led calls sys.exit) is logged and reported as unavailable instead
+of taking the whole tracker down.
+
+    from modules import gps          # attribute access → load("gps")
+    drv = modules.load("wind")       # module or None
+    modules.init("gps")              # driver init hook (init_gps, …), timed
+
+Import and init time per driver and startup milestones (mark()) are kept for
+stats(), e.g. time-to-first-logged-fix.
+Helper modules (i2cbus) are plain submodules and import as usual.
+"""
+
+from __future__ import annotations
+
+import importlib
+import logging
+import threading
+import time
+from types import ModuleType
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# registry name → submodule
+DRIVERS = {
+    "led":     "led",
+    "gps":     "gps_SAM_M10Q",
+    "imu":     "imu_LSM6DSO",
+    "mag":     "mag_mmc56x3",
+    "ahrs":    "ahrs",
+    "battery": "battery_MAX17048",
+    "wind":    "wind_calypsomini",
+    "wifi":    "wifi_link",
+}
+
+# SENSOR_SETS entry (main.py) → drivers it needs
+SENSOR_DRIVERS = {
+    "gps":  ("gps",),
+    "imu":  ("imu",),
+    "mag":  ("mag",),
+    "ahrs": ("imu", "ahrs"),
+    "bat":  ("battery",),
+    "led":  ("led",),
+    "wind": ("wind",),
+    "wifi": ("wifi",),
+}
+
+# optional init function per driver, called once by init()
+INIT_HOOKS = {
+    "gps":  "init_gps",
+    "imu":  "init_sensor",
+    "mag":  "init_sensor",
+}
+
+_T0 = time.monotonic()                  # package import ≈ process start
+_loaded: dict[str, ModuleType | None] = {}
+_info: dict[str, dict] = {}
+_initialised: set[str] = set()
+_milestones: dict[str, float] = {}
+_lock = threading.RLock()
+
+
+def load(name: str) -> ModuleType | None:
+    """Import driver `name` once; None (and logged) if it cannot be loaded."""
+    try:
+        return _loaded[name]
+    except KeyError:
+        pass
+    with _lock:
+        if name in _loaded:
+            return _loaded[name]
+        if name not in DRIVERS:
+            raise KeyError(f"unknown driver '{name}'")
+        t0 = time.monotonic()
+        mod, error = None, None
+        try:
+            mod = importlib.import_module(f"{__name__}.{DRIVERS[name]}")
+        except (ImportError, OSError, RuntimeError, SystemExit) as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            logger.error("driver '%s' unavailable: %s", name, error)
+        ms = (time.monotonic() - t0) * 1000
+        _info[name] = {"ok": mod is not None, "import_ms": round(ms, 1),
+                       "init_ms": None, "error": error}
+        logger.debug("driver '%s' imported in %.1f ms", name, ms)
+        _loaded[name] = mod
+        info = _info[name]
+        metrics.gauge(f"driver_{name}_ok", lambda: info["ok"] and not info["error"])
+        metrics.gauge(f"driver_{name}_import_ms", lambda: info["import_ms"])
+        metrics.gauge(f"driver_{name}_init_ms", lambda: info["init_ms"])
+        return mod
+
+
+def init(name: str) -> ModuleType | None:
+    """load() + run the driver's init hook once (timed); None if unavailable."""
+    mod = load(name)
+    if mod is None:
+        return None
+    with _lock:
+        if name in _initialised:
+            return mod
+        _initialised.add(name)
+    hook = getattr(mod, INIT_HOOKS.get(name, ""), None)
+    if hook is not None:
+        t0 = time.monotonic()
+        try:
+            hook()
+        except Exception as exc:                 # noqa: BLE001 – driver keeps retrying itself
+            _info[name]["error"] = f"init: {exc}"
+            logger.error("driver '%s' init failed: %s", name, exc)
+        _info[name]["init_ms"] = round((time.monotonic() - t0) * 1000, 1)
+    return mod
+
+
+def loaded(name: str) -> ModuleType | None:
+    """The driver if it is already loaded – never triggers an import."""
+    return _loaded.get(name)
+
+
+def drivers_for(sensors) -> list[str]:
+    """Drivers needed by a SENSOR_SETS entry (unknown names are skipped)."""
+    out: list[str] = []
+    for sensor in sensors:
+        for drv in SENSOR_DRIVERS.get(sensor, ()):
+            if drv not in out:
+                out.append(drv)
+    return out
+
+
+def mark(event: str) -> float:
+    """Record a startup milestone once (seconds since process start)."""
+    with _lock:
+        if event not in _milestones:
+            _milestones[event] = secs = round(time.monotonic() - _T0, 3)
+            metrics.gauge(f"startup_{event}_s", lambda: secs)
+            logger.info("startup: %s after %.3f s", event, secs)
+        return _milestones[event]
+
+
+def stats() -> dict:
+    """Per-driver load/init timing and errors plus startup milestones."""
+    with _lock:
+        return {"drivers": {k: dict(v) for k, v in _info.items()},
+                "milestones": dict(_milestones)}
+
+
+def __getattr__(name: str):
+    # `from modules import gps` / `modules.gps` → lazy load; anything else
+    # falls through to the normal submodule import
+    if name in DRIVERS:
+        mod = load(name)
+        if mod is None:
+            raise ImportError(f"driver '{name}' is not available")
+        return mod
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,184 @@
+"""
+9-DOF attitude and heading fusion (LSM6DSO gyro/accel + MMC5603 magnetometer)
+
+step() is run by a sampler thread (see main._start_samplers). Every call
+pulls all imu samples that arrived since the previous call (hardware fifo
+timestamps, see imu_LSM6DSO.get_samples_since) and feeds them one by one
+into imufusion with the real time between samples as dt. Magnetometer
+samples are matched to the imu sample they precede, so the filter sees
+each mag reading exactly once. The returned dict (quaternion, heading,
+pitch, roll) lands in the latest-value cache like any other sensor;
+pitch/roll use the same axes as imu_LSM6DSO._to_dict, so the fused values
+replace the accel-only ones column for column:
+  pitch = rotation about the sensor x axis (athwartships, bow up/down)
+  roll  = rotation about the sensor y axis (fore-aft) – this is the heel
+          angle, so it is published once, as roll
+"""
+
+from __future__ import annotations
+import time
+import logging
+import numpy as np
+import imufusion
+from config import config
+from modules import imu_LSM6DSO as imu
+from modules import mag_mmc56x3 as mag
+
+# initialize logger
+logger = logging.getLogger(__name__)
+
+# settings
+AHRS_RATE     = getattr(config, "ahrs_rate", 26)        # hz – step() calls in fifo mode
+AHRS_GAIN     = getattr(config, "ahrs_gain", 0.5)
+AHRS_USE_MAG  = bool(getattr(config, "ahrs_use_mag", True))
+MAG_RATE      = getattr(config, "mag_sample_rate", 20)  # hz – single-shot mag reads
+MAX_DT        = 0.1                                      # s – larger gaps restart the integration
+MAG_RETRY_S   = 5.0                                      # s – between magnetometer init attempts
+
+# filter state (only touched by the sampler thread)
+_ahrs = None
+_offset = None
+_last_t = None          # timestamp of the last fused imu sample
+_last_mag_t = 0.0
+_mag_retry_at = 0.0     # monotonic time of the next mag init attempt after a failure
+updates = 0             # imu samples fused
+mag_updates = 0         # samples fused with a magnetometer reading
+
+
+def _init_filter(rate):
+    """creates the imufusion filter for the given imu sample rate."""
+    global _ahrs, _offset
+    _ahrs = imufusion.Ahrs()
+    _ahrs.settings = imufusion.Settings(
+        imufusion.CONVENTION_NWU,
+        AHRS_GAIN,
+        imu.GYRO_FS_DPS,          # gyroscope range (dps)
+        10,                       # acceleration rejection (deg)
+        10,                       # magnetic rejection (deg)
+        int(5 * rate),            # recovery trigger period (samples)
+    )
+    _offset = imufusion.Offset(int(rate))
+    logger.debug("ahrs initialized (%s hz, gain %s, mag=%s)", rate, AHRS_GAIN, AHRS_USE_MAG)
+
+
+def _imu_samples():
+    """
+    returns new imu samples as an (n, 7) array t, acc xyz (g), gyro xyz (dps).
+    fifo mode: everything buffered since the last call; otherwise one fresh read.
+    """
+    if imu.FIFO_ENABLED:
+        return imu.get_samples_since(_last_t if _last_t is not None else time.monotonic() - 1.0)
+    d = imu.get_data()
+    if not d:
+        return np.empty((0, 7))
+    return np.array([[time.monotonic(), d["acc_x"], d["acc_y"], d["acc_z"],
+                      d["gyro_x"], d["gyro_y"], d["gyro_z"]]])
+
+
+def _mag_samples():
+    """
+    returns new magnetometer samples as an (m, 4) array t, mag xyz (µT).
+    continuous mode: everything the mag reader buffered since the last call;
+    otherwise one single-shot measurement at MAG_RATE.
+    """
+    global _last_mag_t, _mag_retry_at
+    if not AHRS_USE_MAG:
+        return np.empty((0, 4))
+    if mag.CONTINUOUS:
+        # a missing / silent magnetometer must not stop the fusion: go on
+        # gyro/accel only and retry the continuous-mode init every MAG_RETRY_S
+        now = time.monotonic()
+        if now < _mag_retry_at:
+            return np.empty((0, 4))
+        try:
+            rows = mag.get_samples_since(_last_mag_t)
+        except OSError as e:
+            _mag_retry_at = now + MAG_RETRY_S
+            logger.error("ahrs_mag_init_error: %s (retry in %.0f s)", e, MAG_RETRY_S)
+            return np.empty((0, 4))
+        if rows.shape[0]:
+            _last_mag_t = rows[-1, 0]
+        return rows
+    now = time.monotonic()
+    if now - _last_mag_t < 1.0 / MAG_RATE:
+        return np.empty((0, 4))
+    try:
+        field = mag.read_field()
+    except OSError as e:
+        logger.error("ahrs_mag_read_error: %s", e)
+        return np.empty((0, 4))
+    _last_mag_t = now
+    return np.array([[now, *field]])
+
+
+def _fuse(samples, mag_samples):
+    """runs the filter over one block of imu samples (mag matched by timestamp)."""
+    global _last_t, updates, mag_updates
+    t = samples[:, 0]
+    acc = np.ascontiguousarray(samples[:, 1:4])
+    # the imu driver only orientation-corrects accel; bring gyro into the same frame
+    gyro = samples[:, 4:7] @ imu._ORIENT.T
+
+    # real time between samples; the first one continues from the last call
+    dt = np.diff(t, prepend=t[0] - 1.0 / imu.IMU_ODR if _last_t is None else _last_t)
+    dt = np.where((dt > 0) & (dt < MAX_DT), dt, 1.0 / imu.IMU_ODR)
+
+    # index of the imu sample each mag reading belongs to (first one at or after it)
+    mag_at = {}
+    if mag_samples.shape[0]:
+        idx = np.minimum(np.searchsorted(t, mag_samples[:, 0]), len(t) - 1)
+        for i, m in zip(idx.tolist(), mag_samples[:, 1:4]):
+            mag_at[i] = m
+
+    for i in range(len(t)):
+        g = _offset.update(gyro[i])
+        m = mag_at.get(i)
+        if m is None:
+            _ahrs.update_no_magnetometer(g, acc[i], dt[i])
+        else:
+            _ahrs.update(g, acc[i], m, dt[i])
+            mag_updates += 1
+    updates += len(t)
+    _last_t = t[-1]
+
+
+def step():
+    """
+    fuses all pending samples and returns the current attitude
+    (None until the first imu sample has been processed).
+    """
+    if _ahrs is None:
+        _init_filter(imu.IMU_ODR)
+    try:
+        samples = _imu_samples()
+    except OSError as e:
+        logger.error("ahrs_imu_read_error: %s", e)
+        return None
+    if samples.shape[0] == 0:
+        return None
+    _fuse(samples, _mag_samples())
+
+    q = _ahrs.quaternion
+    # imufusion: roll about x, pitch about y. the imu driver calls the
+    # rotation about x "pitch" (atan2(ay, …)) and about y "roll" (atan2(-ax, az))
+    rot_x, rot_y, yaw = q.to_euler()
+    w, x, y, z = q.wxyz
+    return {
+        "quat_w":  round(float(w), 5),
+        "quat_x":  round(float(x), 5),
+        "quat_y":  round(float(y), 5),
+        "quat_z":  round(float(z), 5),
+        # nwu yaw is counter-clockwise → compass heading clockwise from north
+        "heading": round(float(-yaw) % 360, 2),
+        "pitch":   round(float(rot_x), 2),
+        "roll":    round(float(rot_y), 2),
+    }
+
+
+def sample_rate():
+    """
+    rate at which step() should be called: fifo mode drains batches, without
+    the fifo every call fuses exactly one fresh sample, so run at imu rate.
+    """
+    return AHRS_RATE if imu.FIFO_ENABLED else imu.IMU_ODR
+
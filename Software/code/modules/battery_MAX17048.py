@@ -1,14 +1,14 @@
 import threading
 import time
-from smbus2 import SMBus
 import logging
 from config import config
+from modules import i2cbus
+import metrics
 
 # initialize logger for this module
 logger = logging.getLogger(__name__)
 
 # max17048 i2c address
-I2C_BUS = 1
 MAX17048_ADDRESS = 0x36
 
 # register addresses for battery voltage and percentage
@@ -19,8 +19,8 @@ SOC_REGISTER = 0x04    # battery percentage register
 battery_voltage = 0.0
 battery_percentage = 0.0
 
-# initialize i2c bus
-i2c = SMBus(I2C_BUS)
+# attach to the shared i2c bus (lowest priority – the gauge is not time critical)
+i2c = i2cbus.device("battery", i2cbus.PRIO_BATTERY)
 
 def read_battery():
     """
@@ -29,11 +29,14 @@ def read_battery():
     """
     global battery_voltage, battery_percentage
 
+    m = metrics.loop("battery_reader")
     while True:
+        t = m.begin()
         try:
-            # read raw register data (2 bytes per register)
-            raw_voltage = i2c.read_word_data(MAX17048_ADDRESS, VCELL_REGISTER)
-            raw_percent = i2c.read_word_data(MAX17048_ADDRESS, SOC_REGISTER)
+            # read raw register data (2 bytes per register) in one bus batch
+            with i2c.locked():
+                raw_voltage = i2c.read_word_data(MAX17048_ADDRESS, VCELL_REGISTER)
+                raw_percent = i2c.read_word_data(MAX17048_ADDRESS, SOC_REGISTER)
 
             # swap byte order (fix for raspberry pi)
             voltage_swapped = ((raw_voltage << 8) & 0xFF00) | (raw_voltage >> 8)
@@ -47,6 +50,8 @@ def read_battery():
             # log error if reading battery data fails
             logger.error("battery_read_battery_error reading battery data: %s. check i2c connection.", e)
             battery_voltage, battery_percentage = 0.0, 0.0
+            m.error()
+        m.end(t)
 
         # wait one second before next reading
         time.sleep(1)
@@ -5,12 +5,17 @@ GPS driver for u-blox SAM-M10Q on I²C
 Adds:
   • NMEA checksum validation
   • Jump rejection – fixes that imply an impossible speed are discarded
+  • Optional UBX mode (config.GPS_PROTOCOL = "ubx") – binary NAV-PVT frames
+    replace RMC/GGA and are decoded with struct into the same _data keys
+    (HDOP from the NAV-DOP frame of the same epoch)
 """
 
 from __future__ import annotations
-import time, math, re, logging
-from smbus2 import SMBus, i2c_msg
+import time, math, re, struct, threading, logging
+from smbus2 import i2c_msg
 from config import config
+from modules import i2cbus
+import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -20,45 +25,68 @@ logger = logging.getLogger(__name__)
 DEVICE_ADDRESS     = int(config.gps_i2c, 16)
 MAX_SPEED_KNOTS    = getattr(config, "GPS_MAX_SPEED_KNOTS", 25)   # physical cap
 MAX_SPEED_MPS      = MAX_SPEED_KNOTS * 0.514444
-I2C_READ_LEN       = 64                          # bytes per transfer
+REG_BYTES_AVAIL    = 0xFD                        # 0xFD/0xFE: bytes available (big endian)
+I2C_MAX_READ       = 1024                        # bytes per transfer (backlog read in chunks)
+RX_BUFFER_MAX      = 4096                        # bytes without a line end → overrun
+POLL_INTERVAL      = 0.02                        # s – wait between backlog reads
+STATS_INTERVAL     = 10.0                        # s – bytes/s + sentences/s window
+PROTOCOL           = str(getattr(config, "GPS_PROTOCOL", "nmea")).lower()  # nmea | ubx
+SUPPORTED_RATES    = (1, 2, 5, 10, 15, 20, 25)   # Hz
+ACK_TIMEOUT        = 1.0                         # s – wait for UBX-ACK/NAK
+RATE_CHECK_S       = getattr(config, "GPS_RATE_CHECK", 3.0)  # s – 0 disables
 
 # --------------------------------------------------------------------------- #
-# Predefined UBX rate config commands                                         #
+# UBX protocol                                                                #
 # --------------------------------------------------------------------------- #
-cfg1 = [
-    0xB5,0x62, 0x06,0x8A, 0x0A,0x00, 0x01,0x01,0x00,0x00,
-    0x01,0x00,0x21,0x30, 0x01,0x00, 0x00,0x00
-]
-
-cfg2 = [
-    0xB5,0x62, 0x06,0x8A, 0x0A,0x00, 0x01,0x01,0x00,0x00,
-    0x01,0x00,0x21,0x30, 0x02,0x00, 0x00,0x00
-]
-
-cfg5 = [
-    0xB5,0x62, 0x06,0x8A, 0x0A,0x00, 0x01,0x01,0x00,0x00,
-    0x01,0x00,0x21,0x30, 0x05,0x00, 0x00,0x00
-]
-
-cfg10 = [
-    0xB5, 0x62, 0x06, 0x8A, 0x0A, 0x00,0x01, 0x01, 0x00, 0x00,
-    0x01, 0x00, 0x21, 0x30, 0x64, 0x00, 0x52, 0xC3
-]
-
-cfg15 = [
-    0xB5,0x62, 0x06,0x8A, 0x0A,0x00, 0x01,0x01,0x00,0x00,
-    0x01,0x00,0x21,0x30, 0x15,0x00, 0x00,0x00
-]
-
-cfg20 = [
-    0xB5,0x62, 0x06,0x8A, 0x0A,0x00, 0x01,0x01,0x00,0x00,
-    0x01,0x00,0x21,0x30, 0x20,0x00, 0x00,0x00
-]
-
-cfg25 = [
-    0xB5,0x62, 0x06,0x8A, 0x0A,0x00, 0x01,0x01,0x00,0x00,
-    0x01,0x00,0x21,0x30, 0x25,0x00, 0x00,0x00
-]
+UBX_SYNC           = b"\xb5\x62"
+UBX_CFG_VALSET     = (0x06, 0x8A)
+UBX_NAV_PVT        = (0x01, 0x07)
+UBX_NAV_DOP        = (0x01, 0x04)
+UBX_ACK_ACK        = (0x05, 0x01)
+UBX_ACK_NAK        = (0x05, 0x00)
+UBX_MAX_PAYLOAD    = 1024                        # larger length field → bad sync
+
+# CFG-VALSET keys (u-blox M10 interface description) → value size in bytes
+CFG_RATE_MEAS            = 0x30210001            # U2 – measurement period [ms]
+CFG_RATE_NAV             = 0x30210002            # U2 – measurements per epoch
+CFG_I2COUTPROT_NMEA      = 0x10720002            # L
+CFG_MSGOUT_NAV_PVT_I2C   = 0x20910006            # U1 – output rate per epoch
+CFG_MSGOUT_NAV_DOP_I2C   = 0x20910038            # U1 – output rate per epoch
+CFG_MSGOUT_NMEA_I2C      = (0x209100BA,          # GGA
+                            0x209100C9,          # GLL
+                            0x209100BF,          # GSA
+                            0x209100C4,          # GSV
+                            0x209100AB,          # RMC
+                            0x209100B0)          # VTG
+CFG_MSGOUT_RMC_I2C       = 0x209100AB
+CFG_MSGOUT_GGA_I2C       = 0x209100BA
+_KEY_SIZE = {0x1: 1, 0x2: 1, 0x3: 2, 0x4: 4, 0x5: 8}  # bits 28..30 of the key
+
+# NAV-PVT payload (92 bytes) – see u-blox interface description
+_NAV_PVT = struct.Struct("<IHBBBBBBIiBBBBiiiiIIiiiiiIIHH4xihH")
+# NAV-DOP payload (18 bytes): iTOW, g/p/t/v/h/n/eDOP (scale 0.01)
+_NAV_DOP = struct.Struct("<I7H")
+
+def _ubx_checksum(body: bytes) -> bytes:
+    """8-bit Fletcher checksum over class, id, length and payload."""
+    a = b = 0
+    for byte in body:
+        a = (a + byte) & 0xFF
+        b = (b + a) & 0xFF
+    return bytes((a, b))
+
+def _ubx_frame(cls: int, msg_id: int, payload: bytes = b"") -> bytes:
+    """Complete UBX frame: sync, header, payload, checksum."""
+    body = struct.pack("<BBH", cls, msg_id, len(payload)) + payload
+    return UBX_SYNC + body + _ubx_checksum(body)
+
+def _ubx_valset(items: dict[int, int], layers: int = 0x01) -> bytes:
+    """CFG-VALSET frame for {key: value} (layer 0x01 = RAM)."""
+    payload = bytearray(struct.pack("<BBxx", 0x00, layers))
+    for key, value in items.items():
+        size = _KEY_SIZE[(key >> 28) & 0x7]
+        payload += struct.pack("<I", key) + value.to_bytes(size, "little")
+    return _ubx_frame(*UBX_CFG_VALSET, bytes(payload))
 
 # --------------------------------------------------------------------------- #
 # Helpers                                                                      #
@@ -86,6 +114,19 @@ def _haversine_m(lat1, lon1, lat2, lon2) -> float:
     a = math.sin(dφ/2)**2 + math.cos(φ1) * math.cos(φ2) * math.sin(dλ/2)**2
     return 2 * R * math.asin(math.sqrt(a))
 
+def _plausible(lat: float, lon: float) -> bool:
+    """Jump rejection against impossible speed; remembers accepted fixes."""
+    global _prev_lat, _prev_lon, _prev_time_utc
+    if _prev_lat is not None:
+        dt = time.time() - _prev_time_utc
+        dist_m = _haversine_m(_prev_lat, _prev_lon, lat, lon)
+        if dt > 0 and dist_m / dt > MAX_SPEED_MPS:
+            logger.warning("GPS spike rejected: %.1f m in %.2f s = %.1f m/s",
+                           dist_m, dt, dist_m / dt)
+            return False
+    _prev_lat, _prev_lon, _prev_time_utc = lat, lon, time.time()
+    return True
+
 # --------------------------------------------------------------------------- #
 # Sentence → decimal helpers                                                  #
 # --------------------------------------------------------------------------- #
@@ -112,25 +153,74 @@ _default = dict.fromkeys(
     ["datetime","status","lat","long","SOG","COG","fixQ","nSat","HDOP","alt"]
 )
 _data           = _default.copy()
-_buffer         = ""
+_rx             = bytearray()     # reusable receive buffer (raw bytes)
 _prev_lat       = None
 _prev_lon       = None
 _prev_time_utc  = None            # float seconds since epoch
+_acks: dict[tuple[int, int], bool] = {}   # (cls, id) → ACK (True) / NAK (False)
+_dop_itow       = None            # iTOW of the last NAV-DOP …
+_dop_hdop       = None            # … and its hDOP
+_rx_lock        = threading.Lock()  # reader thread vs. init_gps polling
+
+# epoch hand-off – wait_for_fix() sleeps on _fix_cond until the parser has
+# assembled a complete epoch (RMC+GGA or one NAV-PVT)
+_fix_cond       = threading.Condition()
+_fix_seq        = 0               # completed navigation epochs
+_fix_data: dict = _default.copy()
+_epoch_time     = None            # hhmmss.ss of the epoch being assembled
+_epoch_have: set[str] = set()     # {"RMC", "GGA"} seen for _epoch_time
+
+i2c_bus = i2cbus.device("gps", i2cbus.PRIO_GPS)   # shared /dev/i2c-1
+
+# reader statistics – see get_stats()
+_stats          = {"bytes_per_s": 0.0, "sentences_per_s": 0.0, "overruns": 0,
+                   "rate_hz": None}
+_cnt_bytes      = 0
+_cnt_sentences  = 0
+_cnt_since      = time.monotonic()
 
-i2c_bus = SMBus(1)
+# --------------------------------------------------------------------------- #
+# Epoch hand-off                                                              #
+# --------------------------------------------------------------------------- #
+def _publish_epoch() -> None:
+    """Freeze the current _data as epoch _fix_seq and wake all waiters."""
+    global _fix_seq, _fix_data
+    with _fix_cond:
+        _fix_seq += 1
+        _fix_data = _data.copy()
+        _fix_cond.notify_all()
+
+def _epoch_part(kind: str, utc: str) -> None:
+    """Collect RMC/GGA of one UTC time; publish once both are in."""
+    global _epoch_time
+    if utc != _epoch_time:
+        _epoch_time = utc
+        _epoch_have.clear()
+    _epoch_have.add(kind)
+    if len(_epoch_have) == 2:
+        _epoch_have.clear()
+        _epoch_time = None
+        _publish_epoch()
 
 # --------------------------------------------------------------------------- #
 # NMEA parsing                                                                #
 # --------------------------------------------------------------------------- #
 def _parse(line: str) -> None:
     """Update the module-level _data dict from one NMEA sentence."""
-    global _data, _prev_lat, _prev_lon, _prev_time_utc
-
     # ── discard corrupted sentences ───────────────────────────────────────────
     if not _nmea_checksum_ok(line):
         return
 
     f = line.split(",")
+    try:
+        _apply_nmea(line, f)
+    finally:
+        # RMC + GGA with the same UTC time form one epoch
+        if line.startswith(("$GNRMC", "$GNGGA")) and len(f) > 1:
+            _epoch_part(line[3:6], f[1])
+
+def _apply_nmea(line: str, f: list[str]) -> None:
+    global _data
 
     # ── Recommended Minimum data (date, time, status, pos, SOG/COG) ──────────
     if line.startswith("$GNRMC"):
@@ -163,14 +253,8 @@ def _parse(line: str) -> None:
             return
 
         # ---- jump-rejection against impossible speed ------------------------
-        if _prev_lat is not None:
-            dt = time.time() - _prev_time_utc
-            dist_m = _haversine_m(_prev_lat, _prev_lon, lat, lon)
-            if dt > 0 and dist_m / dt > MAX_SPEED_MPS:
-                logger.warning("GPS spike rejected: %.1f m in %.2f s = %.1f m/s",
-                               dist_m, dt, dist_m / dt)
-                return
-        _prev_lat, _prev_lon, _prev_time_utc = lat, lon, time.time()
+        if not _plausible(lat, lon):
+            return
 
         _data["lat"], _data["long"] = lat, lon
         sog = float(f[7]) if f[7] else None
@@ -185,31 +269,188 @@ def _parse(line: str) -> None:
         _data["HDOP"] = float(f[8]) if f[8] else None
         _data["alt"]  = float(f[9]) if f[9] else None
 
+# --------------------------------------------------------------------------- #
+# UBX NAV-PVT decoding                                                        #
+# --------------------------------------------------------------------------- #
+def _parse_nav_dop(payload: bytes) -> None:
+    """Keep hDOP for the NAV-PVT of the same epoch (NAV-DOP is sent first)."""
+    global _dop_itow, _dop_hdop
+    itow, _g, _p, _t, _v, h_dop, _n, _e = _NAV_DOP.unpack_from(payload)
+    _dop_itow, _dop_hdop = itow, round(h_dop * 0.01, 2)
+
+def _parse_nav_pvt(payload: bytes) -> None:
+    """Fill _data (same keys as RMC+GGA) from one NAV-PVT payload."""
+    try:
+        _apply_nav_pvt(payload)
+    finally:
+        _publish_epoch()                         # NAV-PVT is a complete epoch
+
+def _apply_nav_pvt(payload: bytes) -> None:
+    (itow, year, month, day, hour, minute, sec, valid, _tacc, nano,
+     fix_type, flags, _flags2, num_sv, lon, lat, _height, h_msl,
+     _hacc, _vacc, _vel_n, _vel_e, _vel_d, g_speed, head_mot,
+     _sacc, _headacc, _p_dop, _flags3, _head_veh, _mag_dec, _mag_acc
+     ) = _NAV_PVT.unpack_from(payload)
+
+    upd = {}
+    # validDate + validTime → same ISO string the RMC path builds
+    if valid & 0x03 == 0x03:
+        ss = max(0.0, sec + nano * 1e-9)
+        upd["datetime"] = (f"{year:04d}-{month:02d}-{day:02d}"
+                           f"T{hour:02d}:{minute:02d}:{ss:05.2f}Z")
+    else:
+        upd["datetime"] = None
+
+    fix_ok = bool(flags & 0x01) and fix_type in (2, 3, 4)
+    upd["status"] = "A" if fix_ok else "V"
+
+    # GGA-style quality: 0 none, 1 GNSS, 2 DGNSS, 4 RTK fixed, 5 RTK float, 6 DR
+    carr = (flags >> 6) & 0x03
+    if not fix_ok:
+        upd["fixQ"] = 6 if fix_type == 1 else 0
+    elif carr:
+        upd["fixQ"] = 4 if carr == 2 else 5
+    else:
+        upd["fixQ"] = 2 if flags & 0x02 else 1
+    upd["nSat"] = num_sv
+    # NAV-PVT carries PDOP only – HDOP comes from this epoch's NAV-DOP
+    upd["HDOP"] = _dop_hdop if _dop_itow == itow else None
+
+    sog = round(g_speed * 0.001943844, 2)        # mm/s → kn
+    upd["SOG"] = sog
+    upd["COG"] = round(head_mot * 1e-5, 2) if sog >= 0.5 else None
+
+    if not fix_ok:
+        upd["lat"] = upd["long"] = upd["alt"] = None
+        _data.update(upd)
+        return
+
+    lat_d, lon_d = round(lat * 1e-7, 8), round(lon * 1e-7, 8)
+    if not _plausible(lat_d, lon_d):             # keep the last good position
+        _data.update(upd)
+        return
+    upd["lat"], upd["long"] = lat_d, lon_d
+    upd["alt"] = round(h_msl * 0.001, 1)
+    _data.update(upd)
+
 
 # --------------------------------------------------------------------------- #
 # I²C reader thread                                                           #
 # --------------------------------------------------------------------------- #
+def _bytes_available() -> int:
+    """Read the receiver's 16-bit 'bytes available' counter (0xFD/0xFE)."""
+    wr = i2c_msg.write(DEVICE_ADDRESS, [REG_BYTES_AVAIL])
+    rd = i2c_msg.read(DEVICE_ADDRESS, 2)
+    i2c_bus.i2c_rdwr(wr, rd)
+    hi, lo = bytes(rd)
+    n = (hi << 8) | lo
+    return 0 if n == 0xFFFF else n               # 0xFFFF = not ready
+
+def _read_backlog(n: int) -> None:
+    """Append n bytes from the data stream (0xFF) to _rx in bulk transfers."""
+    global _cnt_bytes
+    while n > 0:
+        chunk = min(n, I2C_MAX_READ)
+        wr = i2c_msg.write(DEVICE_ADDRESS, [0xFF])
+        rd = i2c_msg.read(DEVICE_ADDRESS, chunk)
+        i2c_bus.i2c_rdwr(wr, rd)
+        _rx.extend(bytes(rd))
+        _cnt_bytes += chunk
+        n -= chunk
+
+def _handle_ubx(cls: int, msg_id: int, payload: bytes) -> None:
+    """Dispatch one checksum-verified UBX frame."""
+    if (cls, msg_id) == UBX_NAV_PVT and len(payload) == _NAV_PVT.size:
+        _parse_nav_pvt(payload)
+    elif (cls, msg_id) == UBX_NAV_DOP and len(payload) == _NAV_DOP.size:
+        _parse_nav_dop(payload)
+    elif (cls, msg_id) in (UBX_ACK_ACK, UBX_ACK_NAK) and len(payload) >= 2:
+        _acks[(payload[0], payload[1])] = msg_id == UBX_ACK_ACK[1]
+
+def _split_lines() -> None:
+    """Parse every complete NMEA line / UBX frame in _rx; keep the tail."""
+    global _cnt_sentences
+    start = 0
+    end = len(_rx)
+    with memoryview(_rx) as mv:
+        while start < end:
+            d = _rx.find(b"$", start)
+            u = _rx.find(UBX_SYNC, start)
+            if u != -1 and (d == -1 or u < d):
+                # ── binary UBX frame ──────────────────────────────────────
+                if end - u < 6:
+                    start = u
+                    break
+                length = mv[u + 4] | (mv[u + 5] << 8)
+                if length > UBX_MAX_PAYLOAD:     # false sync inside noise
+                    start = u + 2
+                    continue
+                if end - u < 8 + length:
+                    start = u
+                    break
+                if _ubx_checksum(mv[u + 2:u + 6 + length]) == mv[u + 6 + length:u + 8 + length]:
+                    _cnt_sentences += 1
+                    _handle_ubx(mv[u + 2], mv[u + 3], mv[u + 6:u + 6 + length].tobytes())
+                    start = u + 8 + length
+                else:
+                    start = u + 2
+                continue
+            if d == -1:
+                # nothing useful; keep a trailing 0xB5 (half a sync word)
+                start = end - 1 if _rx.endswith(b"\xb5") else end
+                break
+            # ── NMEA text line ───────────────────────────────────────────
+            nl = _rx.find(b"\n", d)
+            if nl == -1:
+                start = d
+                break
+            if u != -1 and u < nl:                # line broken by a UBX frame
+                start = u
+                continue
+            if _rx.startswith(b"$G", d):
+                line = mv[d:nl].tobytes().rstrip(b"\r")
+                _cnt_sentences += 1
+                _parse(line.decode("ascii", errors="replace"))
+            start = nl + 1
+    del _rx[:start]
+
+    if len(_rx) > RX_BUFFER_MAX:                 # no line end in sight → garbage
+        _stats["overruns"] += 1
+        logger.warning("GPS receive buffer overrun: dropped %d bytes", len(_rx))
+        _rx.clear()
+
+def _update_stats(now: float) -> None:
+    global _cnt_bytes, _cnt_sentences, _cnt_since
+    dt = now - _cnt_since
+    if dt < STATS_INTERVAL:
+        return
+    _stats["bytes_per_s"]     = round(_cnt_bytes / dt, 1)
+    _stats["sentences_per_s"] = round(_cnt_sentences / dt, 1)
+    logger.debug("GPS reader: %.0f B/s, %.1f sentences/s, %d overruns",
+                 _stats["bytes_per_s"], _stats["sentences_per_s"], _stats["overruns"])
+    _cnt_bytes = _cnt_sentences = 0
+    _cnt_since = now
+
+def _poll() -> None:
+    """Read and parse whatever the receiver has buffered."""
+    with _rx_lock:
+        avail = _bytes_available()
+        if avail:
+            _read_backlog(avail)
+            _split_lines()
+
 def read_gps() -> None:
-    global _buffer
+    m = metrics.loop("gps_reader")
     while True:
+        t = m.begin()
         try:
-            msg = i2c_msg.read(DEVICE_ADDRESS, I2C_READ_LEN)
-            i2c_bus.i2c_rdwr(msg)
-            _buffer += "".join(
-                chr(b) for b in msg if b in (10,13) or 32 <= b <= 126
-            )
-
-            while True:
-                nl = _buffer.find("\n")
-                if nl == -1:
-                    break
-                line = _buffer[:nl].rstrip("\r")
-                _buffer = _buffer[nl+1:]
-                if line.startswith(("$GN", "$GP", "$GA")):
-                    _parse(line)
+            _poll()
         except OSError as e:
+            m.error()
             logger.error("GPS I2C error: %s", e)
-        time.sleep(0.05)
+        m.end(t)
+        _update_stats(time.monotonic())
+        time.sleep(POLL_INTERVAL)
 
 # --------------------------------------------------------------------------- #
 # Public helpers                                                              #
@@ -217,26 +458,96 @@ def read_gps() -> None:
 def get_data():
     return _data.copy()
 
+def wait_for_fix(last_seq: int = 0, timeout: float | None = None):
+    """
+    Block until an epoch newer than `last_seq` has been assembled.
+    Returns (seq, data) – data as in get_data() – or None on timeout.
+    """
+    with _fix_cond:
+        if not _fix_cond.wait_for(lambda: _fix_seq > last_seq, timeout):
+            return None
+        return _fix_seq, _fix_data.copy()
+
+def get_stats() -> dict:
+    """Reader throughput: bytes/s, sentences/s, buffer overruns, achieved rate."""
+    return _stats.copy()
+
+def send_ubx(frame: bytes, timeout: float = ACK_TIMEOUT) -> bool | None:
+    """
+    Write one UBX command and wait for its acknowledgement.
+    Returns True (ACK), False (NAK) or None (no answer within timeout).
+    """
+    key = (frame[2], frame[3])
+    _acks.pop(key, None)
+    i2c_bus.i2c_rdwr(i2c_msg.write(DEVICE_ADDRESS, frame))
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        _poll()
+        if key in _acks:
+            return _acks.pop(key)
+        time.sleep(0.01)
+    return None
+
+def _configure(name: str, items: dict[int, int]) -> bool:
+    """CFG-VALSET with ACK check; logs the outcome."""
+    try:
+        ack = send_ubx(_ubx_valset(items))
+    except OSError as e:
+        logger.error("GPS %s config failed: %s", name, e)
+        return False
+    if ack:
+        logger.debug("GPS %s config acknowledged", name)
+    elif ack is None:
+        logger.error("GPS %s config: no ACK within %.1f s", name, ACK_TIMEOUT)
+    else:
+        logger.error("GPS %s config rejected (NAK)", name)
+    return bool(ack)
+
+def measure_rate(window: float = RATE_CHECK_S) -> float:
+    """Count navigation epochs over `window` seconds → achieved rate in Hz."""
+    start, t0 = _fix_seq, time.monotonic()
+    while time.monotonic() - t0 < window:
+        try:
+            _poll()
+        except OSError as e:
+            logger.error("GPS I2C error: %s", e)
+        time.sleep(POLL_INTERVAL)
+    rate = round((_fix_seq - start) / (time.monotonic() - t0), 1)
+    _stats["rate_hz"] = rate
+    return rate
+
 def init_gps():
-    """Configures the GPS update rate based on config.GPS_UPDATE_HZ."""
+    """
+    Configures update rate and output messages (config.GPS_UPDATE,
+    config.GPS_PROTOCOL) and verifies the achieved rate.
+    """
     rate = getattr(config, "GPS_UPDATE", 10)
-    configs = {
-        1:  cfg1,
-        2:  cfg2,
-        5:  cfg5,
-        10: cfg10,
-        15: cfg15,
-        20: cfg20,
-        25: cfg25
-    }
-    cfg = configs.get(rate, cfg10)
-    if cfg is cfg10 and rate != 10:
+    if rate not in SUPPORTED_RATES:
         logger.warning("Unsupported GPS rate '%s Hz'; using 10 Hz fallback", rate)
+        rate = 10
 
-    try:
-        with SMBus(1) as bus:
-            bus.write_i2c_block_data(DEVICE_ADDRESS, 0xFF, cfg)
-            logger.debug("GPS update rate configured: %d Hz", rate)
-    except Exception as e:
-        logger.error("GPS init failed: %s", e)
+    if _configure("rate", {CFG_RATE_MEAS: round(1000 / rate), CFG_RATE_NAV: 1}):
+        logger.debug("GPS update rate configured: %d Hz", rate)
 
+    if PROTOCOL == "ubx":
+        items = {CFG_MSGOUT_NAV_PVT_I2C: 1, CFG_MSGOUT_NAV_DOP_I2C: 1,
+                 CFG_I2COUTPROT_NMEA: 0}
+        items.update(dict.fromkeys(CFG_MSGOUT_NMEA_I2C, 0))
+        if _configure("NAV-PVT", items):
+            logger.debug("GPS UBX NAV-PVT + NAV-DOP output enabled, NMEA disabled")
+    else:
+        if PROTOCOL != "nmea":
+            logger.warning("Unknown GPS_PROTOCOL '%s'; staying on NMEA", PROTOCOL)
+        # only RMC + GGA are parsed – drop the rest to save I²C bandwidth
+        items = dict.fromkeys(CFG_MSGOUT_NMEA_I2C, 0)
+        items.update({CFG_MSGOUT_RMC_I2C: 1, CFG_MSGOUT_GGA_I2C: 1,
+                      CFG_I2COUTPROT_NMEA: 1, CFG_MSGOUT_NAV_PVT_I2C: 0,
+                      CFG_MSGOUT_NAV_DOP_I2C: 0})
+        _configure("NMEA output", items)
+
+    if RATE_CHECK_S > 0:
+        achieved = measure_rate(RATE_CHECK_S)
+        if achieved < rate * 0.9:
+            logger.error("GPS achieved rate %.1f Hz below requested %d Hz", achieved, rate)
+        else:
+            logger.debug("GPS achieved rate %.1f Hz (requested %d Hz)", achieved, rate)
@@ -0,0 +1,194 @@
+"""
+Shared I²C bus manager for /dev/i2c-1
+
+All drivers (GPS, IMU, magnetometer, battery) go through one SMBus handle:
+  • transactions are serialised by a priority lock – when the bus is
+    released the waiting transaction with the best priority goes next, so
+    high-rate IMU/GPS reads overtake the battery gauge
+  • `device(name, priority)` returns an SMBus-compatible handle; drivers keep
+    their existing calls (read_i2c_block_data(addr, …), i2c_rdwr(…), …)
+  • `with dev.locked():` holds the bus for several back-to-back transfers
+    (batched register reads without another device slipping in between)
+  • per-device latency (wait + transfer), error counts and bus utilisation
+"""
+
+from __future__ import annotations
+import heapq, itertools, threading, time, logging
+from contextlib import contextmanager
+from smbus2 import SMBus
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------------------------------- #
+# Priorities (lower = served first)                                           #
+# --------------------------------------------------------------------------- #
+PRIO_IMU     = 0
+PRIO_GPS     = 1
+PRIO_MAG     = 2
+PRIO_BATTERY = 9
+
+I2C_BUS = 1
+
+# --------------------------------------------------------------------------- #
+# Priority lock                                                               #
+# --------------------------------------------------------------------------- #
+class _PriorityLock:
+    """Mutex that hands over to the highest-priority waiter (FIFO within a level)."""
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._waiters: list = []         # heap of (priority, seq, event)
+        self._seq = itertools.count()
+        self._owner = None               # thread ident
+        self._depth = 0                  # re-entrant holds by the owner
+
+    def acquire(self, priority: int) -> None:
+        me = threading.get_ident()
+        with self._mutex:
+            if self._owner == me:
+                self._depth += 1
+                return
+            if self._owner is None and not self._waiters:
+                self._owner, self._depth = me, 1
+                return
+            ev = threading.Event()
+            heapq.heappush(self._waiters, (priority, next(self._seq), ev))
+        ev.wait()                        # ownership is handed over in release()
+        with self._mutex:
+            self._owner, self._depth = me, 1
+
+    def held(self) -> bool:
+        return self._owner == threading.get_ident()
+
+    def release(self) -> None:
+        with self._mutex:
+            self._depth -= 1
+            if self._depth:
+                return
+            if self._waiters:
+                _, _, ev = heapq.heappop(self._waiters)
+                self._owner = ev         # reserved until the waiter sets itself
+                ev.set()
+            else:
+                self._owner = None
+
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+# --------------------------------------------------------------------------- #
+# Bus + per-device statistics                                                 #
+# --------------------------------------------------------------------------- #
+_smbus: SMBus | None = None
+_lock = _PriorityLock()
+_busy_s = 0.0                            # time the bus was held (utilisation)
+_since = time.monotonic()
+_devices: dict[str, "I2CDevice"] = {}
+
+
+def _bus() -> SMBus:
+    global _smbus
+    if _smbus is None:
+        _smbus = SMBus(I2C_BUS)
+    return _smbus
+
+
+class I2CDevice:
+    """SMBus-compatible handle that runs every call through the shared bus."""
+
+    def __init__(self, name: str, priority: int):
+        self.name = name
+        self.priority = priority
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.lat_sum = 0.0               # s – wait + transfer
+        self.lat_max = 0.0
+        self.wait_max = 0.0
+
+    # ------------------------------------------------------------------ #
+    @contextmanager
+    def locked(self):
+        """Hold the bus for a batch of transfers."""
+        global _busy_s
+        if _lock.held():                 # nested inside a batch
+            yield self
+            return
+        t_req = time.monotonic()
+        _lock.acquire(self.priority)
+        t_got = time.monotonic()
+        try:
+            yield self
+        finally:
+            _busy_s += time.monotonic() - t_got
+            _lock.release()
+            self.wait_max = max(self.wait_max, t_got - t_req)
+
+    def _run(self, fn, *args):
+        t0 = time.monotonic()
+        try:
+            with self.locked():
+                return fn(*args)
+        except OSError:
+            self.errors += 1
+            raise
+        finally:
+            lat = time.monotonic() - t0
+            self.count += 1
+            self.lat_sum += lat
+            self.lat_max = max(self.lat_max, lat)
+
+    # ------------------------------------------------------------------ #
+    # SMBus API used by the drivers                                      #
+    # ------------------------------------------------------------------ #
+    def read_byte_data(self, addr, reg):
+        return self._run(_bus().read_byte_data, addr, reg)
+
+    def write_byte_data(self, addr, reg, value):
+        return self._run(_bus().write_byte_data, addr, reg, value)
+
+    def read_word_data(self, addr, reg):
+        return self._run(_bus().read_word_data, addr, reg)
+
+    def read_i2c_block_data(self, addr, reg, length):
+        return self._run(_bus().read_i2c_block_data, addr, reg, length)
+
+    def write_i2c_block_data(self, addr, reg, data):
+        return self._run(_bus().write_i2c_block_data, addr, reg, data)
+
+    def i2c_rdwr(self, *msgs):
+        return self._run(_bus().i2c_rdwr, *msgs)
+
+# --------------------------------------------------------------------------- #
+# Public helpers                                                              #
+# --------------------------------------------------------------------------- #
+def device(name: str, priority: int) -> I2CDevice:
+    """Return (and register once) the bus handle for one driver."""
+    dev = _devices.get(name)
+    if dev is None:
+        dev = _devices[name] = I2CDevice(name, priority)
+    return dev
+
+
+def stats(reset: bool = True) -> dict:
+    """Bus utilisation plus per-device transactions, error rate and latency."""
+    global _busy_s, _since
+    now = time.monotonic()
+    elapsed = max(now - _since, 1e-9)
+    out = {"utilisation": round(_busy_s / elapsed, 3), "waiting": _lock.waiting(),
+           "devices": {}}
+    for name, d in _devices.items():
+        out["devices"][name] = {
+            "tx":          d.count,
+            "errors":      d.errors,
+            "error_rate":  round(d.errors / d.count, 4) if d.count else 0.0,
+            "lat_avg_ms":  round(d.lat_sum / d.count * 1000, 2) if d.count else None,
+            "lat_max_ms":  round(d.lat_max * 1000, 2),
+            "wait_max_ms": round(d.wait_max * 1000, 2),
+        }
+        if reset:
+            d._reset_stats()
+    if reset:
+        _busy_s, _since = 0.0, now
+    return out
@@ -1,6 +1,13 @@
 import smbus2  # use smbus2 for raspberry pi i2c communication
+import json
 import math
+import os
+import threading
+import time
+import numpy as np
 from config import config  # import your config
+from modules import i2cbus  # shared, priority-scheduled i2c bus
+import metrics
 import logging
 
 # initialize logger for this module
@@ -10,22 +17,67 @@ logger = logging.getLogger(__name__)
 LSM6DSO_ADDR = int(config.imu_i2c, 16)
 
 # lsm6dso register addresses
+FIFO_CTRL1 = 0x07  # fifo watermark [7:0]
+FIFO_CTRL2 = 0x08  # fifo watermark [8]
+FIFO_CTRL3 = 0x09  # fifo batch data rate (gyro [7:4], accel [3:0])
+FIFO_CTRL4 = 0x0A  # fifo mode [2:0]
 WHO_AM_I   = 0x0F  # who_am_i register
 CTRL1_XL   = 0x10  # accelerometer control register
 CTRL2_G    = 0x11  # gyroscope control register
+CTRL3_C    = 0x12  # bdu / if_inc / sw_reset
 OUTX_L_G   = 0x22  # gyroscope x-axis low byte
 OUTX_L_A   = 0x28  # accelerometer x-axis low byte
+FIFO_STATUS1 = 0x3A  # unread fifo words [7:0]
+FIFO_STATUS2 = 0x3B  # unread fifo words [9:8] + overrun flags
+FIFO_DATA_OUT_TAG = 0x78  # tag byte, followed by 6 data bytes (auto-rolls back)
 
-# accelerometer and gyroscope settings
-ACCEL_ODR_104HZ = 0x40  # accelerometer output data rate = 104 hz
-ACCEL_FS_2G     = 0x00  # full-scale selection = ±2g
-GYRO_ODR_104HZ  = 0x40  # gyroscope output data rate = 104 hz
-GYRO_FS_250DPS  = 0x00  # full-scale selection = ±250 dps
+# odr code (CTRL1_XL / CTRL2_G [7:4] and FIFO_CTRL3 batch rate use the same table)
+ODR_CODES = {12.5: 0x1, 26: 0x2, 52: 0x3, 104: 0x4, 208: 0x5, 416: 0x6, 833: 0x7}
+
+# full-scale code [3:2] and sensitivity per lsb
+ACCEL_FS = {2: (0x0, 0.061), 4: (0x2, 0.122), 8: (0x3, 0.244), 16: (0x1, 0.488)}    # mg/lsb
+GYRO_FS  = {125: (0x2, 4.375), 250: (0x0, 8.75), 500: (0x4, 17.5),
+            1000: (0x8, 35.0), 2000: (0xC, 70.0)}                                   # mdps/lsb
+
+# fifo settings
+FIFO_MODE_CONTINUOUS = 0x06  # stream mode, oldest words are overwritten
+FIFO_TAG_GYRO        = 0x01  # gyroscope nc
+FIFO_TAG_ACCEL       = 0x02  # accelerometer nc
+FIFO_WORD_LEN        = 7     # tag + x/y/z (2 bytes each)
+FIFO_MAX_WORDS_READ  = 32    # words per i2c transaction (224 bytes)
+FIFO_OVR_LATCHED     = 0x08  # FIFO_STATUS2: overrun since last status read
+
+# settings from config.py (fall back to the former hard-coded 104 hz / ±2 g / ±250 dps)
+IMU_ODR = getattr(config, "imu_odr", 104)
+if IMU_ODR not in ODR_CODES:
+    logger.warning("gyroacc unsupported imu_odr '%s hz'; using 104 hz", IMU_ODR)
+    IMU_ODR = 104
+ACCEL_FS_G = getattr(config, "imu_accel_fs", 2)
+if ACCEL_FS_G not in ACCEL_FS:
+    logger.warning("gyroacc unsupported imu_accel_fs '%s g'; using 2 g", ACCEL_FS_G)
+    ACCEL_FS_G = 2
+GYRO_FS_DPS = getattr(config, "imu_gyro_fs", 250)
+if GYRO_FS_DPS not in GYRO_FS:
+    logger.warning("gyroacc unsupported imu_gyro_fs '%s dps'; using 250 dps", GYRO_FS_DPS)
+    GYRO_FS_DPS = 250
+FIFO_ENABLED = bool(getattr(config, "imu_fifo", False))
+
+ACCEL_SCALE = ACCEL_FS[ACCEL_FS_G][1] / 1000  # g per lsb
+GYRO_SCALE  = GYRO_FS[GYRO_FS_DPS][1] / 1000  # dps per lsb
 
 # globals to handle initialization only once
 _bus = None
 _initialized = False
 
+# fifo ring buffer: one row per accel sample -> t, acc_x, acc_y, acc_z, gyro_x, gyro_y, gyro_z
+# (t is time.monotonic(); accel axes are orientation-corrected)
+_ring = None
+_ring_idx = 0       # next write position
+_ring_count = 0     # valid rows (<= len(_ring))
+_ring_lock = threading.Lock()
+_last_gyro = np.zeros(3)  # carried over when a batch starts with an accel word
+fifo_overruns = 0         # hardware fifo overflowed before it was drained
+
 def _write_register(register, value):
     """writes a byte to a specific register."""
     global _bus
@@ -36,6 +88,13 @@ def _read_registers(start_register, length):
     global _bus
     return _bus.read_i2c_block_data(LSM6DSO_ADDR, start_register, length)
 
+def _read_block(start_register, length):
+    """reads more than 32 bytes in one combined write/read i2c transaction."""
+    write = smbus2.i2c_msg.write(LSM6DSO_ADDR, [start_register])
+    read = smbus2.i2c_msg.read(LSM6DSO_ADDR, length)
+    _bus.i2c_rdwr(write, read)
+    return bytes(read)
+
 def _twos_complement(value, bits):
     """converts a raw register value to signed integer using two's complement."""
     if value & (1 << (bits - 1)):
@@ -48,7 +107,7 @@ def _apply_orientation(ax, ay, az):
     2) then apply one of 3 possible orientations from config.device_orientation.
        adjust these transforms as needed for your physical mounting.
     """
-    # step 1: 
+    # step 1:
     new_ax = -ay
     new_ay = ax
     new_az = az
@@ -83,45 +142,207 @@ def _apply_orientation(ax, ay, az):
     # return final, corrected axes
     return (new_ax, new_ay, new_az)
 
+# _apply_orientation as a matrix (column i = image of unit axis i) for bulk fifo samples
+_ORIENT = np.array([_apply_orientation(*axis) for axis in np.eye(3)], dtype=float).T
+
+def _to_dict(ax, ay, az, gx, gy, gz):
+    """builds the public sample dict (same keys as the database columns)."""
+    ax, ay, az = round(ax, 2), round(ay, 2), round(az, 2)
+
+    # compute pitch and roll from corrected accelerometer data as an example
+    pitch = round(math.atan2(ay, math.sqrt(ax**2 + az**2)) * 180 / math.pi, 2)
+    roll = round(math.atan2(-ax, az) * 180 / math.pi, 2)
+
+    return {
+        "acc_x":   ax,
+        "acc_y":   ay,
+        "acc_z":   az,
+        "gyro_x":  round(gx, 2),
+        "gyro_y":  round(gy, 2),
+        "gyro_z":  round(gz, 2),
+        "pitch":   pitch,
+        "roll":    roll
+    }
+
+# ---------------------------------------------------------------------------
+# calibration (written by calibrate.py, sensor frame)
+# ---------------------------------------------------------------------------
+CALIB_DIR = os.path.dirname(os.path.abspath(config.__file__))  # next to config.py
+
+def _load_json(name):
+    try:
+        with open(f"{CALIB_DIR}/{name}", "r", encoding="utf-8") as fp:
+            return json.load(fp)
+    except Exception as e:
+        logger.error("gyroacc_load_calibration_error %s: %s – using identity", name, e)
+        return {}
+
+def _load_calibration():
+    """
+    folds accel bias/scale and the mounting orientation into one affine
+    transform, so every sample is corrected with one matrix product:
+        acc_boat = ACC_A @ acc_raw - ACC_C
+        gyro     = gyro_raw - GYRO_BIAS
+    a scale of 0 (old all-zero files) means "not calibrated" -> 1.
+    """
+    acc = _load_json("accel_offsets.json")
+    gyro = _load_json("gyro_offsets.json")
+    offset = np.array([acc.get(k, 0.0) for k in ("OX", "OY", "OZ")], dtype=float)
+    scale = np.array([acc.get(k, 0.0) or 1.0 for k in ("SX", "SY", "SZ")], dtype=float)
+    a = _ORIENT @ np.diag(scale)
+    bias = np.array([gyro.get(k, 0.0) for k in ("GX_OFFSET", "GY_OFFSET", "GZ_OFFSET")], dtype=float)
+    return a, a @ offset, bias
+
+ACC_A, ACC_C, GYRO_BIAS = _load_calibration()
+
+def read_raw():
+    """
+    one uncalibrated sample in the sensor frame: (acc xyz in g, gyro xyz in dps).
+    used by calibrate.py to record calibration data.
+    """
+    # one 12-byte block read: gyroscope x, y, z (0x22..0x27) then accelerometer x, y, z (0x28..0x2d)
+    raw = np.frombuffer(bytes(_read_registers(OUTX_L_G, 12)), dtype="<i2").astype(float)
+    return raw[3:] * ACCEL_SCALE, raw[:3] * GYRO_SCALE
+
 def _read_sensor_data():
     """
-    reads accelerometer and gyroscope data and returns as a dictionary.
-    adjust scaling and orientation corrections as needed.
+    reads accelerometer and gyroscope data and returns as a dictionary
+    (calibration and orientation applied).
     """
-    # read 6 bytes for accelerometer (x, y, z)
-    raw_accel = _read_registers(OUTX_L_A, 6)
-    # read 6 bytes for gyroscope (x, y, z)
-    raw_gyro  = _read_registers(OUTX_L_G, 6)
+    acc, gyro = read_raw()
+    acc = ACC_A @ acc - ACC_C
+    gyro = gyro - GYRO_BIAS
+    return _to_dict(*acc.tolist(), *gyro.tolist())
 
-    # convert raw accelerometer data
-    accel_x = round(_twos_complement(raw_accel[0] | (raw_accel[1] << 8), 16) * 0.061 / 1000, 2)
-    accel_y = round(_twos_complement(raw_accel[2] | (raw_accel[3] << 8), 16) * 0.061 / 1000, 2)
-    accel_z = round(_twos_complement(raw_accel[4] | (raw_accel[5] << 8), 16) * 0.061 / 1000, 2)
+# ---------------------------------------------------------------------------
+# hardware fifo mode
+# ---------------------------------------------------------------------------
+def _init_fifo():
+    """configures the fifo in continuous mode with accel + gyro batched at the odr."""
+    global _ring, _ring_idx, _ring_count
+    bdr = ODR_CODES[IMU_ODR]
+    _write_register(FIFO_CTRL4, 0x00)                    # bypass -> clears the fifo
+    _write_register(FIFO_CTRL1, 0x00)                    # no watermark, we poll the level
+    _write_register(FIFO_CTRL2, 0x00)
+    _write_register(FIFO_CTRL3, (bdr << 4) | bdr)        # gyro | accel batch data rate
+    _write_register(FIFO_CTRL4, FIFO_MODE_CONTINUOUS)
 
-    # apply orientation correction to accelerometer data
-    corrected_x, corrected_y, corrected_z = _apply_orientation(accel_x, accel_y, accel_z)
+    size = max(1, int(IMU_ODR * getattr(config, "imu_buffer_s", 10)))
+    with _ring_lock:
+        _ring = np.zeros((size, 7))
+        _ring_idx = 0
+        _ring_count = 0
+    logger.debug("gyroacc_fifo initialized: %s hz, ring buffer %d samples", IMU_ODR, size)
 
-    # convert raw gyroscope data
-    gyro_x = round(_twos_complement(raw_gyro[0] | (raw_gyro[1] << 8), 16) * 8.75 / 1000, 2)
-    gyro_y = round(_twos_complement(raw_gyro[2] | (raw_gyro[3] << 8), 16) * 8.75 / 1000, 2)
-    gyro_z = round(_twos_complement(raw_gyro[4] | (raw_gyro[5] << 8), 16) * 8.75 / 1000, 2)
+def _fifo_level():
+    """returns the number of unread fifo words and latches overrun events."""
+    global fifo_overruns
+    status = _read_registers(FIFO_STATUS1, 2)
+    if status[1] & FIFO_OVR_LATCHED:
+        fifo_overruns += 1
+        logger.warning("gyroacc_fifo overrun (%d total) – reader too slow", fifo_overruns)
+    return status[0] | ((status[1] & 0x03) << 8)
 
-    # compute pitch and roll from corrected accelerometer data as an example
-    pitch = round(math.atan2(corrected_y, math.sqrt(corrected_x**2 + corrected_z**2)) * 180 / math.pi, 2)
-    roll = round(math.atan2(-corrected_x, corrected_z) * 180 / math.pi, 2)
-
-    data = {
-        "acc_x":   corrected_x,
-        "acc_y":   corrected_y,
-        "acc_z":   corrected_z,
-        "gyro_x":  gyro_x,
-        "gyro_y":  gyro_y,
-        "gyro_z":  gyro_z,
-        "pitch":   pitch,
-        "roll":    roll
-    }
+def _decode_fifo(raw, t_read):
+    """
+    decodes raw fifo words into rows (t, acc xyz, gyro xyz).
+    every accel word becomes one row paired with the most recent gyro word;
+    timestamps are spaced 1/odr apart and end at t_read, so raw must be the
+    whole drain behind one level read (oldest row = t_read - (n-1)/odr).
+    """
+    global _last_gyro
+    words = np.frombuffer(raw, dtype=np.uint8).reshape(-1, FIFO_WORD_LEN)
+    tags = words[:, 0] >> 3
+    xyz = words[:, 1:].copy().view("<i2").astype(float)
+
+    gyro_pos = np.flatnonzero(tags == FIFO_TAG_GYRO)
+    acc_pos = np.flatnonzero(tags == FIFO_TAG_ACCEL)
+    if acc_pos.size == 0:
+        if gyro_pos.size:
+            _last_gyro = xyz[gyro_pos[-1]] * GYRO_SCALE - GYRO_BIAS
+        return None
+
+    # index of the gyro word preceding each accel word (-1 -> carried over)
+    k = np.searchsorted(gyro_pos, acc_pos) - 1
+    gyro = np.vstack([_last_gyro, xyz[gyro_pos] * GYRO_SCALE - GYRO_BIAS])[k + 1]
+    if gyro_pos.size:
+        _last_gyro = xyz[gyro_pos[-1]] * GYRO_SCALE - GYRO_BIAS
 
-    return data
+    n = acc_pos.size
+    rows = np.empty((n, 7))
+    rows[:, 0] = t_read - (n - 1 - np.arange(n)) / IMU_ODR
+    rows[:, 1:4] = (xyz[acc_pos] * ACCEL_SCALE) @ ACC_A.T - ACC_C
+    rows[:, 4:7] = gyro
+    return rows
+
+def _ring_append(rows):
+    """copies rows into the preallocated ring buffer (oldest rows are overwritten)."""
+    global _ring_idx, _ring_count
+    size = _ring.shape[0]
+    if rows.shape[0] > size:
+        rows = rows[-size:]
+    n = rows.shape[0]
+    with _ring_lock:
+        end = _ring_idx + n
+        if end <= size:
+            _ring[_ring_idx:end] = rows
+        else:
+            first = size - _ring_idx
+            _ring[_ring_idx:] = rows[:first]
+            _ring[:n - first] = rows[first:]
+        _ring_idx = end % size
+        _ring_count = min(size, _ring_count + n)
+
+def fifo_reader():
+    """
+    background thread: drains the hardware fifo in bulk reads into the ring buffer.
+    polls every 50 ms, or every 32 sample periods at high odrs – far less than
+    the ~200 accel + gyro pairs the 3 kb fifo holds, so it never overflows.
+    the level is read once per poll and the whole drain is decoded in one go,
+    with its timestamps anchored at the level read.
+    """
+    interval = min(0.05, 32 / IMU_ODR)
+    m = metrics.loop("imu_fifo_reader")
+    while True:
+        t = m.begin()
+        try:
+            level = _fifo_level()
+            t_read = time.monotonic()
+            raw = bytearray()
+            while level:
+                n = min(level, FIFO_MAX_WORDS_READ)
+                raw += _read_block(FIFO_DATA_OUT_TAG, n * FIFO_WORD_LEN)
+                level -= n
+            if raw:
+                rows = _decode_fifo(bytes(raw), t_read)
+                if rows is not None:
+                    _ring_append(rows)
+        except OSError as e:
+            m.error()
+            logger.error("gyroacc_fifo_reader_error: %s", e)
+        m.end(t)
+        time.sleep(interval)
+
+def get_samples_since(t):
+    """
+    returns all buffered samples newer than t (time.monotonic() seconds) as an
+    (n, 7) array with columns t, acc_x, acc_y, acc_z, gyro_x, gyro_y, gyro_z.
+    """
+    with _ring_lock:
+        if _ring is None or _ring_count == 0:
+            return np.empty((0, 7))
+        size = _ring.shape[0]
+        start = (_ring_idx - _ring_count) % size
+        ordered = np.roll(_ring, -start, axis=0)[:_ring_count]
+    return ordered[ordered[:, 0] > t]
+
+def get_latest():
+    """returns the newest buffered sample as a dict (empty dict if none yet)."""
+    with _ring_lock:
+        if _ring is None or _ring_count == 0:
+            return {}
+        row = _ring[_ring_idx - 1].tolist()
+    return _to_dict(*row[1:])
 
 def init_sensor():
     """
@@ -133,8 +354,8 @@ def init_sensor():
     if _initialized:
         return
 
-    # initialize i2c bus
-    _bus = smbus2.SMBus(1)
+    # attach to the shared i2c bus (imu reads have top priority)
+    _bus = i2cbus.device("imu", i2cbus.PRIO_IMU)
 
     # check who_am_i register
     try:
@@ -147,24 +368,36 @@ def init_sensor():
         logger.error("gyroacc_init_sensor_error: could not detect lsm6dso. who_am_i returned 0x%02X", who_am_i)
         raise RuntimeError(f"could not detect lsm6dso. who_am_i returned 0x{who_am_i:02X}")
 
+    odr = ODR_CODES[IMU_ODR] << 4
     # configure accelerometer
-    _write_register(CTRL1_XL, ACCEL_ODR_104HZ | ACCEL_FS_2G)
+    _write_register(CTRL1_XL, odr | (ACCEL_FS[ACCEL_FS_G][0] << 2))
     # configure gyroscope
-    _write_register(CTRL2_G, GYRO_ODR_104HZ | GYRO_FS_250DPS)
+    _write_register(CTRL2_G, odr | GYRO_FS[GYRO_FS_DPS][0])
+    # block data update + register auto-increment
+    _write_register(CTRL3_C, 0x44)
 
-    logger.debug("gyroacc_init_sensor_detected and initialized")
+    if FIFO_ENABLED:
+        _init_fifo()
+        threading.Thread(target=fifo_reader, daemon=True).start()
+
+    logger.debug("gyroacc_init_sensor_detected and initialized (%s hz, ±%s g, ±%s dps, fifo=%s)",
+                 IMU_ODR, ACCEL_FS_G, GYRO_FS_DPS, FIFO_ENABLED)
     _initialized = True
 
 def get_data():
     """
     public function to read the sensor data.
     the main script calls this repeatedly in a loop.
+    in fifo mode the newest buffered sample is returned without touching the bus.
     """
     if not _initialized:
         init_sensor()
 
+    if FIFO_ENABLED:
+        return get_latest()
+
     try:
         return _read_sensor_data()
     except OSError as e:
         logger.error("gyroacc_get_data_error: %s", e)
-        return {}
\ No newline at end of file
+        return {}
@@ -1,9 +1,9 @@
 from __future__ import annotations
-import json, math, time, logging
+import json, math, os, time, logging, threading
 from typing import Tuple
-import imufusion
-from smbus2 import SMBus
 from config import config
+from modules import i2cbus
+import metrics
 import numpy as np
 
 logger = logging.getLogger(__name__)
@@ -11,30 +11,68 @@ logger = logging.getLogger(__name__)
 # ─────────── I²C‑Register ───────────
 MMC56X3_I2C_ADDR = 0x30
 REG_XOUT_0       = 0x00
+REG_STATUS_1     = 0x18
+REG_ODR          = 0x1A
 REG_CONTROL_0    = 0x1B
+REG_CONTROL_1    = 0x1C
+REG_CONTROL_2    = 0x1D
 
-_bus = SMBus(1)
+# Bits
+CTRL0_TAKE_MEAS_M = 0x01
+CTRL0_AUTO_SR_EN  = 0x20      # automatisches SET/RESET vor Messungen
+CTRL0_CMM_FREQ_EN = 0x80      # Messperiode aus ODR berechnen
+CTRL2_EN_PRD_SET  = 0x08      # periodisches SET (Offset‑Drift)
+CTRL2_CMM_EN      = 0x10      # Continuous Mode
+CTRL2_HPOWER      = 0x80      # nötig für ODR > 255 Hz
+STATUS_MEAS_M_DONE = 0x40
 
-# ─────────── Offsets laden ───────────
+# periodisches SET alle n Messungen → prd_set‑Code (CONTROL_2 Bits 2:0)
+SET_PERIOD_CODES = {1: 0, 25: 1, 75: 2, 100: 3, 250: 4, 500: 5, 1000: 6, 2000: 7}
 
-def _load_offsets(path: str = "/home/globaladmin/code/config/mag_offsets.json") -> Tuple[float, float, float]:
+# ─────────── Einstellungen ───────────
+CONTINUOUS   = bool(getattr(config, "mag_continuous", True))
+MAG_ODR      = int(getattr(config, "mag_odr", 50))             # Hz, 1…1000
+SET_PERIOD   = int(getattr(config, "mag_set_period", 100))     # Messungen zwischen SET‑Pulsen
+BUFFER_S     = float(getattr(config, "mag_buffer_s", 10))      # s Ringpuffer
+
+_bus = i2cbus.device("mag", i2cbus.PRIO_MAG)
+
+# ─────────── Orientierungstransform ───────────
+# Sensor ist neutral montiert – keine Transform notwendig
+
+def _apply_orientation(x: float, y: float, z: float):
+    """Identitätsfunktion – gibt die Rohwerte unverändert zurück."""
+    return x, y, z
+
+_ORIENT = np.array([_apply_orientation(*axis) for axis in np.eye(3)], dtype=float).T
+
+# ─────────── Kalibrierung laden ───────────
+# mag_offsets.json (calibrate.py): Hard‑Iron‑Offset + optionale Soft‑Iron‑Matrix.
+# Offset, Matrix und Orientierung werden zu einer affinen Abbildung
+#     field = MAG_A @ raw - MAG_C
+# zusammengefasst (eine Matrixmultiplikation pro Messung).
+
+def _load_offsets(path: str = os.path.join(os.path.dirname(os.path.abspath(config.__file__)),
+                                           "mag_offsets.json")):
     try:
         with open(path, "r", encoding="utf-8") as fp:
             d = json.load(fp)
         logger.debug("Mag‑Offsets: %s", d)
-        return d.get("X_OFFSET", 0.0), d.get("Y_OFFSET", 0.0), d.get("Z_OFFSET", 0.0)
     except Exception as exc:                           # noqa: BLE001
         logger.error("mag_load_offsets_error: %s – nutze 0‑Offsets", exc)
-        return 0.0, 0.0, 0.0
+        d = {}
+    offset = np.array([d.get("X_OFFSET", 0.0), d.get("Y_OFFSET", 0.0), d.get("Z_OFFSET", 0.0)],
+                      dtype=float)
+    soft = np.array(d.get("SOFT_IRON", np.eye(3)), dtype=float)
+    a = _ORIENT @ soft
+    return a, a @ offset
 
-X_OFF, Y_OFF, Z_OFF = _load_offsets()
+MAG_A, MAG_C = _load_offsets()
 
-# ─────────── Orientierungstransform ───────────
-# Sensor ist neutral montiert – keine Transform notwendig
 
-def _apply_orientation(x: float, y: float, z: float):
-    """Identitätsfunktion – gibt die Rohwerte unverändert zurück."""
-    return x, y, z
+def _correct(raw) -> np.ndarray:
+    """Rohfeld (µT, Sensorachsen) → kalibriertes Feld in Bootachsen."""
+    return MAG_A @ np.asarray(raw, dtype=float) - MAG_C
 
 # ─────────── Rohdaten lesen ───────────
 
@@ -42,8 +80,11 @@ def _read_raw() -> Tuple[float, float, float]:
     # single‑measurement auslösen
     _bus.write_byte_data(MMC56X3_I2C_ADDR, REG_CONTROL_0, 0x01)
     time.sleep(0.002)  # 2 ms für Messung
-    d = _bus.read_i2c_block_data(MMC56X3_I2C_ADDR, REG_XOUT_0, 9)
+    return _decode(_bus.read_i2c_block_data(MMC56X3_I2C_ADDR, REG_XOUT_0, 9))
+
 
+def _decode(d) -> Tuple[float, float, float]:
+    """9 Datenbytes → x, y, z in µT."""
     def _20bit(i: int):
         raw = (d[i] << 12) | (d[i + 1] << 4) | (d[6 + i // 2] >> 4)
         raw -= 1 << 19  # two's complement
@@ -51,41 +92,136 @@ def _read_raw() -> Tuple[float, float, float]:
 
     return _20bit(0), _20bit(2), _20bit(4)
 
-# ─────────── vollständige Tilt‑Kompensation ───────────
-# Create a global AHRS instance
-_ahrs = imufusion.Ahrs()
-#_ahrs.settings = imufusion.Settings()  # optional: tweak settings here
+# ─────────── Continuous Mode ───────────
+# Der Sensor misst selbstständig mit MAG_ODR; ein eigener Thread pollt das
+# Data‑Ready‑Flag und liest nur dann 9 Bytes. Jede Messung landet mit
+# Zeitstempel (time.monotonic()) im Ringpuffer: t, mag_x, mag_y, mag_z (µT,
+# kalibriert, Bootachsen).
+
+_ring = None
+_ring_idx = 0
+_ring_count = 0
+_ring_lock = threading.Lock()
+_initialized = False
+_init_lock = threading.Lock()
+samples_read = 0
+missed = 0                    # Poll ohne neue Messung (Reader zu schnell)
+
+
+def _bandwidth(odr: int) -> int:
+    """Kürzeste nötige Messdauer (CONTROL_1 BW‑Bits) für die ODR."""
+    if odr <= 75:
+        return 0x00           # 6.6 ms
+    if odr <= 150:
+        return 0x01           # 3.5 ms
+    if odr <= 255:
+        return 0x02           # 2.0 ms
+    return 0x03               # 1.2 ms
+
+
+def _init_continuous() -> None:
+    global _ring
+    odr = max(1, min(MAG_ODR, 1000))
+    prd = SET_PERIOD_CODES.get(SET_PERIOD)
+    if prd is None:
+        logger.error("mag_set_period %s ungültig – nutze 100", SET_PERIOD)
+        prd = SET_PERIOD_CODES[100]
+    ctrl2 = CTRL2_CMM_EN | CTRL2_EN_PRD_SET | prd
+    if odr > 255:
+        ctrl2 |= CTRL2_HPOWER
+    with _bus.locked():
+        _bus.write_byte_data(MMC56X3_I2C_ADDR, REG_CONTROL_1, _bandwidth(odr))
+        _bus.write_byte_data(MMC56X3_I2C_ADDR, REG_ODR, min(odr, 255))
+        _bus.write_byte_data(MMC56X3_I2C_ADDR, REG_CONTROL_0,
+                             CTRL0_CMM_FREQ_EN | CTRL0_AUTO_SR_EN)
+        _bus.write_byte_data(MMC56X3_I2C_ADDR, REG_CONTROL_2, ctrl2)
+    with _ring_lock:
+        _ring = np.zeros((max(1, int(odr * BUFFER_S)), 4))
+    logger.debug("mag continuous mode: %d Hz, SET alle %d Messungen", odr, SET_PERIOD)
+
+
+def _ring_append(row) -> None:
+    global _ring_idx, _ring_count
+    with _ring_lock:
+        _ring[_ring_idx] = row
+        _ring_idx = (_ring_idx + 1) % _ring.shape[0]
+        _ring_count = min(_ring.shape[0], _ring_count + 1)
+
+
+def mag_reader() -> None:
+    """Hintergrund‑Thread: liest jede fertige Messung genau einmal."""
+    global samples_read, missed
+    interval = 0.5 / MAG_ODR                   # doppelt so schnell wie ODR pollen
+    m = metrics.loop("mag_reader")
+    while True:
+        t = m.begin()
+        try:
+            with _bus.locked():
+                status = _bus.read_byte_data(MMC56X3_I2C_ADDR, REG_STATUS_1)
+                d = _bus.read_i2c_block_data(MMC56X3_I2C_ADDR, REG_XOUT_0, 9) \
+                    if status & STATUS_MEAS_M_DONE else None
+            if d is None:
+                missed += 1
+            else:
+                _ring_append((time.monotonic(), *_correct(_decode(d))))
+                samples_read += 1
+        except OSError as exc:
+            m.error()
+            logger.error("mag_reader_error: %s", exc)
+        m.end(t)
+        time.sleep(interval)
+
+
+def init_sensor() -> None:
+    """Startet den Continuous Mode + Reader‑Thread (einmalig, bei Bedarf)."""
+    global _initialized
+    with _init_lock:
+        if _initialized or not CONTINUOUS:
+            return
+        _init_continuous()
+        threading.Thread(target=mag_reader, name="mag-reader", daemon=True).start()
+        _initialized = True
+
+
+def get_samples_since(t: float) -> np.ndarray:
+    """Alle gepufferten Messungen neuer als t als (n, 4)‑Array t, x, y, z."""
+    init_sensor()
+    with _ring_lock:
+        if _ring is None or _ring_count == 0:
+            return np.empty((0, 4))
+        start = (_ring_idx - _ring_count) % _ring.shape[0]
+        ordered = np.roll(_ring, -start, axis=0)[:_ring_count]
+    return ordered[ordered[:, 0] > t]
+
+
+# ─────────── Tilt‑Kompensation ───────────
+# Analytische Projektion in die Horizontalebene (Pitch/Roll aus dem IMU-Cache).
+# Die volle 9‑DOF‑Fusion mit echten Gyro-Daten läuft in modules/ahrs.py.
 
 def _tilt_compensate(mx: float, my: float, mz: float, *, pitch_deg: float, roll_deg: float) -> Tuple[float, float]:
-    """
-    Apply tilt compensation using AHRS by feeding roll/pitch as equivalent accelerometer input.
-    This assumes the device is static or you have real accel/gyro data available.
-    """
-
-    # Estimate gravity vector from pitch/roll
-    pitch_rad = math.radians(pitch_deg)
-    roll_rad = math.radians(roll_deg)
-
-    ax = math.sin(pitch_rad)
-    ay = -math.sin(roll_rad) * math.cos(pitch_rad)
-    az = math.cos(roll_rad) * math.cos(pitch_rad)
-
-    # Dummy gyro input (0 if static), actual accel input, dummy mag input
-    gyro = np.array([0.0, 0.0, 0.0])
-    accel = np.array([ax, ay, az])
-    mag_dummy = np.array([0.0, 0.0, 0.0])  # not needed here
-
-    _ahrs.update(gyro, accel, mag_dummy, 0.01)  # dt = 10 ms
-
-    # Apply rotation to magnetometer using orientation
-    q = _ahrs.quaternion
-    mxh, myh, _ = q.inverse().rotate([mx, my, mz])
+    """Dreht den Feldvektor um Roll/Pitch zurück in die Horizontale."""
+    p = math.radians(pitch_deg)
+    r = math.radians(roll_deg)
+    mxh = mx * math.cos(p) + mz * math.sin(p)
+    myh = mx * math.sin(r) * math.sin(p) + my * math.cos(r) - mz * math.sin(r) * math.cos(p)
     return mxh, myh
 
 
+# ─────────── öffentliches API ───────────
 
+def read_field() -> Tuple[float, float, float]:
+    """Kalibriertes Feld in µT, Bootachsen (wirft OSError).
+
+    Continuous Mode: neueste Messung aus dem Ringpuffer, ohne Buszugriff.
+    """
+    if CONTINUOUS:
+        init_sensor()
+        with _ring_lock:
+            if _ring_count:
+                return tuple(_ring[_ring_idx - 1, 1:].tolist())
+        raise OSError("noch keine Messung im Continuous Mode")
+    return tuple(_correct(_read_raw()).tolist())
 
-# ─────────── öffentliches API ───────────
 
 def get_data(*, pitch: float, roll: float) -> dict[str, float]:
     """Liefert kompensierte Magnetometer‑Daten + Kurs.
@@ -96,20 +232,13 @@ def get_data(*, pitch: float, roll: float) -> dict[str, float]:
     heading       : 0–360 °; 0 ° = Bug zeigt geogr. Nord, + nach Steuerbord
     """
 
+    # 1) Kalibrierung (Hard/Soft‑Iron) + 2) Orientierung
     try:
-        mx, my, mz = _read_raw()
+        mx, my, mz = read_field()
     except OSError as exc:
         logger.error("mag_read_error: %s", exc)
         return {}
 
-    # 1) Offsets
-    mx -= X_OFF
-    my -= Y_OFF
-    mz -= Z_OFF
-
-    # 2) Orientierung (identisch)
-    mx, my, mz = _apply_orientation(mx, my, mz)
-
     # 3) Tilt‑Kompensation
     mxh, myh = _tilt_compensate(mx, my, mz, pitch_deg=pitch, roll_deg=roll)
 
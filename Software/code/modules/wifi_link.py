@@ -0,0 +1,90 @@
+"""
+wi-fi link state (operstate + rssi) for the snapshot
+
+get_data() is run by a sampler thread at config.wifi_sample_rate (see
+main._start_samplers), so /sys and /proc are read about once per second
+instead of once per snapshot; the snapshot takes the cached value. every
+reading also goes into a short rssi history (config.wifi_history_s) that
+get_history() / get_trend() expose for link-quality decisions.
+"""
+
+from __future__ import annotations
+import collections
+import logging
+import time
+from config import config
+
+# initialize logger for this module
+logger = logging.getLogger(__name__)
+
+# settings
+WIFI_IFACE     = getattr(config, "wifi_interface", "wlan0")
+WIFI_RATE      = getattr(config, "wifi_sample_rate", 1)     # hz
+WIFI_HISTORY_S = getattr(config, "wifi_history_s", 120)     # s
+
+OPERSTATE_PATH = f"/sys/class/net/{WIFI_IFACE}/operstate"
+WIRELESS_PATH  = "/proc/net/wireless"
+
+# (ts_monotonic, rssi) – rssi None while disconnected; one writer (sampler)
+_history = collections.deque(maxlen=max(1, int(WIFI_HISTORY_S * WIFI_RATE)))
+
+
+def _read_operstate() -> bool:
+    with open(OPERSTATE_PATH) as f:
+        return f.read().strip() == "up"
+
+
+def _read_rssi() -> int | None:
+    """signal level (dbm) of the interface from /proc/net/wireless."""
+    with open(WIRELESS_PATH) as f:
+        for line in f.readlines()[2:]:
+            if f"{WIFI_IFACE}:" in line:
+                return int(float(line.split()[3]))
+    return None
+
+
+def get_data() -> dict:
+    """reads link state and rssi once and appends them to the history."""
+    try:
+        conn = _read_operstate()
+        rssi = _read_rssi() if conn else None
+    except (OSError, ValueError, IndexError) as e:
+        logger.error("wifi read failed: %s", e)
+        conn, rssi = False, None
+    _history.append((time.monotonic(), rssi))
+    return {"conn": conn, "rssi": rssi}
+
+
+def get_history(window_s: float | None = None) -> list[tuple[float, int | None]]:
+    """(ts_monotonic, rssi) readings of the last window_s seconds (all if None)."""
+    rows = list(_history)
+    if window_s is None:
+        return rows
+    cutoff = time.monotonic() - window_s
+    return [r for r in rows if r[0] >= cutoff]
+
+
+def get_trend(window_s: float = 30.0) -> dict:
+    """
+    rssi mean / min / slope (db per second, least squares) over window_s and
+    the fraction of readings with a link. None values while nothing is known.
+    """
+    rows = get_history(window_s)
+    pts = [(t, r) for t, r in rows if r is not None]
+    out = {"n": len(rows),
+           "up_ratio": round(len(pts) / len(rows), 2) if rows else None,
+           "rssi_avg": None, "rssi_min": None, "rssi_slope": None}
+    if not pts:
+        return out
+    ts = [t for t, _ in pts]
+    rs = [r for _, r in pts]
+    out["rssi_avg"] = round(sum(rs) / len(rs), 1)
+    out["rssi_min"] = min(rs)
+    if len(pts) >= 2:
+        t_mean = sum(ts) / len(ts)
+        r_mean = sum(rs) / len(rs)
+        var = sum((t - t_mean) ** 2 for t in ts)
+        if var > 0:
+            cov = sum((t - t_mean) * (r - r_mean) for t, r in pts)
+            out["rssi_slope"] = round(cov / var, 3)
+    return out
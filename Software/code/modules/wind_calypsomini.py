@@ -1,12 +1,22 @@
 """
-Wind Calypso Mini driver — on-demand read (no background thread)
+Wind Calypso Mini driver — on-demand read or background reader
 
-`get_data(heading=0.0)` grabs the newest MWV sentence from the serial
-buffer, converts it to a dict, and adds a true-wind direction:
+`get_data(heading=0.0)` returns the newest MWV reading as a dict and adds a
+true-wind direction:
     true_wind_dir = (heading + w_angle) % 360
+
+config.wind_reader = False → the serial buffer is drained on demand and only
+the newest MWV sentence is kept (original behaviour).
+config.wind_reader = True  → a background thread parses *every* MWV sentence
+into a timestamped ring buffer; get_data() never touches the port and adds
+window statistics (mean, gust, lull, circular mean/std of the angle) over
+config.wind_window_s. `get_latest()` / `get_stats(window_s)` expose the same.
 """
 
-import serial, time, logging
+import math, serial, threading, time, logging
+import numpy as np
+from config import config
+import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +29,15 @@ _TIMEOUT = 0.05             # s – short to stay non-blocking
 
 _SER: serial.Serial | None = None
 
+# ---------------------------------------------------------------------------
+# Background reader settings
+# ---------------------------------------------------------------------------
+WIND_READER   = bool(getattr(config, "wind_reader", True))
+WIND_BUFFER_S = float(getattr(config, "wind_buffer_s", 600))   # s of history
+WIND_WINDOW_S = float(getattr(config, "wind_window_s", 10))    # s – get_data() statistics
+_SENSOR_HZ    = 4                                              # Calypso default output rate
+_STALE_S      = 2.0                                            # s – reader sample too old → None
+
 
 def _ensure_serial() -> serial.Serial:
     """Open the port once and keep it open."""
@@ -61,6 +80,114 @@ def _parse_mwv(sentence: str) -> dict:
 
 
 
+# ---------------------------------------------------------------------------
+# Background reader – ring buffer of (t, angle, speed)
+# ---------------------------------------------------------------------------
+_ring = np.full((max(8, int(WIND_BUFFER_S * _SENSOR_HZ * 2)), 3), np.nan)
+_ring_idx = 0
+_ring_count = 0
+_ring_lock = threading.Lock()
+_latest: dict | None = None        # newest parsed sentence (incl. unit/status)
+_reader_started = False
+_reader_lock = threading.Lock()
+sentences = 0                      # MWV sentences parsed by the reader
+parse_errors = 0
+
+
+def _ring_append(t: float, angle: float, speed: float) -> None:
+    global _ring_idx, _ring_count
+    with _ring_lock:
+        _ring[_ring_idx] = (t, angle, speed)
+        _ring_idx = (_ring_idx + 1) % _ring.shape[0]
+        _ring_count = min(_ring.shape[0], _ring_count + 1)
+
+
+def wind_reader() -> None:
+    """Parse every MWV sentence from the port into the ring buffer."""
+    global _latest, sentences, parse_errors
+    m = metrics.loop("wind_reader", 1.0 / _SENSOR_HZ)
+    while True:
+        try:
+            line = _ensure_serial().readline()
+        except (serial.SerialException, OSError) as e:
+            m.error()
+            logger.error("wind reader error: %s", e)
+            time.sleep(1)
+            continue
+        if not line:
+            continue
+        decoded = line.decode(errors="replace").strip()
+        if "MWV" not in decoded:
+            continue
+        t = m.begin()
+        try:
+            sample = _parse_mwv(decoded)
+        except ValueError:
+            parse_errors += 1
+            m.error()
+            m.end(t)
+            continue
+        now = time.monotonic()
+        sample["ts_monotonic"] = now
+        _latest = sample
+        sentences += 1
+        if (sample["w_status"] == "A" and sample["w_angle"] is not None
+                and sample["w_speed"] is not None):
+            _ring_append(now, sample["w_angle"], sample["w_speed"])
+        m.end(t)
+
+
+def start_reader() -> None:
+    """Start the background reader once (no-op if already running)."""
+    global _reader_started
+    with _reader_lock:
+        if _reader_started:
+            return
+        _ensure_serial()
+        threading.Thread(target=wind_reader, name="wind-reader", daemon=True).start()
+        _reader_started = True
+        logger.debug("wind reader started (%.0f s buffer)", WIND_BUFFER_S)
+
+
+def _window(window_s: float) -> np.ndarray:
+    """Valid (t, angle, speed) rows of the last window_s seconds."""
+    since = time.monotonic() - window_s
+    with _ring_lock:
+        rows = _ring[:_ring_count].copy() if _ring_count < _ring.shape[0] else _ring.copy()
+    return rows[rows[:, 0] > since]
+
+
+def get_latest() -> dict | None:
+    """Newest MWV reading from the background reader (None before the first)."""
+    return None if _latest is None else dict(_latest)
+
+
+def get_stats(window_s: float = WIND_WINDOW_S) -> dict:
+    """
+    Wind statistics over the last window_s seconds.
+
+    Speeds: arithmetic mean, gust (max), lull (min).
+    Angle: circular mean atan2(Σsin, Σcos) and circular standard deviation
+    sqrt(-2 ln R) – 350° and 10° average to 0°, not 180°.
+    """
+    rows = _window(window_s)
+    n = rows.shape[0]
+    if n == 0:
+        return {"w_n": 0}
+    rad = np.radians(rows[:, 1])
+    s, c = np.sin(rad).mean(), np.cos(rad).mean()
+    r = min(1.0, math.hypot(s, c))
+    speed = rows[:, 2]
+    return {
+        "w_n":          int(n),
+        "w_speed_mean": round(float(speed.mean()), 2),
+        "w_speed_gust": round(float(speed.max()), 2),
+        "w_speed_lull": round(float(speed.min()), 2),
+        "w_angle_mean": round(math.degrees(math.atan2(s, c)) % 360, 2),
+        "w_angle_std":  round(math.degrees(math.sqrt(-2 * math.log(r))), 2) if r > 0 else None,
+    }
+
+
 # Public API
 _LAST_SAMPLE: dict | None = None
 _LAST_TS: float | None = None
@@ -71,13 +198,20 @@ def get_data(heading: float = 0.0) -> dict | None:
     """
     Return the latest wind reading or None if nothing is available.
 
-    - Reads *one* MWV sentence if cached data is older than `_MAX_AGE`.
+    - Background reader: newest buffered reading + window statistics.
+    - Otherwise reads *one* MWV sentence if cached data is older than `_MAX_AGE`.
     - Adds `true_wind_dir`.
     """
     global _LAST_SAMPLE, _LAST_TS
 
     now = time.monotonic()
-    if _LAST_TS and now - _LAST_TS < _MAX_AGE and _LAST_SAMPLE is not None:
+    if WIND_READER:
+        start_reader()
+        sample = get_latest()
+        if sample is None or now - sample.pop("ts_monotonic") > _STALE_S:
+            return None
+        sample.update(get_stats())
+    elif _LAST_TS and now - _LAST_TS < _MAX_AGE and _LAST_SAMPLE is not None:
         sample = _LAST_SAMPLE.copy()
     else:
         ser = _ensure_serial()
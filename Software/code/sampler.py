@@ -0,0 +1,109 @@
+# ---------------------------------------------------------------------------
+# sampler.py – per-sensor sampler threads with latest-value caches
+# ---------------------------------------------------------------------------
+# • Every sensor runs in its own thread at its own rate, so a slow I²C or
+#   serial transaction never delays the GPS snapshot path.
+# • Each thread publishes into a LatestValue cell. A cell holds one
+#   immutable (value, ts_monotonic, seq) tuple that is replaced with a
+#   single reference assignment → readers never lock and never see a
+#   half-written entry (one writer per cell).
+# • read() / read_all() are non-blocking and report each value's age.
+# ---------------------------------------------------------------------------
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class LatestValue:
+    """Single-writer, lock-free latest-value cell."""
+
+    __slots__ = ("name", "_cell")
+
+    def __init__(self, name: str):
+        self.name = name
+        self._cell: tuple = (None, None, 0)      # value, ts_monotonic, seq
+
+    def publish(self, value, ts: float | None = None) -> None:
+        seq = self._cell[2] + 1
+        self._cell = (value, time.monotonic() if ts is None else ts, seq)
+
+    def get(self) -> tuple:
+        """(value, ts_monotonic, seq) – value/ts are None before the first sample."""
+        return self._cell
+
+
+class Sampler(threading.Thread):
+    """Calls read_fn at rate_hz and publishes every non-None result."""
+
+    def __init__(self, name: str, read_fn: Callable[[], object], rate_hz: float):
+        super().__init__(name=f"sampler-{name}", daemon=True)
+        self.cache = LatestValue(name)
+        self.read_fn = read_fn
+        self.period = 1.0 / rate_hz if rate_hz > 0 else 1.0
+        self.errors = 0
+        self.overruns = 0                        # read took longer than a period
+
+    def run(self) -> None:
+        m = metrics.loop(self.name, self.period)
+        next_due = time.monotonic()
+        while True:
+            t = m.begin()
+            try:
+                value = self.read_fn()
+                if value is not None:
+                    self.cache.publish(value)
+            except Exception as exc:             # noqa: BLE001 – keep sampling
+                self.errors += 1
+                m.error()
+                logger.error("%s read failed: %s", self.name, exc)
+            m.end(t)
+
+            next_due += self.period
+            delay = next_due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:                                # fell behind → re-anchor
+                self.overruns += 1
+                next_due = time.monotonic()
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+_samplers: dict[str, Sampler] = {}
+
+
+def start(name: str, read_fn: Callable[[], object], rate_hz: float) -> LatestValue:
+    """Start (once) a sampler thread for `name` and return its cache."""
+    s = _samplers.get(name)
+    if s is None:
+        s = _samplers[name] = Sampler(name, read_fn, rate_hz)
+        s.start()
+        logger.debug("sampler '%s' started at %.2f Hz", name, rate_hz)
+    return s.cache
+
+
+def read(name: str, now: float | None = None) -> tuple:
+    """(value, age_s) of the latest sample – (None, None) if none yet."""
+    s = _samplers.get(name)
+    if s is None:
+        return None, None
+    value, ts, _seq = s.cache.get()
+    if ts is None:
+        return None, None
+    return value, (time.monotonic() if now is None else now) - ts
+
+
+def stats() -> dict[str, dict]:
+    """Per-sampler sequence number, error and overrun counters."""
+    return {
+        name: {"seq": s.cache.get()[2], "errors": s.errors, "overruns": s.overruns}
+        for name, s in _samplers.items()
+    }
@@ -0,0 +1,48 @@
+# ---------------------------------------------------------------------------
+# sim – hardware simulator for running the tracker off the Pi
+# ---------------------------------------------------------------------------
+# install() must run before any driver is imported. It puts fake backends
+# into sys.modules:
+#   smbus2  → SMBus(1) routed to simulated I²C devices
+#             (LSM6DSO incl. FIFO, MMC5603, MAX17048, SAM-M10Q DDC stream)
+#   serial  → Serial() replaying MWV sentences (Calypso wind sensor)
+#   pigpio  → no-op PWM for the status LED
+# Data comes from recordings (NMEA / MWV text files, IMU / mag CSV dumps) or
+# from built-in synthetic sources (boat sailing a circle, rolling in a swell).
+# `speed` scales simulated time: GPS epochs, sensor samples and wind
+# sentences are produced `speed` times faster than real time.
+#
+#   import sim
+#   sim.install(speed=1.0, nmea="track.nmea")
+#   import main                               # drivers now talk to the fakes
+#
+# See simulate.py for the full pipeline runner and sim/broker.py for the
+# local MQTT stand-in.
+# ---------------------------------------------------------------------------
+from __future__ import annotations
+
+import sys
+
+from sim.clock import SimClock
+from sim import backends, devices
+
+clock: SimClock | None = None
+
+
+def install(speed: float = 1.0, nmea: str | None = None, mwv: str | None = None,
+            imu_csv: str | None = None, mag_csv: str | None = None,
+            gps_addr: int = 0x42, imu_addr: int = 0x6B) -> None:
+    """Register the fake backends and the default set of simulated devices."""
+    global clock
+    clock = SimClock(speed)
+    motion = devices.Motion(clock, imu_csv=imu_csv, mag_csv=mag_csv)
+
+    backends.register(gps_addr, devices.FakeUblox(clock, nmea))
+    backends.register(imu_addr, devices.FakeLSM6DSO(clock, motion))
+    backends.register(0x30, devices.FakeMMC5603(clock, motion))
+    backends.register(0x36, devices.FakeMAX17048(clock))
+    backends.set_serial_source(lambda: devices.MwvSource(clock, mwv))
+
+    sys.modules["smbus2"] = backends.smbus2_module()
+    sys.modules["serial"] = backends.serial_module()
+    sys.modules["pigpio"] = backends.pigpio_module()
@@ -0,0 +1,229 @@
+"""
+Drop-in replacements for the smbus2, serial (pyserial) and pigpio modules.
+
+Only the subset the drivers use is implemented. I²C transfers are routed by
+address to the devices registered with register(); an unknown address fails
+like a missing chip (OSError 121, remote I/O error).
+"""
+from __future__ import annotations
+
+import errno
+import threading
+import time
+import types
+
+_devices: dict = {}
+_serial_factory = None
+_stats = {"i2c_transfers": 0, "i2c_bytes": 0, "serial_bytes": 0}
+
+
+def register(addr: int, device) -> None:
+    _devices[addr] = device
+
+
+def set_serial_source(factory) -> None:
+    """factory() → object with pending() and next_due_in() (see devices.MwvSource)."""
+    global _serial_factory
+    _serial_factory = factory
+
+
+def get_stats() -> dict:
+    return dict(_stats)
+
+
+def _device(addr: int):
+    dev = _devices.get(addr)
+    if dev is None:
+        raise OSError(errno.EREMOTEIO, f"no simulated device at 0x{addr:02X}")
+    return dev
+
+
+# ---------------------------------------------------------------------------
+# smbus2
+# ---------------------------------------------------------------------------
+class _Msg:
+    """i2c_msg stand-in: write carries data, read is filled by the device."""
+
+    def __init__(self, addr: int, is_write: bool, data: bytes = b"", length: int = 0):
+        self.addr = addr
+        self.is_write = is_write
+        self.data = bytes(data)
+        self.len = len(self.data) if is_write else length
+
+    def fill(self, data: bytes) -> None:
+        self.data = bytes(data[:self.len]).ljust(self.len, b"\0")
+
+    def __bytes__(self) -> bytes:
+        return self.data
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return self.len
+
+
+class _I2cMsg:
+    @staticmethod
+    def write(addr: int, data) -> _Msg:
+        return _Msg(addr, True, bytes(data))
+
+    @staticmethod
+    def read(addr: int, length: int) -> _Msg:
+        return _Msg(addr, False, length=length)
+
+
+class SMBus:
+    def __init__(self, bus: int | None = None):
+        self.bus = bus
+
+    def _read(self, addr: int, reg: int, n: int) -> bytes:
+        dev = _device(addr)
+        with dev.lock:
+            data = dev.read(reg, n)
+        _stats["i2c_transfers"] += 1
+        _stats["i2c_bytes"] += n
+        return data
+
+    def _write(self, addr: int, reg: int, data: bytes) -> None:
+        dev = _device(addr)
+        with dev.lock:
+            dev.write(reg, data)
+        _stats["i2c_transfers"] += 1
+        _stats["i2c_bytes"] += len(data) + 1
+
+    def read_byte_data(self, addr: int, reg: int) -> int:
+        return self._read(addr, reg, 1)[0]
+
+    def write_byte_data(self, addr: int, reg: int, value: int) -> None:
+        self._write(addr, reg, bytes([value & 0xFF]))
+
+    def read_word_data(self, addr: int, reg: int) -> int:
+        lo, hi = self._read(addr, reg, 2)                   # SMBus words are little endian
+        return lo | (hi << 8)
+
+    def read_i2c_block_data(self, addr: int, reg: int, length: int) -> list[int]:
+        return list(self._read(addr, reg, length))
+
+    def write_i2c_block_data(self, addr: int, reg: int, data) -> None:
+        self._write(addr, reg, bytes(data))
+
+    def i2c_rdwr(self, *msgs: _Msg) -> None:
+        _device(msgs[0].addr).rdwr(list(msgs))
+        _stats["i2c_transfers"] += 1
+        _stats["i2c_bytes"] += sum(m.len for m in msgs)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def smbus2_module() -> types.ModuleType:
+    mod = types.ModuleType("smbus2")
+    mod.SMBus = SMBus
+    mod.i2c_msg = _I2cMsg
+    return mod
+
+
+# ---------------------------------------------------------------------------
+# pyserial
+# ---------------------------------------------------------------------------
+class SerialException(OSError):
+    pass
+
+
+class Serial:
+    """Line source behind readline(); honours the read timeout in real time."""
+
+    def __init__(self, port: str | None = None, baudrate: int = 9600, timeout: float | None = None,
+                 **_kw):
+        if _serial_factory is None:
+            raise SerialException(f"could not open port {port}: no simulated source")
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.is_open = True
+        self._src = _serial_factory()
+        self._buf = bytearray()
+        self._lock = threading.Lock()
+
+    @property
+    def in_waiting(self) -> int:
+        with self._lock:
+            self._buf += self._src.pending()
+            return len(self._buf)
+
+    def readline(self) -> bytes:
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            with self._lock:
+                self._buf += self._src.pending()
+                nl = self._buf.find(b"\n")
+                if nl != -1:
+                    line = bytes(self._buf[:nl + 1])
+                    del self._buf[:nl + 1]
+                    _stats["serial_bytes"] += len(line)
+                    return line
+            wait = self._src.next_due_in()
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return b""
+                wait = min(wait, remaining)
+            time.sleep(max(wait, 0.001))
+
+    def read(self, size: int = 1) -> bytes:
+        with self._lock:
+            self._buf += self._src.pending()
+            data = bytes(self._buf[:size])
+            del self._buf[:size]
+            return data
+
+    def reset_input_buffer(self) -> None:
+        with self._lock:
+            self._src.pending()
+            self._buf.clear()
+
+    def write(self, data: bytes) -> int:
+        return len(data)
+
+    def close(self) -> None:
+        self.is_open = False
+
+
+def serial_module() -> types.ModuleType:
+    mod = types.ModuleType("serial")
+    mod.Serial = Serial
+    mod.SerialException = SerialException
+    mod.EIGHTBITS, mod.PARITY_NONE, mod.STOPBITS_ONE = 8, "N", 1
+    return mod
+
+
+# ---------------------------------------------------------------------------
+# pigpio
+# ---------------------------------------------------------------------------
+class _Pi:
+    connected = True
+
+    def __init__(self, *_a, **_kw):
+        self.duty: dict[int, int] = {}
+
+    def set_PWM_frequency(self, pin: int, freq: int) -> int:
+        return freq
+
+    def set_PWM_dutycycle(self, pin: int, duty: int) -> None:
+        self.duty[pin] = duty
+
+    def stop(self) -> None:
+        pass
+
+
+def pigpio_module() -> types.ModuleType:
+    mod = types.ModuleType("pigpio")
+    mod.pi = _Pi
+    return mod
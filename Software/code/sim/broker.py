@@ -0,0 +1,212 @@
+"""
+Minimal MQTT 3.1.1 broker – local stand-in for the hub's Mosquitto.
+
+Enough for the tracker and the Node-RED side scripts: CONNECT, PUBLISH
+(QoS 0/1, retained flag ignored), SUBSCRIBE/UNSUBSCRIBE with + and #
+wildcards, PINGREQ, DISCONNECT. Everything is delivered with QoS 0.
+Per-topic message/byte counters feed the simulator report.
+
+    python -m sim.broker --port 1883
+"""
+from __future__ import annotations
+
+import argparse
+import collections
+import logging
+import socket
+import struct
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CONNECT, CONNACK, PUBLISH, PUBACK = 1, 2, 3, 4
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK = 8, 9, 10, 11
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    p, t = pattern.split("/"), topic.split("/")
+    for i, part in enumerate(p):
+        if part == "#":
+            return True
+        if i >= len(t) or (part != "+" and part != t[i]):
+            return False
+    return len(p) == len(t)
+
+
+def _encode_len(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        b, n = n % 128, n // 128
+        out.append(b | 0x80 if n else b)
+        if not n:
+            return bytes(out)
+
+
+def _packet(ptype: int, flags: int, body: bytes) -> bytes:
+    return bytes([(ptype << 4) | flags]) + _encode_len(len(body)) + body
+
+
+def _str(s: str) -> bytes:
+    raw = s.encode()
+    return struct.pack(">H", len(raw)) + raw
+
+
+class _Client(threading.Thread):
+    def __init__(self, broker: "Broker", sock: socket.socket, addr):
+        super().__init__(name=f"broker-{addr[1]}", daemon=True)
+        self.broker = broker
+        self.sock = sock
+        self.client_id = "?"
+        self.subs: set[str] = set()
+        self._wlock = threading.Lock()
+
+    def _recv_exact(self, n: int) -> bytes:
+        buf = bytearray()
+        while len(buf) < n:
+            chunk = self.sock.recv(n - len(buf))
+            if not chunk:
+                raise ConnectionError("closed")
+            buf += chunk
+        return bytes(buf)
+
+    def _read_packet(self):
+        head = self._recv_exact(1)[0]
+        mult, length = 1, 0
+        while True:
+            b = self._recv_exact(1)[0]
+            length += (b & 0x7F) * mult
+            if not b & 0x80:
+                break
+            mult *= 128
+        return head >> 4, head & 0x0F, self._recv_exact(length) if length else b""
+
+    def send(self, data: bytes) -> None:
+        with self._wlock:
+            self.sock.sendall(data)
+
+    def deliver(self, topic: str, payload: bytes) -> None:
+        try:
+            self.send(_packet(PUBLISH, 0, _str(topic) + payload))
+        except OSError:
+            pass
+
+    def run(self) -> None:
+        try:
+            while True:
+                ptype, flags, body = self._read_packet()
+                if ptype == CONNECT:
+                    pos = 2 + struct.unpack_from(">H", body, 0)[0] + 4     # name, level, flags, keepalive
+                    n = struct.unpack_from(">H", body, pos)[0]
+                    self.client_id = body[pos + 2:pos + 2 + n].decode(errors="replace")
+                    self.send(_packet(CONNACK, 0, b"\x00\x00"))
+                elif ptype == PUBLISH:
+                    qos = (flags >> 1) & 0x03
+                    n = struct.unpack_from(">H", body, 0)[0]
+                    topic = body[2:2 + n].decode(errors="replace")
+                    pos = 2 + n
+                    if qos:
+                        self.send(_packet(PUBACK, 0, body[pos:pos + 2]))
+                        pos += 2
+                    self.broker.publish(topic, body[pos:])
+                elif ptype in (SUBSCRIBE, UNSUBSCRIBE):
+                    pid, pos, codes = body[:2], 2, bytearray()
+                    while pos < len(body):
+                        n = struct.unpack_from(">H", body, pos)[0]
+                        pattern = body[pos + 2:pos + 2 + n].decode(errors="replace")
+                        pos += 2 + n
+                        if ptype == SUBSCRIBE:
+                            pos += 1                                         # requested QoS
+                            self.subs.add(pattern)
+                            codes.append(0)
+                        else:
+                            self.subs.discard(pattern)
+                    ack = SUBACK if ptype == SUBSCRIBE else UNSUBACK
+                    self.send(_packet(ack, 0, pid + bytes(codes)))
+                elif ptype == PINGREQ:
+                    self.send(_packet(PINGRESP, 0, b""))
+                elif ptype == DISCONNECT:
+                    break
+        except (ConnectionError, OSError, struct.error):
+            pass
+        finally:
+            self.broker.drop(self)
+            self.sock.close()
+
+
+class Broker:
+    def __init__(self, host: str = "127.0.0.1", port: int = 1883):
+        self.host, self.port = host, port
+        self._clients: list[_Client] = []
+        self._lock = threading.Lock()
+        self.topics: dict[str, list[int]] = collections.defaultdict(lambda: [0, 0])
+        self.started = 0.0
+        self.listeners: list = []        # callables (topic, payload) – every PUBLISH
+        self._srv: socket.socket | None = None
+
+    def start(self) -> "Broker":
+        self._srv = socket.create_server((self.host, self.port), reuse_port=False)
+        self.port = self._srv.getsockname()[1]
+        self.started = time.monotonic()
+        threading.Thread(target=self._accept, name="broker", daemon=True).start()
+        logger.debug("MQTT stand-in listening on %s:%d", self.host, self.port)
+        return self
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                sock, addr = self._srv.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client = _Client(self, sock, addr)
+            with self._lock:
+                self._clients.append(client)
+            client.start()
+
+    def publish(self, topic: str, payload: bytes) -> None:
+        with self._lock:
+            st = self.topics[topic]
+            st[0] += 1
+            st[1] += len(payload)
+            targets = [c for c in self._clients if any(topic_matches(p, topic) for p in c.subs)]
+        for fn in self.listeners:
+            fn(topic, payload)
+        for c in targets:
+            c.deliver(topic, payload)
+
+    def drop(self, client: _Client) -> None:
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+
+    def stats(self) -> dict:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        with self._lock:
+            return {topic: {"messages": m, "bytes": b, "bytes_per_s": round(b / elapsed, 1)}
+                    for topic, (m, b) in sorted(self.topics.items())}
+
+    def stop(self) -> None:
+        if self._srv:
+            self._srv.close()
+        with self._lock:
+            for c in self._clients:
+                try:
+                    c.sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Minimal local MQTT broker.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=1883)
+    args = ap.parse_args()
+    Broker(args.host, args.port).start()
+    print(f"listening on {args.host}:{args.port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
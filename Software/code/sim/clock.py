@@ -0,0 +1,21 @@
+"""Simulated time: real monotonic time scaled by a speed factor."""
+from __future__ import annotations
+
+import time
+
+
+class SimClock:
+    """sim_time = (monotonic - start) * speed, starting at 0."""
+
+    def __init__(self, speed: float = 1.0):
+        if speed <= 0:
+            raise ValueError("speed must be > 0")
+        self.speed = float(speed)
+        self._t0 = time.monotonic()
+
+    def now(self) -> float:
+        return (time.monotonic() - self._t0) * self.speed
+
+    def real_delay(self, sim_seconds: float) -> float:
+        """Real seconds until `sim_seconds` of simulated time have passed."""
+        return sim_seconds / self.speed
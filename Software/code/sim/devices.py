@@ -0,0 +1,429 @@
+"""
+Simulated sensors behind the fake SMBus / serial backends.
+
+Register-level models of the chips the drivers talk to – the drivers run
+unmodified, including the LSM6DSO FIFO, MMC5603 continuous mode and the
+u-blox DDC stream with CFG-VALSET → ACK. Physical values come from Motion
+(synthetic or replayed CSV); GPS from an NMEA file or a synthetic track.
+"""
+from __future__ import annotations
+
+import collections
+import datetime
+import math
+import random
+import struct
+import threading
+
+import numpy as np
+
+from sim.clock import SimClock
+
+
+# ---------------------------------------------------------------------------
+# Physical motion source
+# ---------------------------------------------------------------------------
+class _CsvReplay:
+    """Looped, linearly interpolated replay of a CSV dump (first column t in s)."""
+
+    def __init__(self, path: str):
+        data = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+        self.t = data[:, 0] - data[0, 0]
+        self.values = data[:, 1:]
+        self.period = max(self.t[-1], 1e-3)
+
+    def at(self, t: float) -> np.ndarray:
+        tt = t % self.period
+        return np.array([np.interp(tt, self.t, col) for col in self.values.T])
+
+
+class Motion:
+    """
+    Boat attitude in sensor axes.
+
+    Synthetic default: one full circle every 120 s, ±10° roll (6 s period),
+    ±3° pitch (4 s period), earth field 19 µT horizontal / 45 µT vertical.
+    imu_csv columns: t, ax, ay, az (g), gx, gy, gz (dps); mag_csv: t, mx, my, mz (µT).
+    """
+
+    TURN_S = 120.0
+
+    def __init__(self, clock: SimClock, imu_csv: str | None = None, mag_csv: str | None = None):
+        self.clock = clock
+        self._imu = _CsvReplay(imu_csv) if imu_csv else None
+        self._mag = _CsvReplay(mag_csv) if mag_csv else None
+        self._rng = np.random.default_rng(1)
+
+    def heading(self, t: float) -> float:
+        return (360.0 * t / self.TURN_S) % 360
+
+    def imu(self, t: float) -> np.ndarray:
+        """acc xyz (g) + gyro xyz (dps)."""
+        if self._imu is not None:
+            return self._imu.at(t)
+        roll = math.radians(10 * math.sin(2 * math.pi * t / 6))
+        pitch = math.radians(3 * math.sin(2 * math.pi * t / 4))
+        acc = [math.sin(pitch), -math.sin(roll) * math.cos(pitch), math.cos(roll) * math.cos(pitch)]
+        gyro = [10 * 2 * math.pi / 6 * math.cos(2 * math.pi * t / 6),
+                3 * 2 * math.pi / 4 * math.cos(2 * math.pi * t / 4),
+                -360.0 / self.TURN_S]
+        return np.array(acc + gyro) + self._rng.normal(0, 0.002, 6)
+
+    def mag(self, t: float) -> np.ndarray:
+        if self._mag is not None:
+            return self._mag.at(t)
+        h = math.radians(self.heading(t))
+        return np.array([19 * math.cos(h), -19 * math.sin(h), -45.0]) + self._rng.normal(0, 0.05, 3)
+
+
+# ---------------------------------------------------------------------------
+# I²C device base
+# ---------------------------------------------------------------------------
+class I2CDevice:
+    """Register file with auto-increment; subclasses override read/write."""
+
+    def __init__(self):
+        self.regs = bytearray(256)
+        self.lock = threading.RLock()
+
+    def read(self, reg: int, n: int) -> bytes:
+        return bytes(self.regs[(reg + i) & 0xFF] for i in range(n))
+
+    def write(self, reg: int, data: bytes) -> None:
+        for i, b in enumerate(data):
+            self.regs[(reg + i) & 0xFF] = b
+
+    def rdwr(self, msgs) -> None:
+        """Combined transfer: [write(reg)] + read(n), or a plain write."""
+        with self.lock:
+            if len(msgs) == 2 and msgs[0].is_write and not msgs[1].is_write:
+                msgs[1].fill(self.read(msgs[0].data[0], msgs[1].len))
+            else:
+                for m in msgs:
+                    if m.is_write and m.data:
+                        self.write(m.data[0], bytes(m.data[1:]))
+
+
+# ---------------------------------------------------------------------------
+# LSM6DSO – accel/gyro with FIFO
+# ---------------------------------------------------------------------------
+class FakeLSM6DSO(I2CDevice):
+    ODR_HZ = {1: 12.5, 2: 26, 3: 52, 4: 104, 5: 208, 6: 416, 7: 833}
+    ACC_MG = {0: 0.061, 2: 0.122, 3: 0.244, 1: 0.488}
+    GYRO_MDPS = {2: 4.375, 0: 8.75, 4: 17.5, 8: 35.0, 12: 70.0}
+    FIFO_WORDS = 512
+
+    def __init__(self, clock: SimClock, motion: Motion):
+        super().__init__()
+        self.clock, self.motion = clock, motion
+        self.regs[0x0F] = 0x6C                              # WHO_AM_I
+        self.fifo: collections.deque = collections.deque()
+        self.overrun = False
+        self._next_t = None                                 # sim time of the next FIFO sample
+
+    def _scales(self):
+        acc = self.ACC_MG.get((self.regs[0x10] >> 2) & 0x3, 0.061) / 1000
+        gyro = self.GYRO_MDPS.get(self.regs[0x11] & 0x0E, 8.75) / 1000
+        return acc, gyro
+
+    def _raw(self, t: float) -> bytes:
+        acc_s, gyro_s = self._scales()
+        v = self.motion.imu(t)
+        g = np.clip(np.round(v[3:] / gyro_s), -32768, 32767).astype("<i2")
+        a = np.clip(np.round(v[:3] / acc_s), -32768, 32767).astype("<i2")
+        return g.tobytes() + a.tobytes()
+
+    def _fill_fifo(self) -> None:
+        if (self.regs[0x0A] & 0x07) == 0:                   # FIFO bypass
+            return
+        odr = self.ODR_HZ.get(self.regs[0x10] >> 4)
+        if not odr:
+            return
+        now = self.clock.now()
+        if self._next_t is None:
+            self._next_t = now
+        while self._next_t <= now:
+            raw = self._raw(self._next_t)
+            self.fifo.append(bytes([0x01 << 3]) + raw[:6])  # gyro word
+            self.fifo.append(bytes([0x02 << 3]) + raw[6:])  # accel word
+            self._next_t += 1.0 / odr
+        while len(self.fifo) > self.FIFO_WORDS:
+            self.fifo.popleft()
+            self.overrun = True
+
+    def read(self, reg: int, n: int) -> bytes:
+        if reg == 0x22:                                     # OUTX_L_G … OUTZ_H_A
+            return self._raw(self.clock.now())[:n]
+        if reg == 0x3A:                                     # FIFO_STATUS1/2
+            self._fill_fifo()
+            level = len(self.fifo)
+            status2 = ((level >> 8) & 0x03) | (0x08 if self.overrun else 0)
+            self.overrun = False
+            return bytes([level & 0xFF, status2])[:n]
+        if reg == 0x78:                                     # FIFO_DATA_OUT_TAG
+            out = bytearray()
+            while len(out) < n and self.fifo:
+                out += self.fifo.popleft()
+            return bytes(out.ljust(n, b"\0"))
+        return super().read(reg, n)
+
+    def write(self, reg: int, data: bytes) -> None:
+        super().write(reg, data)
+        if reg <= 0x0A < reg + len(data) and (self.regs[0x0A] & 0x07) == 0:
+            self.fifo.clear()                               # bypass mode empties the FIFO
+            self._next_t = None
+
+
+# ---------------------------------------------------------------------------
+# MMC5603 – magnetometer (single shot + continuous mode)
+# ---------------------------------------------------------------------------
+class FakeMMC5603(I2CDevice):
+    def __init__(self, clock: SimClock, motion: Motion):
+        super().__init__()
+        self.clock, self.motion = clock, motion
+        self._ready = False
+        self._last_meas = 0.0
+
+    def _continuous_due(self) -> bool:
+        if not self.regs[0x1D] & 0x10:                      # Cmm_en
+            return False
+        odr = max(1, self.regs[0x1A])
+        return self.clock.now() - self._last_meas >= 1.0 / odr
+
+    def read(self, reg: int, n: int) -> bytes:
+        if reg == 0x18:                                     # STATUS_1
+            ready = self._ready or self._continuous_due()
+            return bytes([0x40 if ready else 0x00])[:n]
+        if reg == 0x00:
+            self._ready = False
+            self._last_meas = self.clock.now()
+            out = bytearray(9)
+            for i, v in enumerate(self.motion.mag(self._last_meas)):
+                raw = int(round(v / 0.00625)) + (1 << 19)
+                raw = max(0, min(raw, (1 << 20) - 1))
+                out[2 * i] = (raw >> 12) & 0xFF
+                out[2 * i + 1] = (raw >> 4) & 0xFF
+                out[6 + i] = (raw & 0x0F) << 4
+            return bytes(out[:n])
+        return super().read(reg, n)
+
+    def write(self, reg: int, data: bytes) -> None:
+        super().write(reg, data)
+        if reg == 0x1B and data and data[0] & 0x01:         # Take_meas_M
+            self._ready = True
+
+
+# ---------------------------------------------------------------------------
+# MAX17048 – fuel gauge
+# ---------------------------------------------------------------------------
+class FakeMAX17048(I2CDevice):
+    """Slowly discharging cell: 4.10 V / 90 % → −1 %/10 min (sim time)."""
+
+    def __init__(self, clock: SimClock):
+        super().__init__()
+        self.clock = clock
+
+    def read(self, reg: int, n: int) -> bytes:
+        hours = self.clock.now() / 3600
+        soc = max(0.0, 90.0 - 6.0 * hours)
+        volt = 3.5 + 0.6 * soc / 90.0
+        if reg == 0x02:
+            val = int(volt / 78.125e-6)
+        elif reg == 0x04:
+            val = int(soc * 256)
+        else:
+            return super().read(reg, n)
+        return val.to_bytes(2, "big")[:n]                   # register is big endian
+
+
+# ---------------------------------------------------------------------------
+# SAM-M10Q – u-blox DDC stream (NMEA replay / synthetic, UBX config + ACK)
+# ---------------------------------------------------------------------------
+def _nmea(body: str) -> bytes:
+    cs = 0
+    for ch in body:
+        cs ^= ord(ch)
+    return f"${body}*{cs:02X}\r\n".encode()
+
+
+def _ubx(cls: int, msg_id: int, payload: bytes) -> bytes:
+    body = bytes([cls, msg_id]) + struct.pack("<H", len(payload)) + payload
+    a = b = 0
+    for x in body:
+        a = (a + x) & 0xFF
+        b = (b + a) & 0xFF
+    return b"\xb5\x62" + body + bytes([a, b])
+
+
+_NAV_PVT = struct.Struct("<IHBBBBBBIiBBBBiiiiIIiiiiiIIHH4xihH")
+_NAV_DOP = struct.Struct("<I7H")
+
+
+class FakeUblox(I2CDevice):
+    """
+    Epochs are produced every CFG-RATE-MEAS ms of simulated time.
+    Replay: the NMEA file is split into epochs at each RMC and looped.
+    Synthetic: 5 kn on a 300 m circle off Kiel, RMC + GGA (or NAV-PVT).
+    """
+    BUFFER_MAX = 4096                                       # receiver TX buffer
+
+    def __init__(self, clock: SimClock, nmea_path: str | None = None):
+        super().__init__()
+        self.clock = clock
+        self.period = 1.0                                   # s, CFG-RATE-MEAS
+        self.nav_pvt = False
+        self.nav_dop = False
+        self.nmea_on = True
+        self.out = bytearray()
+        self._epoch = 0
+        self._next_t = 0.0
+        self._wall0 = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+        self._epochs = self._load(nmea_path) if nmea_path else None
+
+    @staticmethod
+    def _load(path: str) -> list[bytes]:
+        epochs, cur = [], []
+        with open(path, "rb") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line.startswith(b"$"):
+                    continue
+                if line[3:6] == b"RMC" and cur:
+                    epochs.append(b"".join(cur))
+                    cur = []
+                cur.append(line + b"\r\n")
+        if cur:
+            epochs.append(b"".join(cur))
+        if not epochs:
+            raise ValueError(f"no NMEA sentences in {path}")
+        return epochs
+
+    # ------------------------------------------------------------------ #
+    def _synthetic(self, t: float) -> bytes:
+        speed_kn, radius = 5.0, 300.0
+        omega = speed_kn * 0.514444 / radius
+        ang = omega * t
+        lat0, lon0 = 54.3232, 10.1394
+        lat = lat0 + (radius * math.cos(ang)) / 111_320
+        lon = lon0 + (radius * math.sin(ang)) / (111_320 * math.cos(math.radians(lat0)))
+        cog = (math.degrees(ang) + 90) % 360
+        ts = self._wall0 + datetime.timedelta(seconds=t)
+        if self.nav_pvt:
+            return self._pvt(t, ts, lat, lon, speed_kn, cog)
+        if not self.nmea_on:
+            return b""
+
+        def dm(v, deg_w):
+            d = int(abs(v))
+            return f"{d:0{deg_w}d}{(abs(v) - d) * 60:08.5f}"
+
+        hms = ts.strftime("%H%M%S") + f".{ts.microsecond // 10000:02d}"
+        ns, ew = ("N" if lat >= 0 else "S"), ("E" if lon >= 0 else "W")
+        rmc = (f"GNRMC,{hms},A,{dm(lat, 2)},{ns},{dm(lon, 3)},{ew},"
+               f"{speed_kn:.3f},{cog:.2f},{ts.strftime('%d%m%y')},,,A,V")
+        gga = (f"GNGGA,{hms},{dm(lat, 2)},{ns},{dm(lon, 3)},{ew},1,11,0.90,"
+               f"12.3,M,40.1,M,,")
+        return _nmea(rmc) + _nmea(gga)
+
+    def _pvt(self, t, ts, lat, lon, speed_kn, cog) -> bytes:
+        gspeed = int(speed_kn * 514.444)
+        itow = int(t * 1000) % 604_800_000
+        dop = b""
+        if self.nav_dop:                                    # sent before NAV-PVT
+            dop = _ubx(0x01, 0x04, _NAV_DOP.pack(itow, 180, 120, 100, 150, 90, 60, 70))
+        payload = _NAV_PVT.pack(
+            itow, ts.year, ts.month, ts.day, ts.hour, ts.minute, ts.second, 0x07,
+            50, ts.microsecond * 1000, 3, 0x01, 0, 11,
+            int(lon * 1e7), int(lat * 1e7), 52_400, 12_300, 1500, 2500,
+            0, 0, 0, gspeed, int(cog * 1e5), 300, 100_000, 120, 0, 0, 0, 0)
+        return dop + _ubx(0x01, 0x07, payload)
+
+    def _produce(self) -> None:
+        now = self.clock.now()
+        while self._next_t <= now:
+            if self._epochs is not None:
+                data = self._epochs[self._epoch % len(self._epochs)]
+            else:
+                data = self._synthetic(self._next_t)
+            self.out += data
+            self._epoch += 1
+            self._next_t += self.period
+        if len(self.out) > self.BUFFER_MAX:                 # receiver drops old data
+            del self.out[:len(self.out) - self.BUFFER_MAX]
+
+    # ------------------------------------------------------------------ #
+    def _handle_ubx(self, frame: bytes) -> None:
+        if len(frame) < 8 or frame[:2] != b"\xb5\x62":
+            return
+        cls, msg_id = frame[2], frame[3]
+        payload = frame[6:6 + struct.unpack_from("<H", frame, 4)[0]]
+        if (cls, msg_id) == (0x06, 0x8A):                   # CFG-VALSET
+            pos = 4
+            while pos + 4 <= len(payload):
+                key = struct.unpack_from("<I", payload, pos)[0]
+                size = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8}.get((key >> 28) & 0x7, 1)
+                val = int.from_bytes(payload[pos + 4:pos + 4 + size], "little")
+                pos += 4 + size
+                if key == 0x30210001 and val:
+                    self.period = val / 1000
+                elif key == 0x20910006:
+                    self.nav_pvt = bool(val)
+                elif key == 0x20910038:
+                    self.nav_dop = bool(val)
+                elif key == 0x10720002:
+                    self.nmea_on = bool(val)
+        self.out += _ubx(0x05, 0x01, bytes([cls, msg_id]))  # ACK-ACK
+
+    def read(self, reg: int, n: int) -> bytes:
+        if reg == 0xFD:
+            self._produce()
+            return min(len(self.out), 0xFFFE).to_bytes(2, "big")[:n]
+        if reg == 0xFF:
+            data = bytes(self.out[:n])
+            del self.out[:n]
+            return data.ljust(n, b"\xff")
+        return super().read(reg, n)
+
+    def rdwr(self, msgs) -> None:
+        with self.lock:
+            if len(msgs) == 1 and msgs[0].is_write and msgs[0].data[:1] == b"\xb5":
+                self._handle_ubx(bytes(msgs[0].data))
+                return
+        super().rdwr(msgs)
+
+
+# ---------------------------------------------------------------------------
+# Calypso wind – MWV sentences on the serial port
+# ---------------------------------------------------------------------------
+class MwvSource:
+    """4 Hz MWV stream (replayed file, looped, or synthetic gusty breeze)."""
+    RATE_HZ = 4
+
+    def __init__(self, clock: SimClock, path: str | None = None):
+        self.clock = clock
+        self._lines = None
+        if path:
+            with open(path, "rb") as fh:
+                self._lines = [ln.strip() + b"\r\n" for ln in fh if b"MWV" in ln]
+        self._n = 0
+        self._rng = random.Random(2)
+
+    def _line(self, i: int) -> bytes:
+        if self._lines:
+            return self._lines[i % len(self._lines)]
+        t = i / self.RATE_HZ
+        angle = (40 + 15 * math.sin(2 * math.pi * t / 60) + self._rng.gauss(0, 3)) % 360
+        speed = max(0.0, 6 + 2 * math.sin(2 * math.pi * t / 20) + self._rng.gauss(0, 0.5))
+        return _nmea(f"IIMWV,{angle:.1f},R,{speed:.2f},M,A")
+
+    def pending(self) -> bytes:
+        """All sentences due by now that were not delivered yet."""
+        due = int(self.clock.now() * self.RATE_HZ) + 1
+        out = b"".join(self._line(i) for i in range(self._n, due))
+        self._n = max(self._n, due)
+        return out
+
+    def next_due_in(self) -> float:
+        """Real seconds until the next sentence is due."""
+        return max(0.0, self.clock.real_delay(self._n / self.RATE_HZ - self.clock.now()))
+
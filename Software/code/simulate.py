@@ -0,0 +1,251 @@
+# ---------------------------------------------------------------------------
+# simulate.py – run the complete tracker pipeline without the Pi hardware
+# ---------------------------------------------------------------------------
+#   python simulate.py                                synthetic boat, 60 s
+#   python simulate.py --nmea track.nmea --mwv wind.txt --speed 5 --duration 120
+#   python simulate.py --device hub --broker localhost:1883   (real Mosquitto)
+#   python simulate.py --profile prof/                cProfile dump per thread
+#   python simulate.py --set db_batch_rows=10 --set live_encoding='"compact"'
+#
+# sim.install() replaces smbus2 / serial / pigpio with simulated devices, a
+# local MQTT stand-in (sim/broker.py) is started unless --broker is given,
+# and DB + spool go to a scratch directory. Then main.main() runs unchanged:
+# gps_captain → snapshot channel → mainloop → datamanager (SQLite, MQTT).
+# After --duration the process sends itself SIGTERM, i.e. the normal systemd
+# shutdown path (DB batch flushed), and prints a JSON summary: GPS/channel/
+# DB/MQTT statistics, fix→broker latency (live payloads carry ts_monotonic),
+# CPU seconds per thread and process RSS (benchmarks/bench_pipeline.py).
+# ---------------------------------------------------------------------------
+from __future__ import annotations
+
+import argparse
+import ast
+import cProfile
+import json
+import os
+import signal
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import sim
+from sim import backends
+from sim.broker import Broker
+from channel import LatencyStats
+
+
+def _parse_args():
+    ap = argparse.ArgumentParser(description="Run the tracker against simulated hardware.")
+    ap.add_argument("--device", choices=("boat", "buoy", "hub"), default="boat")
+    ap.add_argument("--duration", type=float, default=60.0, help="real seconds to run")
+    ap.add_argument("--speed", type=float, default=1.0, help="simulated time per real second")
+    ap.add_argument("--nmea", help="NMEA recording for the GPS (default: synthetic track)")
+    ap.add_argument("--mwv", help="MWV recording for the wind sensor (default: synthetic)")
+    ap.add_argument("--imu-csv", help="IMU dump: t,ax,ay,az,gx,gy,gz (g, dps)")
+    ap.add_argument("--mag-csv", help="magnetometer dump: t,mx,my,mz (µT)")
+    ap.add_argument("--gps-rate", type=int, help="override config.GPS_UPDATE (Hz)")
+    ap.add_argument("--gps-protocol", choices=("nmea", "ubx"), help="override config.GPS_PROTOCOL")
+    ap.add_argument("--broker", help="host:port of an existing broker instead of the stand-in")
+    ap.add_argument("--workdir", help="directory for DB and spool (default: temp dir)")
+    ap.add_argument("--profile", help="write one cProfile .prof file per thread here")
+    ap.add_argument("--report", help="also write the JSON summary to this file")
+    ap.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                    help="override a config value (Python literal), repeatable")
+    return ap.parse_args()
+
+
+def _apply_overrides(config, items: list[str]) -> None:
+    for item in items:
+        key, _, raw = item.partition("=")
+        try:
+            value = ast.literal_eval(raw)
+        except (ValueError, SyntaxError):
+            value = raw                                 # bare string
+        setattr(config, key.strip(), value)
+
+
+# ---------------------------------------------------------------------------
+# Per-thread profiling
+# ---------------------------------------------------------------------------
+_profiles: dict[str, cProfile.Profile] = {}
+
+
+def _install_profiler() -> None:
+    run = threading.Thread.run
+
+    def profiled_run(self):
+        prof = cProfile.Profile()
+        _profiles[f"{self.name}-{threading.get_ident()}"] = prof
+        prof.runcall(run, self)
+
+    threading.Thread.run = profiled_run
+    main_prof = cProfile.Profile()
+    _profiles["MainThread"] = main_prof
+    main_prof.enable()
+
+
+def _dump_profiles(out_dir: str) -> list[str]:
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for name, prof in list(_profiles.items()):
+        path = os.path.join(out_dir, f"{name}.prof")
+        try:
+            prof.dump_stats(path)
+            written.append(path)
+        except Exception as exc:                        # noqa: BLE001
+            print(f"profile {name}: {exc}", file=sys.stderr)
+    return written
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+_fix_to_broker = LatencyStats(maxlen=100_000)
+
+
+def _on_broker_publish(topic: str, payload: bytes) -> None:
+    """fix → broker latency of every snapshot in a live frame."""
+    now = time.monotonic()
+    try:
+        if topic.endswith("livebin"):
+            import livecodec
+            records = livecodec.decode(payload)
+        elif topic.endswith("live"):
+            records = json.loads(payload)
+        else:
+            return
+    except Exception:                                   # noqa: BLE001
+        return
+    for rec in records if isinstance(records, list) else [records]:
+        ts = rec.get("ts_monotonic")
+        if ts is not None:
+            _fix_to_broker.add(now - ts)
+
+
+def _thread_usage() -> dict:
+    """CPU seconds per thread (/proc/self/task/<tid>/stat) and process RSS in MB."""
+    tick = os.sysconf("SC_CLK_TCK")
+    names = {t.native_id: t.name for t in threading.enumerate()}
+    threads = {}
+    for tid in os.listdir("/proc/self/task"):
+        try:
+            with open(f"/proc/self/task/{tid}/stat") as fh:
+                fields = fh.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue                                    # thread exited meanwhile
+        cpu = (int(fields[11]) + int(fields[12])) / tick  # utime + stime
+        name = names.get(int(tid), f"native-{tid}")
+        threads[name] = round(threads.get(name, 0.0) + cpu, 3)
+    mem = {}
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith(("VmRSS:", "VmHWM:")):
+                mem[line.split(":")[0]] = round(int(line.split()[1]) / 1024, 1)
+    return {"cpu_s": dict(sorted(threads.items(), key=lambda kv: -kv[1])),
+            "rss_mb": mem.get("VmRSS"), "rss_peak_mb": mem.get("VmHWM")}
+
+def _db_rows(path: str) -> int | None:
+    try:
+        with sqlite3.connect(path) as db:
+            return db.execute("SELECT COUNT(*) FROM logdata").fetchone()[0]
+    except sqlite3.Error:
+        return None
+
+
+def _summary(main, datamanager, elapsed: float) -> dict:
+    import modules
+    from modules import gps, i2cbus
+    ch = main.snap_ch.stats()
+    return {
+        "device": main.config.device_type,
+        "elapsed_s": round(elapsed, 2),
+        "sim_time_s": round(sim.clock.now(), 2),
+        "gps": gps.get_stats(),
+        "snapshot_channel": ch,
+        "fix_to_broker": _fix_to_broker.summary(),
+        "fix_to_commit": datamanager.db_latency.summary(reset=False),
+        "db_file": datamanager.DB_FILE,
+        "db_rows": _db_rows(datamanager.DB_FILE),
+        "db_segments": datamanager.segment_count(),
+        "mqtt": dict(datamanager.mqtt_stats, outbox=datamanager._outbox.stats(),
+                     publish=datamanager.mqtt_latency.summary()),
+        "i2c": i2cbus.stats(),
+        "backends": backends.get_stats(),
+        "process": _thread_usage(),
+        "startup": modules.stats(),
+    }
+
+
+# ---------------------------------------------------------------------------
+def main() -> None:
+    args = _parse_args()
+    workdir = args.workdir or tempfile.mkdtemp(prefix="tracker-sim-")
+    os.makedirs(workdir, exist_ok=True)
+
+    # drivers must see the fake backends from their very first import
+    from config import config
+    sim.install(speed=args.speed, nmea=args.nmea, mwv=args.mwv,
+                imu_csv=args.imu_csv, mag_csv=args.mag_csv,
+                gps_addr=int(config.gps_i2c, 16))
+
+    broker = None
+    if args.broker:
+        host, _, port = args.broker.partition(":")
+        config.mqtt_broker, config.mqtt_port = host, int(port or 1883)
+    else:
+        broker = Broker("127.0.0.1", 0).start()
+        broker.listeners.append(_on_broker_publish)
+        config.mqtt_broker, config.mqtt_port = "127.0.0.1", broker.port
+    config.device_type = args.device
+    config.identifier = f"sim{args.device}"
+    config.db_dir = workdir
+    config.spool_dir = os.path.join(workdir, "spool")
+    config.metrics_file = os.path.join(workdir, "metrics.prom")
+    if args.gps_rate:
+        config.GPS_UPDATE = args.gps_rate
+    if args.gps_protocol:
+        config.GPS_PROTOCOL = args.gps_protocol
+    _apply_overrides(config, args.set)
+
+    if args.profile:
+        _install_profiler()
+
+    import datamanager
+    import main as tracker
+    tracker.ACTIVE_SENSORS.discard("wifi")           # no wlan0 off the Pi
+
+    started = time.monotonic()
+    summary: dict = {}
+
+    def _stop():
+        summary.update(_summary(tracker, datamanager, time.monotonic() - started))
+        os.kill(os.getpid(), signal.SIGTERM)         # same path as systemctl stop
+
+    timer = threading.Timer(args.duration, _stop)
+    timer.daemon = True
+    timer.start()
+    try:
+        tracker.main()
+    except SystemExit:
+        pass
+
+    # the DB batch is flushed now – recount rows and add the broker view
+    summary["db_rows"] = _db_rows(datamanager.DB_FILE)
+    summary["fix_to_commit"] = datamanager.db_latency.summary()
+    summary["broker_topics"] = broker.stats() if broker else None
+    if args.profile:
+        summary["profiles"] = _dump_profiles(args.profile)
+    if broker:
+        broker.stop()
+
+    text = json.dumps(summary, indent=2, default=str)
+    print(text)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as fp:
+            fp.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
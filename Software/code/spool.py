@@ -0,0 +1,215 @@
+# ---------------------------------------------------------------------------
+# spool.py – disk-backed store-and-forward queue for live payloads
+# ---------------------------------------------------------------------------
+# • append(kind, payload) writes one record to the current append-only
+#   segment file (<dir>/<seq>.seg):   u32 length | u8 kind | payload
+#   kind 0 = JSON text, 1 = livecodec frame (see datamanager._publish_live)
+# • Segments are rotated at segment_bytes; when the spool exceeds max_bytes
+#   the oldest segment is deleted (oldest data goes first, disk is bounded).
+# • peek()/advance() replay records in order; the read position is kept in
+#   <dir>/cursor so a restart does not send everything twice.
+# • Only the record being replayed is held in memory.
+# ---------------------------------------------------------------------------
+from __future__ import annotations
+
+import logging
+import os
+import struct
+import threading
+
+logger = logging.getLogger(__name__)
+
+_REC = struct.Struct("<IB")          # payload length, kind
+
+KIND_JSON    = 0
+KIND_COMPACT = 1
+
+CURSOR_EVERY = 20                    # records per cursor write (≤ this many resent after a crash)
+
+
+class Spool:
+    """Append-only segmented spool with a persisted read cursor."""
+
+    def __init__(self, directory: str, max_bytes: int = 64 << 20,
+                 segment_bytes: int = 1 << 20):
+        self.dir = directory
+        self.max_bytes = max(int(max_bytes), int(segment_bytes))
+        self.segment_bytes = int(segment_bytes)
+        self._lock = threading.Lock()
+        self.dropped = 0                 # records lost to the disk limit
+        self._unsaved = 0                # advances since the last cursor write
+        os.makedirs(self.dir, exist_ok=True)
+
+        self._segments = sorted(int(f[:-4]) for f in os.listdir(self.dir)
+                                if f.endswith(".seg") and f[:-4].isdigit())
+        self._wfh = None                 # write handle of the newest segment
+        self._rseg, self._rpos = self._load_cursor()
+        self._rfh = None                 # read handle of segment _rseg
+        self._count = self._count_records()
+
+    # ------------------------------------------------------------------ #
+    def _path(self, seg: int) -> str:
+        return os.path.join(self.dir, f"{seg:08d}.seg")
+
+    def _load_cursor(self) -> tuple[int, int]:
+        try:
+            with open(os.path.join(self.dir, "cursor")) as fh:
+                seg, pos = fh.read().split()
+                return int(seg), int(pos)
+        except (OSError, ValueError):
+            return (self._segments[0] if self._segments else 0), 0
+
+    def _save_cursor(self) -> None:
+        self._unsaved = 0
+        tmp = os.path.join(self.dir, "cursor.tmp")
+        with open(tmp, "w") as fh:
+            fh.write(f"{self._rseg} {self._rpos}")
+        os.replace(tmp, os.path.join(self.dir, "cursor"))
+
+    def _count_records(self) -> int:
+        """Unsent records on disk (startup only – a header scan, no payloads)."""
+        return sum(self._count_records_in(seg, self._rpos if seg == self._rseg else 0)
+                   for seg in self._segments if seg >= self._rseg)
+
+    def _count_records_in(self, seg: int, pos: int) -> int:
+        n = 0
+        try:
+            with open(self._path(seg), "rb") as fh:
+                fh.seek(pos)
+                while True:
+                    hdr = fh.read(_REC.size)
+                    if len(hdr) < _REC.size:
+                        break
+                    fh.seek(_REC.unpack(hdr)[0], os.SEEK_CUR)
+                    n += 1
+        except OSError:
+            pass
+        return n
+
+    def _disk_bytes(self) -> int:
+        total = 0
+        for seg in self._segments:
+            try:
+                total += os.path.getsize(self._path(seg))
+            except OSError:
+                pass
+        return total
+
+    def _drop_oldest_segment(self) -> None:
+        seg = self._segments.pop(0)
+        if seg == self._rseg:
+            if self._rfh:
+                self._rfh.close()
+                self._rfh = None
+            lost = self._count_records_in(seg, self._rpos)
+            self._rseg = self._segments[0] if self._segments else seg + 1
+            self._rpos = 0
+        else:
+            lost = self._count_records_in(seg, 0) if seg > self._rseg else 0
+        self.dropped += lost
+        self._count -= lost
+        try:
+            os.remove(self._path(seg))
+        except OSError:
+            pass
+        logger.error("spool full – dropped segment %d (%d records)", seg, lost)
+
+    # ------------------------------------------------------------------ #
+    # Writer                                                             #
+    # ------------------------------------------------------------------ #
+    def append(self, kind: int, payload: bytes) -> None:
+        with self._lock:
+            if self._wfh is None or self._wfh.tell() >= self.segment_bytes:
+                if self._wfh:
+                    self._wfh.close()
+                seg = self._segments[-1] + 1 if self._segments else self._rseg
+                self._segments.append(seg)
+                self._wfh = open(self._path(seg), "ab")
+                while len(self._segments) > 1 and self._disk_bytes() > self.max_bytes:
+                    self._drop_oldest_segment()
+            self._wfh.write(_REC.pack(len(payload), kind) + payload)
+            self._wfh.flush()
+            self._count += 1
+
+    # ------------------------------------------------------------------ #
+    # Reader                                                             #
+    # ------------------------------------------------------------------ #
+    def peek(self) -> tuple[int, bytes] | None:
+        """Oldest unsent (kind, payload) without consuming it – None if empty."""
+        with self._lock:
+            while self._count > 0:
+                if self._rfh is None:
+                    if self._rseg not in self._segments:
+                        later = [s for s in self._segments if s > self._rseg]
+                        if not later:
+                            self._count = 0
+                            return None
+                        self._rseg, self._rpos = later[0], 0
+                    self._rfh = open(self._path(self._rseg), "rb")
+                self._rfh.seek(self._rpos)
+                hdr = self._rfh.read(_REC.size)
+                if len(hdr) == _REC.size:
+                    size, kind = _REC.unpack(hdr)
+                    payload = self._rfh.read(size)
+                    if len(payload) == size:
+                        return kind, payload
+                # end of this segment – move on unless it is still being written
+                if self._segments and self._rseg == self._segments[-1]:
+                    return None
+                self._next_segment()
+            return None
+
+    def advance(self) -> None:
+        """Consume the record returned by the last peek()."""
+        with self._lock:
+            if self._rfh is None:
+                return
+            self._rfh.seek(self._rpos)
+            hdr = self._rfh.read(_REC.size)
+            if len(hdr) < _REC.size:
+                return
+            self._rpos += _REC.size + _REC.unpack(hdr)[0]
+            self._count -= 1
+            self._unsaved += 1
+            if self._count == 0:
+                self._reset()
+            elif self._unsaved >= CURSOR_EVERY:
+                self._save_cursor()
+
+    def _next_segment(self) -> None:
+        self._rfh.close()
+        self._rfh = None
+        done = self._rseg
+        self._segments.remove(done)
+        try:
+            os.remove(self._path(done))
+        except OSError:
+            pass
+        self._rseg = self._segments[0] if self._segments else done + 1
+        self._rpos = 0
+        self._save_cursor()
+
+    def _reset(self) -> None:
+        """Everything replayed – delete all segments and start over."""
+        for fh in (self._rfh, self._wfh):
+            if fh:
+                fh.close()
+        self._rfh = self._wfh = None
+        for seg in self._segments:
+            try:
+                os.remove(self._path(seg))
+            except OSError:
+                pass
+        self._rseg = (self._segments[-1] + 1) if self._segments else self._rseg
+        self._segments = []
+        self._rpos = 0
+        self._save_cursor()
+
+    # ------------------------------------------------------------------ #
+    def depth(self) -> int:
+        return self._count
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"records": self._count, "bytes": self._disk_bytes(),
+                    "segments": len(self._segments), "dropped": self.dropped}
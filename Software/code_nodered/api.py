@@ -1,7 +1,7 @@
 from flask import Flask, request, jsonify
 import logging
 from pingcheck import ping_device
-from rsync import rsync_data
+from datasync import sync_data
 from fileprep_boat import export_sqlite_to_csv  # Import function from fileprep_boat.py
 
 # initialize logger
@@ -30,7 +30,8 @@ def pingfunc():
 @app.route("/rsync", methods=["GET"])
 def trigger_rsync():
     """
-    trigger rsync from a remote device to the local system.
+    copy new log rows from a remote device to the local system (incremental,
+    see datasync.py – the endpoint keeps its name for the Node-RED flows).
     example: GET /rsync?device=boat1
     """
     device = request.args.get("device")
@@ -38,7 +39,7 @@ def trigger_rsync():
         logger.error("rsync_error: missing 'device' parameter")
         return jsonify({"error": "Missing 'device' parameter", "id": 'device'}), 400
 
-    result = rsync_data(device)
+    result = sync_data(device)
     logger.debug("rsync_result: %s", result)
     return jsonify(result)
 
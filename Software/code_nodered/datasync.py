@@ -0,0 +1,195 @@
+import json
+import os
+import sqlite3
+import subprocess
+import time
+import logging
+from pingcheck import ping_device
+
+# initialize logger
+logger = logging.getLogger(__name__)
+
+# set timeout values
+PING_TIMEOUT = 2    # timeout in seconds for ping
+CHUNK_TIMEOUT = 30  # timeout in seconds for one export call over ssh
+CHUNK_ROWS = 5000   # rows per export call
+
+DESTINATION = "/home/globaladmin/IOTstack/volumes/nodered/data/datarsync"
+REMOTE_DB_DIR = "/home/globaladmin/data"
+EXPORT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logexport.py")
+
+
+class DeviceResetError(ValueError):
+    """the device counts segments from below the hub watermark (manifest lost, re-imaged)."""
+
+
+def open_local_db(device_id, destination=DESTINATION):
+    """
+    opens the hub copy datalog_<id>.db with its sync_state watermark table.
+    a full copy left by the old rsync path has no watermark – it is moved
+    aside (.rsync.bak) instead of being appended to twice.
+    """
+    os.makedirs(destination, exist_ok=True)
+    path = os.path.join(destination, f"datalog_{device_id}.db")
+    if os.path.exists(path):
+        db = sqlite3.connect(path)
+        has_state = db.execute("SELECT 1 FROM sqlite_master WHERE type='table' "
+                               "AND name='sync_state'").fetchone()
+        db.close()
+        if not has_state:
+            os.replace(path, path + ".rsync.bak")
+            logger.debug("Moved old full copy aside: %s.rsync.bak", path)
+
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("CREATE TABLE IF NOT EXISTS sync_state ("
+               "id INTEGER PRIMARY KEY CHECK (id = 1), seq INTEGER, row_id INTEGER, updated TEXT)")
+    db.execute("INSERT OR IGNORE INTO sync_state VALUES (1, 0, 0, NULL)")
+    db.commit()
+    return db
+
+
+def get_watermark(db):
+    """(seq, rowid) of the last row copied from the device."""
+    return tuple(db.execute("SELECT seq, row_id FROM sync_state WHERE id = 1").fetchone())
+
+
+def reset_local_db(db, device_id, destination=DESTINATION):
+    """
+    moves the hub copy aside (.reset-<utc time>.bak) and opens an empty one,
+    so the rows of a reset device are copied again from (0, 0).
+    """
+    db.close()
+    path = os.path.join(destination, f"datalog_{device_id}.db")
+    bak = f"{path}.reset-{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}.bak"
+    os.replace(path, bak)
+    logger.error("Device %s was reset – hub copy moved aside: %s", device_id, bak)
+    return open_local_db(device_id, destination)
+
+
+def _ensure_columns(db, columns, types):
+    """creates logdata like the device's, or adds columns the device gained."""
+    existing = [r[1] for r in db.execute("PRAGMA table_info(logdata)")]
+    if not existing:
+        cols = ", ".join(f'"{c}" {t}' for c, t in zip(columns, types))
+        db.execute(f"CREATE TABLE logdata ({cols})")
+        return
+    for col, typ in zip(columns, types):
+        if col not in existing:
+            db.execute(f'ALTER TABLE logdata ADD COLUMN "{col}" {typ}')
+
+
+def apply_chunk(db, lines):
+    """
+    appends one export chunk and moves the watermark in the same transaction,
+    so an interrupted sync resumes exactly after the last stored row.
+    returns (rows, done).
+    """
+    header, rows, trailer = None, [], None
+    for line in lines:
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        if isinstance(item, list):
+            rows.append(item)
+        elif "columns" in item:
+            header = item
+        else:
+            trailer = item
+    if trailer is None:
+        raise ValueError("incomplete export (no trailer line)")
+    seq = get_watermark(db)[0]
+    if trailer["next_seq"] < seq:
+        raise DeviceResetError(f"device is at segment {trailer['next_seq']}, "
+                               f"hub watermark at segment {seq}")
+
+    with db:
+        if rows:
+            _ensure_columns(db, header["columns"], header["types"])
+            names = ",".join(f'"{c}"' for c in header["columns"])
+            sql = f"INSERT INTO logdata ({names}) VALUES ({','.join('?' * len(header['columns']))})"
+            db.executemany(sql, (r[2:] for r in rows))
+        seq, rowid = trailer["watermark"]
+        db.execute("UPDATE sync_state SET seq = ?, row_id = ?, updated = ? WHERE id = 1",
+                   (seq, rowid, time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())))
+    return len(rows), trailer["done"]
+
+
+def run_export(device, device_id, seq, rowid, limit=CHUNK_ROWS):
+    """runs logexport.py on the device (piped through ssh) and returns its output lines."""
+    with open(EXPORT_SCRIPT) as f:
+        script = f.read()
+    cmd = ["/usr/bin/ssh", "-C", "-o", "BatchMode=yes", "-o", "ConnectTimeout=5",
+           f"globaladmin@{device}", "python3", "-",
+           "--db-dir", REMOTE_DB_DIR, "--id", device_id,
+           "--after-seq", str(seq), "--after-rowid", str(rowid), "--limit", str(limit)]
+    result = subprocess.run(cmd, input=script, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            check=True, text=True, timeout=CHUNK_TIMEOUT)
+    return result.stdout.splitlines()
+
+
+def sync_data(device, destination=DESTINATION):
+    """
+    copies the log rows the hub does not have yet from a remote device.
+
+    :param device: the name of the remote device (e.g., "boat1").
+    :return: a dictionary with the sync status, copied rows and watermark or error message.
+    """
+    # ensure the device ends with ".local"
+    if not device.endswith(".local"):
+        device += ".local"
+    device_id = device.replace(".local", "")
+
+    # ping the device with timeout before proceeding
+    ping_result = ping_device(device, timeout=PING_TIMEOUT)
+    if not ping_result["ping"]:
+        logger.error("Device %s is unreachable. Aborting sync.", device)
+        return {"id": device_id, "status": "error", "error": f"Device {device} is unreachable."}
+
+    db = open_local_db(device_id, destination)
+    total, reset = 0, False
+    try:
+        done, idle = False, 0
+        while not done:
+            seq, rowid = get_watermark(db)
+            try:
+                rows, done = apply_chunk(db, run_export(device, device_id, seq, rowid))
+            except DeviceResetError as e:
+                # the device's rows are new ones – keep the old copy, start over once
+                if reset:
+                    raise
+                logger.error("Sync %s: %s", device_id, e)
+                db = reset_local_db(db, device_id, destination)
+                reset = True
+                continue
+            total += rows
+            logger.debug("Sync %s: %d rows after (%d, %d)", device_id, rows, seq, rowid)
+            # an unfinished chunk without rows means a segment was sealed
+            # meanwhile – retry, but never spin
+            idle = 0 if rows else idle + 1
+            if idle >= 3:
+                raise ValueError("export makes no progress")
+        output = f"{total} new rows, watermark {get_watermark(db)}"
+        if reset:
+            output += " (device was reset, old copy moved aside)"
+        logger.debug("Sync successful: %s", output)
+        return {"id": device_id, "status": "success", "rows": total, "output": output}
+    except subprocess.TimeoutExpired:
+        logger.error("Sync timed out after %d seconds (%d rows copied).", CHUNK_TIMEOUT, total)
+        return {"id": device_id, "status": "error", "rows": total,
+                "error": f"Sync timed out after {CHUNK_TIMEOUT} seconds, resumes on the next call."}
+    except subprocess.CalledProcessError as e:
+        logger.error("Sync failed: %s", e.stderr)
+        return {"id": device_id, "status": "error", "rows": total, "error": e.stderr}
+    except (ValueError, sqlite3.Error) as e:
+        logger.error("Sync failed: %s", e)
+        return {"id": device_id, "status": "error", "rows": total, "error": str(e)}
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    # default values for testing
+    device = "boat1"  # input hostname
+    result = sync_data(device)
+    logger.debug("Final result: %s", result)
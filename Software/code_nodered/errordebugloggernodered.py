@@ -1,43 +1,64 @@
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import os
 
-def rollover(handler, max_entries=1000, delete_count=250):
-    """
-    rollover: when the log file has reached max_entries,
-    delete the oldest delete_count entries (lines) from the file.
-    """
-    # flush and close the current stream
-    if handler.stream:
-        handler.stream.flush()
-        handler.stream.close()
-    try:
-        with open(handler.baseFilename, 'r') as f:
-            lines = f.readlines()
-    except Exception:
-        lines = []  
-    # remove the oldest delete_count lines
-    new_lines = lines[delete_count:]
-    with open(handler.baseFilename, 'w') as f:
-        f.writelines(new_lines)
-    # reopen the file and update the entry counter based on the new content
-    handler.stream = open(handler.baseFilename, handler.mode)
-    handler._entry_count = len(new_lines)
-
-def patch_handler(handler, max_entries=1000, delete_count=250):
+# logging threads only enqueue the record; a single writer thread (the queue
+# listener) writes it and rotates the files
+LOG_QUEUE_SIZE = 10000
+
+
+class SegmentRotatingFileHandler(RotatingFileHandler):
     """
-    Patch handler's emit method to count entries.
-    When the count reaches max_entries, perform the rollover.
+    rotates by entry count instead of bytes: when the current file holds
+    segment_entries lines it is renamed to <file>.1 (older segments shift to
+    .2, .3 …, the oldest is dropped) and a new file is started. old content is
+    never read or rewritten, a rollover costs a few renames.
     """
-    handler._entry_count = 0  # initialize a counter on the handler
-    original_emit = handler.emit  # keep the original emit method
 
-    def new_emit(record):
-        original_emit(record)
-        handler._entry_count += 1
-        if handler._entry_count >= max_entries:
-            rollover(handler, max_entries, delete_count)
-    handler.emit = new_emit
+    def __init__(self, filename, segment_entries=250, backup_count=3):
+        super().__init__(filename, mode='a', maxBytes=0, backupCount=backup_count)
+        self.segment_entries = segment_entries
+        try:
+            # continue counting in the segment left by the previous run
+            with open(self.baseFilename, 'rb') as f:
+                self._entry_count = sum(1 for _ in f)
+        except OSError:
+            self._entry_count = 0
+
+    def shouldRollover(self, record):
+        return self._entry_count >= self.segment_entries
+
+    def doRollover(self):
+        super().doRollover()
+        self._entry_count = 0
+
+    def emit(self, record):
+        super().emit(record)
+        self._entry_count += 1
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Never blocks the logging thread: a full queue drops the record."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # only merge the arguments here (they may be mutated after the call);
+        # formatting, timestamps and tracebacks are rendered by the writer
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
 
 # Define a filter function to exclude records with a level of error or higher.
 def max_level_filter(record):
@@ -46,41 +67,52 @@ def max_level_filter(record):
 # Assign the function's filter attribute to itself so it behaves like a filter object.
 max_level_filter.filter = max_level_filter
 
+queue_handler = None
+listener = None
+
 def log(debug_log_file='debug.log', error_log_file='error.log',
         debug=True, max_entries=1000, delete_count=250):
     """
-    Sets up two file handlers:
-      - One for debug (and below error) messages in debug_log_file.
-      - One for error (and above) messages in error_log_file.
-    
-    When either file reaches max_entries, the oldest delete_count lines are removed.
+    routes the root logger through a queue to one writer thread that feeds:
+      - debug (and below error) messages into debug_log_file.
+      - error (and above) messages into error_log_file.
+
+    each file is a ring of delete_count-entry segments holding at most
+    max_entries entries: when the current segment is full, the oldest
+    delete_count entries are dropped by deleting the oldest segment file.
     """
+    global queue_handler, listener
+
     # Ensure the logfiles directory exists and update log file paths.
     log_dir = 'logfiles'
     os.makedirs(log_dir, exist_ok=True)
     debug_log_file = os.path.join(log_dir, debug_log_file)
     error_log_file = os.path.join(log_dir, error_log_file)
+    backups = max(1, max_entries // delete_count - 1)
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
-    logger = logging.getLogger()
-    logger.setLevel(logging.DEBUG if debug else logging.INFO)
-    
     # Debug handler (for messages below error)
-    debug_handler = RotatingFileHandler(debug_log_file, mode='a', maxBytes=0, backupCount=0)
-    patch_handler(debug_handler, max_entries, delete_count)
+    debug_handler = SegmentRotatingFileHandler(debug_log_file, delete_count, backups)
     debug_handler.setLevel(logging.DEBUG)
     # Add filter to allow only messages below error level.
     debug_handler.addFilter(max_level_filter)
-    debug_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    debug_handler.setFormatter(debug_formatter)
-    logger.addHandler(debug_handler)
-    
+    debug_handler.setFormatter(formatter)
+
     # Error handler (for error and above messages)
-    error_handler = RotatingFileHandler(error_log_file, mode='a', maxBytes=0, backupCount=0)
-    patch_handler(error_handler, max_entries, delete_count)
+    error_handler = SegmentRotatingFileHandler(error_log_file, delete_count, backups)
     error_handler.setLevel(logging.ERROR)
-    error_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    error_handler.setFormatter(error_formatter)
-    logger.addHandler(error_handler)
+    error_handler.setFormatter(formatter)
+
+    queue_handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    listener = QueueListener(queue_handler.queue, debug_handler, error_handler,
+                             respect_handler_level=True)
+    listener.start()
+    # registered after logging's own atexit hook → runs first and drains the queue
+    atexit.register(listener.stop)
+
+    logger = logging.getLogger()
+    logger.setLevel(logging.DEBUG if debug else logging.INFO)
+    logger.addHandler(queue_handler)
 
 # Automatically configure logging when this module is imported.
 log(debug_log_file='debug.log', error_log_file='error.log',
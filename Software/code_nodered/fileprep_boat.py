@@ -1,4 +1,5 @@
 import sqlite3
+import json
 import pandas as pd
 import csv
 import os
@@ -41,11 +42,41 @@ def archive_existing_files(boat_name):
             shutil.move(old_path, new_path)
             logger.debug("Moved %s to %s", file, ARCHIVE_DIR)
 
+def segment_files(db_path):
+    """
+    sealed segments of a log (datalog_<boat>/seg_*.db, in manifest order)
+    followed by the running datalog_<boat>.db, as far as they exist.
+    a .db with a sync_state table is the incremental copy (datasync.py) and
+    already holds every segment – a datalog_<boat>/ left by rsync is ignored.
+    """
+    seg_dir = db_path[:-3]
+    files = []
+    if os.path.exists(db_path):
+        conn = sqlite3.connect(db_path)
+        synced = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' "
+                              "AND name='sync_state'").fetchone()
+        conn.close()
+        if synced:
+            return [db_path]
+    try:
+        with open(os.path.join(seg_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+        for seg in sorted(manifest["segments"], key=lambda s: s["seq"]):
+            path = os.path.join(seg_dir, seg["file"])
+            if os.path.exists(path):
+                files.append(path)
+    except FileNotFoundError:
+        pass
+    if os.path.exists(db_path):
+        files.append(db_path)
+    return files
+
 def export_sqlite_to_csv(db_name):
     """converts the SQLite "logdata" table into a CSV file."""
     table_name = "logdata"
     db_path = os.path.join(INPUT_DIR, db_name)
-    if not os.path.exists(db_path):
+    files = segment_files(db_path)
+    if not files:
         logger.error("Error: Database file %s does not exist.", db_path)
         return {"filename": db_name, "status": "error", "message": f"Database file {db_path} does not exist."}
     try:
@@ -54,12 +85,15 @@ def export_sqlite_to_csv(db_name):
         output_csv = os.path.join(OUTPUT_DIR, f"{boat_name}_{timestamp}.csv")
         ensure_directory_exists(OUTPUT_DIR)
         archive_existing_files(boat_name)
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        columns = [col[1] for col in cursor.fetchall()]
-        df = pd.read_sql_query(f"SELECT * FROM {table_name}", conn)
-        conn.close()
+        frames = []
+        for path in files:
+            conn = sqlite3.connect(path)
+            cursor = conn.cursor()
+            cursor.execute(f"PRAGMA table_info({table_name})")
+            columns = [col[1] for col in cursor.fetchall()]
+            frames.append(pd.read_sql_query(f"SELECT * FROM {table_name}", conn))
+            conn.close()
+        df = pd.concat(frames, ignore_index=True)
         rename_mapping = {"datetime": "ISODateTimeUTC", "lat": "Lat", "long": "Lon"}
         df.rename(columns=rename_mapping, inplace=True)
         standard_columns = ["ISODateTimeUTC", "Lat", "Lon", "SOG", "COG"]
@@ -0,0 +1,53 @@
+import json
+import logging
+import paho.mqtt.client as mqtt
+import errordebugloggernodered
+import livedecoder
+
+# initialize logger
+logger = logging.getLogger(__name__)
+
+# the boats/buoys publish compact frames on <device>livebin when
+# config.live_encoding = "compact"; they are republished as JSON arrays on
+# <device>live so the existing Node-RED flows keep working (spooled frames
+# replayed on <device>backfillbin likewise go to <device>backfill)
+MQTT_BROKER = "localhost"
+MQTT_PORT = 1883
+SOURCES = ["boatlivebin", "buoylivebin", "hublivebin",
+           "boatbackfillbin", "buoybackfillbin", "hubbackfillbin"]
+
+
+def on_connect(client, userdata, flags, rc):
+    """
+    (re)subscribes to all compact live topics after every connect.
+    """
+    logger.debug("livebridge connected to MQTT broker (rc=%s)", rc)
+    for topic in SOURCES:
+        client.subscribe(topic)
+
+
+def on_message(client, userdata, msg):
+    """
+    decodes one compact frame and republishes it as a JSON array.
+    """
+    try:
+        records = livedecoder.decode(msg.payload)
+    except Exception as e:
+        logger.error("livebridge_decode_error: %s -> %s", msg.topic, str(e))
+        return
+    client.publish(msg.topic[:-len("bin")], json.dumps(records))
+
+
+def run_bridge():
+    """
+    connects to the local broker and bridges until interrupted.
+    """
+    client = mqtt.Client()
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.connect(MQTT_BROKER, MQTT_PORT, 60)
+    client.loop_forever()
+
+
+if __name__ == "__main__":
+    run_bridge()
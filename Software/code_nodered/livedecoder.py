@@ -0,0 +1,142 @@
+"""
+Decoder for the compact live telemetry frames published on *livebin
+
+Mirror of Software/code/livecodec.py (decode side only) – the SCHEMA table
+below must stay identical to the one on the boats (the hub has no copy of
+code/, so it cannot be imported; code/benchmarks/bench_livecodec.py --check
+fails when the two differ). decode() returns the same
+flat dicts the boats used to publish as JSON, so the Node-RED ParseFunction
+nodes work unchanged (see livebridge.py).
+"""
+import json
+import struct
+import time
+import zlib
+
+MAGIC          = b"DS"
+SCHEMA_VERSION = 2
+FLAG_ZLIB      = 0x01
+
+_HEADER = struct.Struct("<2sBBH")
+
+# (key, kind, scale) – kind: struct code, "?" bool, "s" str, "t" datetime
+# NEVER reorder or change entries of a version. New fields go into a new
+# version (the "extra" flag is the last bitmap bit, so appending to an existing
+# version breaks older decoders); older versions stay for spooled frames.
+SCHEMA = {
+    1: (
+        ("id",                   "s", None),
+        ("validtime",            "?", None),
+        ("status",               "s", None),
+        ("datetime",             "t", None),
+        ("ts_monotonic",         "q", 1000),      # ms
+        ("lat",                  "i", 10**7),
+        ("long",                 "i", 10**7),
+        ("SOG",                  "H", 100),
+        ("COG",                  "H", 100),
+        ("fixQ",                 "B", 1),
+        ("nSat",                 "B", 1),
+        ("HDOP",                 "H", 100),
+        ("alt",                  "i", 10),
+        ("batvolt",              "H", 100),
+        ("batperc",              "H", 10),
+        ("wifi_conn",            "?", None),
+        ("wifi_signal_strength", "b", 1),
+        ("acc_x",                "h", 1000),
+        ("acc_y",                "h", 1000),
+        ("acc_z",                "h", 1000),
+        ("gyro_x",               "i", 100),
+        ("gyro_y",               "i", 100),
+        ("gyro_z",               "i", 100),
+        ("pitch",                "h", 100),
+        ("roll",                 "h", 100),
+        ("mag_x",                "i", 10000),
+        ("mag_y",                "i", 10000),
+        ("mag_z",                "i", 10000),
+        ("heading",              "H", 100),
+        ("w_speed",              "H", 100),
+        ("w_angle",              "H", 100),
+        ("w_unit",               "s", None),
+        ("w_status",             "s", None),
+        ("true_wind_dir",        "H", 100),
+        ("w_speed_kts",          "H", 100),
+        ("imu_age_ms",           "i", 10),
+        ("mag_age_ms",           "i", 10),
+        ("bat_age_ms",           "i", 10),
+        ("wind_age_ms",          "i", 10),
+    ),
+}
+# v2: fused attitude quaternion (ahrs) and its cache age
+SCHEMA[2] = SCHEMA[1] + (
+    ("quat_w",               "h", 10000),
+    ("quat_x",               "h", 10000),
+    ("quat_y",               "h", 10000),
+    ("quat_z",               "h", 10000),
+    ("ahrs_age_ms",          "i", 10),
+)
+
+_U8  = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_I64 = struct.Struct("<q")
+_NUM = {code: struct.Struct("<" + code)
+        for fields in SCHEMA.values() for _, code, _ in fields if code not in ("s", "t")}
+
+
+
+def _cs_to_iso(cs):
+    """centiseconds since the Unix epoch -> 'YYYY-MM-DDTHH:MM:SS.ssZ'."""
+    secs, frac = divmod(cs, 100)
+    t = time.gmtime(secs)
+    return (f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}"
+            f"T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec + frac / 100:05.2f}Z")
+
+
+def decode(frame):
+    """
+    decode one frame into a list of flat snapshot dicts.
+
+    :param frame: raw MQTT payload (bytes).
+    :return: list of dicts, one per snapshot.
+    """
+    magic, version, flags, count = _HEADER.unpack_from(frame)
+    if magic != MAGIC:
+        raise ValueError("not a livecodec frame")
+    if version not in SCHEMA:
+        raise ValueError(f"unknown schema version {version}")
+    body = frame[_HEADER.size:]
+    if flags & FLAG_ZLIB:
+        body = zlib.decompress(body)
+
+    fields = SCHEMA[version]
+    nbits = len(fields) + 1
+    nbytes = (nbits + 7) // 8
+    out = []
+    pos = 0
+    for _ in range(count):
+        bitmap = int.from_bytes(body[pos:pos + nbytes], "little")
+        pos += nbytes
+        rec = {}
+        for i, (key, kind, scale) in enumerate(fields):
+            if not bitmap >> i & 1:
+                continue
+            if kind == "s":
+                n = body[pos]
+                rec[key] = body[pos + 1:pos + 1 + n].decode()
+                pos += 1 + n
+            elif kind == "t":
+                rec[key] = _cs_to_iso(_I64.unpack_from(body, pos)[0])
+                pos += 8
+            elif kind == "?":
+                rec[key] = bool(body[pos])
+                pos += 1
+            else:
+                st = _NUM[kind]
+                v = st.unpack_from(body, pos)[0]
+                pos += st.size
+                rec[key] = v if scale == 1 else v / scale
+        if bitmap >> (nbits - 1) & 1:
+            n = _U16.unpack_from(body, pos)[0]
+            rec.update(json.loads(body[pos + 2:pos + 2 + n]))
+            pos += 2 + n
+        out.append(rec)
+    return out
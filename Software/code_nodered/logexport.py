@@ -0,0 +1,108 @@
+"""
+incremental log export – runs on the boat/buoy, started by datasync.py.
+
+the hub pipes this file into `ssh <device> python3 - <args>`, so nothing has
+to be installed on the device (standard library only). it prints the log
+rows behind a watermark as json lines:
+
+    {"columns": [...], "types": [...]}          header
+    [seq, rowid, <logdata columns>...]           one line per row
+    {"done": true|false, "watermark": [seq, rowid], "next_seq": seq}
+
+rows are identified by (segment seq, rowid): sealed segments
+(datalog_<id>/seg_<seq>.db, see code/datamanager.py) keep their rowids, and
+the running datalog_<id>.db carries its future seq in PRAGMA user_version.
+every file is read inside one read transaction, i.e. from a consistent
+snapshot – a concurrent commit or seal never yields half a batch. at most
+--limit rows are sent per call; the hub calls again until done is true.
+next_seq is the seq of the running segment: a hub watermark beyond it means
+the device lost its manifest or was re-imaged and counts from 1 again.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+
+
+def sources(db_dir, device_id):
+    """(path, sealed, manifest seq) of all segments in seq order, running segment last."""
+    seg_dir = os.path.join(db_dir, f"datalog_{device_id}")
+    out, next_seq = [], 1
+    try:
+        with open(os.path.join(seg_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+        for seg in sorted(manifest["segments"], key=lambda s: s["seq"]):
+            out.append((os.path.join(seg_dir, seg["file"]), True, seg["seq"]))
+        next_seq = manifest["next_seq"]
+    except FileNotFoundError:
+        pass
+    out.append((os.path.join(db_dir, f"datalog_{device_id}.db"), False, next_seq))
+    return out
+
+
+def read_rows(path, sealed, seq_hint, after_seq, after_rowid, limit):
+    """(seq, columns, types, rows) behind the watermark, from one snapshot."""
+    if not os.path.exists(path):
+        return None, [], [], []
+    uri = f"file:{path}?mode=ro" if sealed else f"file:{path}"
+    db = sqlite3.connect(uri, uri=True, isolation_level=None)
+    try:
+        db.execute("PRAGMA query_only=1")
+        db.execute("BEGIN")
+        # files written before the seq was stored fall back to the manifest
+        seq = db.execute("PRAGMA user_version").fetchone()[0] or seq_hint
+        if seq < after_seq:
+            return seq, [], [], []
+        info = db.execute("PRAGMA table_info(logdata)").fetchall()
+        columns = [c[1] for c in info]
+        types = [c[2] for c in info]
+        start = after_rowid if seq == after_seq else 0
+        rows = db.execute(f"SELECT rowid, * FROM logdata WHERE rowid > ? "
+                          f"ORDER BY rowid LIMIT ?", (start, limit)).fetchall()
+        db.execute("COMMIT")
+        return seq, columns, types, rows
+    finally:
+        db.close()
+
+
+def export(db_dir, device_id, after_seq, after_rowid, limit, out=sys.stdout):
+    watermark = [after_seq, after_rowid]
+    sent, header, raced = 0, False, False
+    segments = sources(db_dir, device_id)
+    for path, sealed, seq_hint in segments:
+        if sent >= limit:
+            break
+        if sealed and seq_hint < watermark[0]:
+            continue                        # fully synced segment – not even opened
+        seq, columns, types, rows = read_rows(path, sealed, seq_hint, watermark[0],
+                                              watermark[1], limit - sent)
+        if not sealed and seq is not None and seq != seq_hint:
+            # sealed between reading the manifest and opening the file: the
+            # sealed rest of seq_hint comes first – the next call sees it
+            raced = True
+            break
+        if not rows:
+            continue
+        if not header:
+            out.write(json.dumps({"columns": columns, "types": types}) + "\n")
+            header = True
+        for row in rows:
+            out.write(json.dumps([seq, *row], separators=(",", ":")) + "\n")
+        sent += len(rows)
+        watermark = [seq, rows[-1][0]]
+    out.write(json.dumps({"done": sent < limit and not raced, "watermark": watermark,
+                          "next_seq": segments[-1][2]}) + "\n")
+    out.flush()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="export log rows behind a watermark")
+    ap.add_argument("--db-dir", default="/home/globaladmin/data")
+    ap.add_argument("--id", required=True, help="device identifier, e.g. boat1")
+    ap.add_argument("--after-seq", type=int, default=0)
+    ap.add_argument("--after-rowid", type=int, default=0)
+    ap.add_argument("--limit", type=int, default=5000)
+    args = ap.parse_args()
+    export(args.db_dir, args.id, args.after_seq, args.after_rowid, args.limit)
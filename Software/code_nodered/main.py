@@ -1,4 +1,5 @@
 import subprocess
+import threading
 import time
 import logging
 import errordebugloggernodered
@@ -6,21 +7,29 @@ import errordebugloggernodered
 # initialize logger
 logger = logging.getLogger(__name__)
 
-def run_api():
+def run_script(script):
     """
-    continuously runs api.py, restarting it if it exits.
+    continuously runs a script, restarting it if it exits.
     """
     try:
         while True:
-            logger.debug("Starting api.py...")
-            # start the API as a subprocess
-            process = subprocess.Popen(["python", "api.py"])
+            logger.debug("Starting %s...", script)
+            # start the script as a subprocess
+            process = subprocess.Popen(["python", script])
             # wait for the process to finish (this blocks until it exits)
             process.wait()
-            logger.error("api.py terminated with return code %d. Restarting in 5 seconds...", process.returncode)
+            logger.error("%s terminated with return code %d. Restarting in 5 seconds...", script, process.returncode)
             time.sleep(5)  # delay before restarting
     except KeyboardInterrupt:
         logger.info("Received keyboard interrupt. Shutting down.")
 
+def run_api():
+    """
+    continuously runs api.py, restarting it if it exits.
+    """
+    run_script("api.py")
+
 if __name__ == "__main__":
+    # compact live frames -> JSON arrays for Node-RED
+    threading.Thread(target=run_script, args=("livebridge.py",), daemon=True).start()
     run_api()
@@ -53,13 +53,18 @@ def rsync_data(device, options="-avz"):
     logger.debug("Device %s is reachable. Proceeding with rsync...", device)
 
     # correct rsync source format: user@host:/path/to/file
+    # running segment + directory of sealed segments and manifest; sealed
+    # segments never change, so rsync only transfers the new ones
     source = f"globaladmin@{device}:/home/globaladmin/data/datalog_{device_id}.db"
+    segments = f"globaladmin@{device}:/home/globaladmin/data/datalog_{device_id}"
 
     # ensure the destination directory exists
     ensure_directory_exists(destination)
 
-    # construct the rsync command
-    cmd = ["/usr/bin/rsync", "-e", "/usr/bin/ssh"] + options.split() + [source, destination]
+    # construct the rsync command; the segment directory only exists once the
+    # device has sealed a segment – a missing source is skipped, not exit 23
+    cmd = (["/usr/bin/rsync", "-e", "/usr/bin/ssh", "--ignore-missing-args"] + options.split()
+           + [source, segments, destination])
 
     try:
         result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True, timeout=RSYNC_TIMEOUT)